@@ -1,20 +1,35 @@
+import asyncio
+import functools
 import logging
 import os
+import signal
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-import lmdb
 import tomli
 import uvicorn
 from dotenv import load_dotenv
-from fastapi import FastAPI
+from fastapi import FastAPI, Header, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
 
 from wikisearch.autocomplete.autocompletion_service import AutocompletionService
 from wikisearch.db.database_connection import DatabaseConnectionService
+from wikisearch.db.file_database import open_file_database
 from wikisearch.document.document_service import DocumentService
+from wikisearch.document.metadata_table import DocumentMetadataTable
+from wikisearch.index.document_bitmap import DocumentFilterService
+from wikisearch.index.embedding_store import EmbeddingStore
+from wikisearch.index.embeddings_generator import EmbeddingsGenerator
+from wikisearch.index.faiss_semantic_index import FAISSIndexService
+from wikisearch.index.flat_semantic_index import FlatIndexService
+from wikisearch.index.hybrid_search import HybridSearchService
 from wikisearch.index.inverted_index import InvertedIndexService
+from wikisearch.index.sharded_usearch_index import ShardedUSearchIndexService
 from wikisearch.index.usearch_semantic_index import USearchIndexService
+from wikisearch.spell.bigram_table import BigramTable
+from wikisearch.spell.context_checker import ContextSpellChecker
 from wikisearch.spell.hunspell_checker import HunSpellChecker
+from wikisearch.spell.symspell_checker import SymSpellChecker
 
 logging.basicConfig(
     level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -43,50 +58,197 @@ DB_CONFIG = {
     "password": os.getenv("DB_PASSWORD"),
     "database": os.getenv("DB_DATABASE"),
 }
+# admin endpoints require this token in the X-Admin-Token header, and are disabled without it
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+API_CONFIG = {
+    "workers": config["API"].get("Workers", 8),
+    "db_pool_size": config["API"].get("DatabasePoolSize", 10),
+}
 
 LMDB_CONFIG = {
     "path": config["FileDatabase"].get("Path"),
     "size": config["FileDatabase"].get("Size", 10**9)
 }
 
+EMBEDDINGS_CONFIG = {
+    "backend": config["Embeddings"].get("Backend", "torch"),
+    "onnx_file_name": config["Embeddings"].get("OnnxFileName") or None,
+    "segment_length": config["Embeddings"].get("SegmentLength", 512),
+    "segment_by_tokens": config["Embeddings"].get("SegmentByTokens", False),
+    "segment_overlap": config["Embeddings"].get("SegmentOverlap", 0),
+}
+
 USEARCH_CONFIG = {
     "path": config["USearchIndex"].get("Path", "/data/WikiSearchData/SemanticIndex/usearch.index"),
-    "dimension": config["USearchIndex"].get("Dimension", 768)
+    "dimension": config["USearchIndex"].get("Dimension", 768),
+    "shards": config["USearchIndex"].get("Shards", 1),
 }
 
 FAISS_CONFIG = {
     "path": config["FAISSIndex"].get("Path", "/data/WikiSearchData/SemanticIndex/faiss.index"),
-    "dimension": config["FAISSIndex"].get("Dimension", 768)
+    "dimension": config["FAISSIndex"].get("Dimension", 768),
+    "M": config["FAISSIndex"].get("M", 32),
+    "ef_search": config["FAISSIndex"].get("EfSearch", 50),
+    "index_type": config["FAISSIndex"].get("IndexType", "hnsw"),
+    "nlist": config["FAISSIndex"].get("NList", 4096),
+    "pq_m": config["FAISSIndex"].get("PQM", 64),
+    "pq_nbits": config["FAISSIndex"].get("PQBits", 8),
+    "nprobe": config["FAISSIndex"].get("NProbe", 16),
+    "rerank_factor": config["FAISSIndex"].get("RerankFactor", 0),
+}
+
+METADATA_CONFIG = {
+    "path": config["DocumentMetadata"].get("Path", "/data/WikiSearchData/Metadata"),
+}
+
+EMBEDDING_STORE_CONFIG = {
+    "path": config["EmbeddingStore"].get("Path", "/data/WikiSearchData/SemanticIndex/embeddings"),
+}
+
+SEMANTIC_CONFIG = {
+    "backend": config["SemanticSearch"].get("Backend", "usearch"),
+    "rerank_depth": config["SemanticSearch"].get("RerankDepth", 100),
+    "flat_block_size": config["SemanticSearch"].get("FlatBlockSize", 16384),
+}
+
+HYBRID_CONFIG = {
+    "fusion": config["HybridSearch"].get("Fusion", "rrf"),
+    "lexical_weight": config["HybridSearch"].get("LexicalWeight", 0.5),
+    "semantic_weight": config["HybridSearch"].get("SemanticWeight", 0.5),
+    "rrf_k": config["HybridSearch"].get("RRFK", 60),
+    "candidate_depth": config["HybridSearch"].get("CandidateDepth", 100),
 }
 
 SPELL_CONFIG = {
     "aff": config["SpellChecker"].get("AffPath"),
     "dic": config["SpellChecker"].get("DicPath"),
     "custom_path": config["SpellChecker"].get("CustomDicPath"),
+    "vocabulary": config["SpellChecker"].get("VocabularyDAWG"),
+    "cache_size": config["SpellChecker"].get("CacheSize", 10000),
+    "backend": config["SpellChecker"].get("Backend", "hunspell"),
+    "frequency_path": config["SpellChecker"].get("FrequencyPath"),
+    "symspell_index_path": config["SpellChecker"].get("SymSpellIndexPath"),
+    "max_edit_distance": config["SpellChecker"].get("MaxEditDistance", 2),
+    "prefix_length": config["SpellChecker"].get("PrefixLength", 7),
+    "bigram_path": config["SpellChecker"].get("BigramPath"),
 }
 
 AUTOCOMPLETION_CONFIG = {
     "word-completion-dawg": config["Autocompletion"].get("WordCompletionDAWG"),
     "next-word-dawg": config["Autocompletion"].get("NextWordDAWG"),
+    "word-completions": config["Autocompletion"].get("WordCompletions"),
+    "next-words": config["Autocompletion"].get("NextWords"),
 }
 
-if not os.path.exists(LMDB_CONFIG["path"]):
-    os.makedirs(LMDB_CONFIG["path"])
-lmdb_env = lmdb.open(LMDB_CONFIG["path"], map_size=int(LMDB_CONFIG["size"]))
+lmdb_env = open_file_database(LMDB_CONFIG["path"], int(LMDB_CONFIG["size"]))
 
-with DatabaseConnectionService(DB_CONFIG) as connection:
+database_service = DatabaseConnectionService(
+    DB_CONFIG, int(API_CONFIG["db_pool_size"]))
+# blocking work runs in this pool; it is no larger than the connection pool,
+# so every worker can check out a connection for its request
+executor = ThreadPoolExecutor(
+    max_workers=min(int(API_CONFIG["workers"]), int(API_CONFIG["db_pool_size"])),
+    thread_name_prefix="api-worker")
+
+# services only use this connection at startup and do not keep it; requests pass their own
+with database_service.connection() as connection:
     # add crawler service, if you want to add documents in runtime
     inverted_index_service = InvertedIndexService(connection)
-    semantic_index_service = USearchIndexService(
-        Path(USEARCH_CONFIG["path"]),
-        int(USEARCH_CONFIG["dimension"]), 10)
-    spell_checker_service = HunSpellChecker(
-        Path(SPELL_CONFIG["aff"]),
-        Path(SPELL_CONFIG["dic"]))
+    embeddings_generator = EmbeddingsGenerator(
+        int(USEARCH_CONFIG["dimension"]),
+        int(EMBEDDINGS_CONFIG["segment_length"]),
+        backend=EMBEDDINGS_CONFIG["backend"],
+        onnx_file_name=EMBEDDINGS_CONFIG["onnx_file_name"],
+        segment_by_tokens=bool(EMBEDDINGS_CONFIG["segment_by_tokens"]),
+        segment_overlap=int(EMBEDDINGS_CONFIG["segment_overlap"]))
+    # the store provides full-precision vectors for exact re-ranking
+    embedding_store = EmbeddingStore(
+        Path(EMBEDDING_STORE_CONFIG["path"]), int(USEARCH_CONFIG["dimension"]), read_only=True)
+    if SEMANTIC_CONFIG["backend"] == "faiss":
+        semantic_index_service = FAISSIndexService(
+            Path(FAISS_CONFIG["path"]),
+            int(FAISS_CONFIG["dimension"]), connection, 10,
+            int(FAISS_CONFIG["M"]), embeddings_generator,
+            embedding_store=embedding_store,
+            ef_search=int(FAISS_CONFIG["ef_search"]),
+            index_type=FAISS_CONFIG["index_type"],
+            nlist=int(FAISS_CONFIG["nlist"]),
+            pq_m=int(FAISS_CONFIG["pq_m"]),
+            pq_nbits=int(FAISS_CONFIG["pq_nbits"]),
+            nprobe=int(FAISS_CONFIG["nprobe"]),
+            rerank_factor=int(FAISS_CONFIG["rerank_factor"]))
+    elif SEMANTIC_CONFIG["backend"] == "flat":
+        # exact search straight over the embedding store, for small corpora
+        semantic_index_service = FlatIndexService(
+            embedding_store, embeddings_generator, int(SEMANTIC_CONFIG["flat_block_size"]))
+    elif int(USEARCH_CONFIG["shards"]) > 1:
+        semantic_index_service = ShardedUSearchIndexService(
+            Path(USEARCH_CONFIG["path"]),
+            int(USEARCH_CONFIG["dimension"]),
+            int(USEARCH_CONFIG["shards"]), 10, embeddings_generator,
+            embedding_store=embedding_store)
+    else:
+        semantic_index_service = USearchIndexService(
+            Path(USEARCH_CONFIG["path"]),
+            int(USEARCH_CONFIG["dimension"]), 10, embeddings_generator,
+            embedding_store=embedding_store)
+    hybrid_search_service = HybridSearchService(
+        inverted_index_service, semantic_index_service,
+        HYBRID_CONFIG["fusion"],
+        float(HYBRID_CONFIG["lexical_weight"]),
+        float(HYBRID_CONFIG["semantic_weight"]),
+        int(HYBRID_CONFIG["rrf_k"]),
+        int(HYBRID_CONFIG["candidate_depth"]))
+    if SPELL_CONFIG["backend"] in ("symspell", "context"):
+        spell_checker_service = SymSpellChecker(
+            Path(SPELL_CONFIG["frequency_path"]),
+            Path(SPELL_CONFIG["symspell_index_path"]) if SPELL_CONFIG["symspell_index_path"] else None,
+            int(SPELL_CONFIG["max_edit_distance"]),
+            int(SPELL_CONFIG["prefix_length"]),
+            int(SPELL_CONFIG["cache_size"]))
+        if SPELL_CONFIG["backend"] == "context":
+            spell_checker_service = ContextSpellChecker(
+                spell_checker_service, BigramTable(Path(SPELL_CONFIG["bigram_path"])),
+                cache_size=int(SPELL_CONFIG["cache_size"]))
+    else:
+        spell_checker_service = HunSpellChecker(
+            Path(SPELL_CONFIG["aff"]),
+            Path(SPELL_CONFIG["dic"]),
+            Path(SPELL_CONFIG["vocabulary"]) if SPELL_CONFIG["vocabulary"] else None,
+            int(SPELL_CONFIG["cache_size"]))
     autocompletion_service = AutocompletionService(
         AUTOCOMPLETION_CONFIG["word-completion-dawg"],
-        AUTOCOMPLETION_CONFIG["next-word-dawg"], 10)
-    document_service = DocumentService(connection, lmdb_env)
+        AUTOCOMPLETION_CONFIG["next-word-dawg"], 10,
+        AUTOCOMPLETION_CONFIG["word-completions"], AUTOCOMPLETION_CONFIG["next-words"])
+    document_service = DocumentService(
+        lmdb_env, DocumentMetadataTable(Path(METADATA_CONFIG["path"]), read_only=True))
+    document_filter_service = DocumentFilterService()
+    document_filter_service.refresh(connection)
+
+
+def refresh_document_filters():
+    with database_service.connection() as connection:
+        document_filter_service.refresh(connection)
+
+
+def reload_indexes(signum, frame):
+    if hasattr(semantic_index_service, "rebuild_async"):
+        semantic_index_service.rebuild_async("disk")
+    # runs in the worker pool, which has a pooled connection for each of its workers
+    executor.submit(refresh_document_filters)
+
+
+# kill -HUP reloads the semantic index from disk, e.g. after scripts/rebuild_semantic_index.py,
+# and rebuilds the document filters
+if hasattr(signal, "SIGHUP"):
+    signal.signal(signal.SIGHUP, reload_indexes)
+
+
+async def run_blocking(function, *args, **kwargs):
+    """Run blocking code in the worker pool, keeping the event loop free for other requests."""
+    return await asyncio.get_running_loop().run_in_executor(
+        executor, functools.partial(function, *args, **kwargs))
 
 
 @app.get("/")
@@ -99,25 +261,53 @@ async def autocomplete(q: str):
     if not q:
         return []
     else:
-        return autocompletion_service.suggest(q)
+        return await run_blocking(autocompletion_service.suggest, q)
 
 
 @app.get("/search")
-async def search(q: str, index: str = "inverted", limit: int = 20, offset: int = 0, spellcheck: bool = True):
+async def search(q: str, index: str = "inverted", limit: int = 20, offset: int = 0, spellcheck: bool = True,
+                 document_filter: str | None = Query(None, alias="filter"), summary_type: str = "static"):
+    return await run_blocking(search_documents, q, index, limit, offset, spellcheck, document_filter, summary_type)
+
+
+def search_documents(q: str, index: str, limit: int, offset: int, spellcheck: bool,
+                     document_filter: str | None, summary_type: str) -> dict:
+    with database_service.connection() as connection:
+        return _search_documents(connection, q, index, limit, offset, spellcheck, document_filter, summary_type)
+
+
+def _search_documents(connection, q: str, index: str, limit: int, offset: int, spellcheck: bool,
+                      document_filter: str | None, summary_type: str) -> dict:
+    try:
+        # comma-separated names of document subsets, e.g. "inverted,usearch"
+        document_bitmap = document_filter_service.resolve(document_filter)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     q = q.lower()
     old_q: str = q
     if spellcheck:
         q = spell_checker_service.spellcheck(q).lower()
 
     if index == "semantic":
-        documents = semantic_index_service.search(q, limit, offset)
+        documents = semantic_index_service.search(
+            q, limit, offset, document_filter=document_bitmap)
+    elif index == "hybrid":
+        documents = hybrid_search_service.search(
+            q, limit, offset, connection=connection)
+    elif index == "rerank":
+        candidates = inverted_index_service.search(
+            q, max(int(SEMANTIC_CONFIG["rerank_depth"]), limit + offset), connection=connection)
+        documents = semantic_index_service.rerank(q, candidates, limit, offset)
     else:
-        documents = inverted_index_service.search(q, limit, offset)
+        documents = inverted_index_service.search(
+            q, limit, offset, connection=connection)
 
-    results = []
-    for doc_id, score in documents:
-        document = document_service.fetch_document(doc_id, score)
-        results.append(document)
+    # inflected forms of the query words are highlighted too
+    terms = inverted_index_service.word_forms(q, connection) if documents else set()
+    results = document_service.fetch_documents(
+        [doc_id for doc_id, _ in documents], [score for _, score in documents], connection=connection,
+        terms=terms, dynamic=(summary_type == "dynamic"))
 
     return {
         "query": q,
@@ -128,5 +318,21 @@ async def search(q: str, index: str = "inverted", limit: int = 20, offset: int =
         "results": results
     }
 
+
+@app.post("/admin/semantic-index/reload")
+async def reload_semantic_index(source: str = "disk", x_admin_token: str | None = Header(None)):
+    if not ADMIN_TOKEN or x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Forbidden")
+    if not hasattr(semantic_index_service, "rebuild_async"):
+        raise HTTPException(
+            status_code=501, detail="The semantic index backend does not support reloading")
+    if source not in ("disk", "store"):
+        raise HTTPException(
+            status_code=400, detail="source must be 'disk' or 'store'")
+    started = semantic_index_service.rebuild_async(source)
+    executor.submit(refresh_document_filters)
+    return {"source": source, "started": started}
+
+
 if __name__ == "__main__":
     uvicorn.run("api:app", host="localhost", port=8080)
@@ -0,0 +1,79 @@
+import logging
+import time
+from pathlib import Path
+
+import tomli
+
+from wikisearch.db.document_codec import DocumentCodec
+from wikisearch.db.file_database import is_document_key, open_file_database
+from wikisearch.index.embeddings_batcher import EmbeddingsBatcher
+from wikisearch.index.embeddings_generator import EmbeddingsGenerator
+
+# Compares the throughput of the length-bucketed EmbeddingsBatcher with passing all segments of
+# the same documents to the model in one call with a fixed batch size. Both encode the same
+# cross-document segments, so the difference is only the bucketing and the adaptive batch sizes.
+
+BATCH_SIZES = (32, 64, 128)
+
+
+def timed(function, *args, **kwargs) -> float:
+    start = time.perf_counter()
+    function(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    logger = logging.getLogger('WikiSearch')
+
+    path_to_config = Path("./config.toml")
+    with open(path_to_config, "rb") as f:
+        config = tomli.load(f)
+
+    EMBEDDINGS_CONFIG = {
+        "backend": config["Embeddings"].get("Backend", "torch"),
+        "onnx_file_name": config["Embeddings"].get("OnnxFileName") or None,
+        "segment_length": config["Embeddings"].get("SegmentLength", 512),
+        "segment_by_tokens": config["Embeddings"].get("SegmentByTokens", False),
+        "segment_overlap": config["Embeddings"].get("SegmentOverlap", 0),
+        "dimension": config["USearchIndex"].get("Dimension", 768),
+    }
+
+    LMDB_CONFIG = {
+        "path": config["FileDatabase"].get("Path"),
+        "size": config["FileDatabase"].get("Size", 10**9)
+    }
+
+    num_documents = int(config["Evaluator"].get("BatcherDocuments", 500))
+
+    lmdb_env = open_file_database(LMDB_CONFIG["path"], int(LMDB_CONFIG["size"]))
+    codec = DocumentCodec(lmdb_env)
+    generator = EmbeddingsGenerator(
+        int(EMBEDDINGS_CONFIG["dimension"]),
+        int(EMBEDDINGS_CONFIG["segment_length"]),
+        backend=EMBEDDINGS_CONFIG["backend"],
+        onnx_file_name=EMBEDDINGS_CONFIG["onnx_file_name"],
+        segment_by_tokens=bool(EMBEDDINGS_CONFIG["segment_by_tokens"]),
+        segment_overlap=int(EMBEDDINGS_CONFIG["segment_overlap"]))
+
+    texts = []
+    with lmdb_env.begin() as txn:
+        for key, value in txn.cursor():
+            if len(texts) == num_documents:
+                break
+            if is_document_key(key):
+                texts.append(codec.decode(value))
+    segments = [segment for text in texts for segment in generator.split_text(text)]
+    logger.info(f"Benchmarking on {len(segments)} segments of {len(texts)} documents")
+
+    # warm-up, so that neither variant pays for loading the model and the first allocations
+    generator.list_to_embeddings(segments[:64])
+
+    batcher_seconds = timed(EmbeddingsBatcher(generator).encode, segments)
+    logger.info(f"Bucketed batcher: {len(segments) / batcher_seconds:.1f} segments/sec")
+    for batch_size in BATCH_SIZES:
+        seconds = timed(generator.list_to_embeddings, segments, batch_size)
+        logger.info(
+            f"One call with batch size {batch_size}: {len(segments) / seconds:.1f} segments/sec, "
+            f"batcher speedup {seconds / batcher_seconds:.2f}x")
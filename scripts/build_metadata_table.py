@@ -0,0 +1,57 @@
+import logging
+import os
+from pathlib import Path
+
+import numpy as np
+import tomli
+from dotenv import load_dotenv
+
+from wikisearch.db.database_connection import DatabaseConnectionService
+from wikisearch.document.metadata_table import DocumentMetadataTable
+
+# Appends the title and URL of every document missing from the metadata table.
+# The crawlers append the documents they save, so this is needed once for an existing
+# database, or after documents were inserted some other way.
+
+BATCH_SIZE = 10000
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    logger = logging.getLogger('WikiSearch')
+
+    path_to_config = Path("./config.toml")
+    with open(path_to_config, "rb") as f:
+        config = tomli.load(f)
+
+    load_dotenv()
+    DB_CONFIG = {
+        "host": os.getenv("DB_HOST"),
+        "user": os.getenv("DB_USER"),
+        "password": os.getenv("DB_PASSWORD"),
+        "database": os.getenv("DB_DATABASE"),
+    }
+
+    METADATA_CONFIG = {
+        "path": config["DocumentMetadata"].get("Path", "/data/WikiSearchData/Metadata"),
+    }
+
+    metadata_table = DocumentMetadataTable(Path(METADATA_CONFIG["path"]))
+    stored_ids = metadata_table.document_ids()
+
+    count = 0
+    with DatabaseConnectionService(DB_CONFIG) as connection:
+        cursor = connection.cursor()
+        cursor.execute("SELECT id, title, url FROM document")
+        while True:
+            rows = cursor.fetchmany(BATCH_SIZE)
+            if not rows:
+                break
+            ids = np.array([row[0] for row in rows], dtype=np.int64)
+            missing = ~np.isin(ids, stored_ids)
+            metadata_table.append_many(
+                [row for row, is_missing in zip(rows, missing) if is_missing])
+            count += int(missing.sum())
+        cursor.close()
+    metadata_table.close()
+    logger.info(f"Appended {count} documents to the metadata table")
@@ -0,0 +1,93 @@
+import logging
+import os
+import sys
+from pathlib import Path
+
+import tomli
+import tqdm
+import zstandard
+
+from wikisearch.db.document_codec import DocumentCodec
+from wikisearch.db.file_database import is_document_key, open_file_database
+
+# Compresses the documents of an existing LMDB store in place.
+# A zstd dictionary is trained on a sample of the documents first, unless the store already has one.
+# LMDB reuses the freed pages but never shrinks its file; pass a path to also write a compacted copy:
+# Usage: python scripts/compress_file_database.py [compacted_copy_path]
+
+BATCH_SIZE = 10000
+
+
+def sample_documents(lmdb_env, codec: DocumentCodec, num_samples: int):
+    """Texts of about num_samples documents spread evenly over the store."""
+    samples = []
+    with lmdb_env.begin(buffers=True) as txn:
+        step = max(1, txn.stat()["entries"] // num_samples)
+        for position, (key, value) in enumerate(txn.cursor()):
+            if position % step == 0 and is_document_key(key):
+                samples.append(codec.read(value))
+    return samples
+
+
+def needs_compression(codec: DocumentCodec, value) -> bool:
+    """Whether a value is plain text or compressed without the current dictionary."""
+    if not codec.is_compressed(value):
+        return True
+    dict_id = codec.dictionary.dict_id() if codec.dictionary is not None else 0
+    return zstandard.get_frame_parameters(value).dict_id != dict_id
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    logger = logging.getLogger('WikiSearch')
+
+    path_to_config = Path("./config.toml")
+    with open(path_to_config, "rb") as f:
+        config = tomli.load(f)
+
+    LMDB_CONFIG = {
+        "path": config["FileDatabase"].get("Path"),
+        "size": config["FileDatabase"].get("Size", 10**9),
+        "dictionary_size": config["FileDatabase"].get("DictionarySize", 112640),
+        "dictionary_samples": config["FileDatabase"].get("DictionarySamples", 10000),
+    }
+
+    lmdb_env = open_file_database(LMDB_CONFIG["path"], int(LMDB_CONFIG["size"]))
+    codec = DocumentCodec(lmdb_env)
+    if codec.dictionary is None:
+        samples = sample_documents(
+            lmdb_env, codec, int(LMDB_CONFIG["dictionary_samples"]))
+        codec.train_dictionary(samples, int(LMDB_CONFIG["dictionary_size"]))
+
+    def store(batch):
+        with lmdb_env.begin(write=True) as write_txn:
+            for key, value in batch:
+                write_txn.put(key, value)
+
+    count = 0
+    original_bytes = 0
+    compressed_bytes = 0
+    batch = []
+    with lmdb_env.begin(buffers=True) as txn:
+        for key, value in tqdm.tqdm(txn.cursor(), total=txn.stat()["entries"], unit='doc'):
+            if not is_document_key(key) or not needs_compression(codec, value):
+                continue
+            text = codec.read(value)
+            compressed = codec.compressor().compress(text)
+            original_bytes += len(text)
+            compressed_bytes += len(compressed)
+            batch.append((bytes(key), compressed))
+            if len(batch) >= BATCH_SIZE:
+                store(batch)
+                count += len(batch)
+                batch = []
+    store(batch)
+    count += len(batch)
+    logger.info(
+        f"Compressed {count} documents from {original_bytes} to {compressed_bytes} bytes")
+
+    if len(sys.argv) > 1:
+        os.makedirs(sys.argv[1], exist_ok=True)
+        lmdb_env.copy(sys.argv[1], compact=True)
+        logger.info(f"Wrote a compacted copy of the store to {sys.argv[1]}")
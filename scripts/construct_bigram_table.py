@@ -0,0 +1,60 @@
+import logging
+from pathlib import Path
+
+import numpy as np
+import tomli
+import tqdm
+
+from wikisearch.db.document_codec import DocumentCodec
+from wikisearch.db.file_database import is_document_key, open_file_database
+from wikisearch.spell.bigram_table import BigramTable
+from wikisearch.spell.symspell_checker import load_vocabulary
+from wikisearch.summary.term_offsets import WORD_PATTERN, sentences
+
+# Counts the pairs of adjacent words in every stored document, over the vocabulary of the
+# spell checker frequency list, for the context-aware spell checker.
+# Words outside the vocabulary and sentence ends break a pair.
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    logger = logging.getLogger('WikiSearch')
+
+    path_to_config = Path("./config.toml")
+    with open(path_to_config, "rb") as f:
+        config = tomli.load(f)
+
+    LMDB_CONFIG = {
+        "path": config["FileDatabase"].get("Path"),
+        "size": config["FileDatabase"].get("Size", 10**9)
+    }
+
+    SPELL_CONFIG = {
+        "frequency_path": config["SpellChecker"].get("FrequencyPath"),
+        "bigram_path": config["SpellChecker"].get("BigramPath"),
+        "bigram_min_count": config["SpellChecker"].get("BigramMinCount", 2),
+    }
+
+    _, _, word_ids = load_vocabulary(Path(SPELL_CONFIG["frequency_path"]))
+    lmdb_env = open_file_database(LMDB_CONFIG["path"], int(LMDB_CONFIG["size"]))
+    codec = DocumentCodec(lmdb_env)
+
+    def sequences():
+        with lmdb_env.begin(buffers=True) as txn:
+            for key, value in tqdm.tqdm(txn.cursor(), total=txn.stat()["entries"], unit='doc'):
+                if not is_document_key(key):
+                    continue
+                for sentence in sentences(codec.decode(value)):
+                    sequence = []
+                    for word in WORD_PATTERN.findall(sentence.lower()):
+                        word_id = word_ids.get(word)
+                        if word_id is None:
+                            yield np.array(sequence, dtype=np.int64)
+                            sequence = []
+                        else:
+                            sequence.append(word_id)
+                    yield np.array(sequence, dtype=np.int64)
+
+    count = BigramTable.build(Path(SPELL_CONFIG["bigram_path"]), sequences(),
+                              int(SPELL_CONFIG["bigram_min_count"]))
+    logger.info(f"Stored {count} word pairs in {SPELL_CONFIG['bigram_path']}")
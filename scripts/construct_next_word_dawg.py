@@ -1,46 +1,68 @@
-import os
+import logging
 from pathlib import Path
 
 import dawg
 import tomli
-from dotenv import load_dotenv
-
-from wikisearch.db.database_connection import DatabaseConnectionService
-
-path_to_config = Path("./config.toml")
-with open(path_to_config, "rb") as f:
-    config = tomli.load(f)
-
-AUTOCOMPLETION_CONFIG = {
-    "word-completion-dawg": config["Autocompletion"].get("WordCompletionDAWG"),
-    "next-word-dawg": config["Autocompletion"].get("NextWordDAWG"),
-}
-
-load_dotenv()
-DB_CONFIG = {
-    "host": os.getenv("DB_HOST"),
-    "user": os.getenv("DB_USER"),
-    "password": os.getenv("DB_PASSWORD"),
-    "database": os.getenv("DB_DATABASE"),
-}
-
-with DatabaseConnectionService(DB_CONFIG) as connection:
-    cursor = connection.cursor()
-    cursor.execute("""
-        SELECT CONCAT(LOWER(w1.token), ' ', LOWER(w2.token)) AS bigram, COUNT(*) AS frequency
-        FROM postings p1
-        JOIN postings p2 ON p1.document_id = p2.document_id AND p1.position = p2.position - 1
-        JOIN word w1 ON p1.word_id = w1.id
-        JOIN word w2 ON p2.word_id = w2.id
-        WHERE w1.token NOT IN (' ', '\n') AND w2.token NOT IN (' ', '\n')
-        GROUP BY bigram
-        ORDER BY frequency DESC
-    """)
-
-    bigrams = cursor.fetchall()
-    if bigrams:
-        bigram_dict = {bigram: frequency for bigram, frequency in bigrams}
-
-        # next_word_dawg = dawg.IntCompletionDAWG(bigram_dict.items())
-        next_word_dawg = dawg.CompletionDAWG([key for key,_ in bigram_dict.items()])
-        next_word_dawg.save(AUTOCOMPLETION_CONFIG["next-word-dawg"])
+import tqdm
+
+from wikisearch.autocomplete.ngram_counter import NGramCounter
+from wikisearch.autocomplete.scored_completions import ScoredCompletions
+from wikisearch.db.document_codec import DocumentCodec
+from wikisearch.db.file_database import is_document_key, open_file_database
+from wikisearch.summary.term_offsets import WORD_PATTERN, sentences
+
+# Counts the word bigrams and trigrams of every stored document and writes them with their
+# frequencies for next-word suggestions, one ScoredCompletions per n-gram order.
+# N-grams do not cross sentence ends.
+
+NGRAM_ORDERS = (2, 3)
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    logger = logging.getLogger('WikiSearch')
+
+    path_to_config = Path("./config.toml")
+    with open(path_to_config, "rb") as f:
+        config = tomli.load(f)
+
+    LMDB_CONFIG = {
+        "path": config["FileDatabase"].get("Path"),
+        "size": config["FileDatabase"].get("Size", 10**9)
+    }
+
+    AUTOCOMPLETION_CONFIG = {
+        "next-word-dawg": config["Autocompletion"].get("NextWordDAWG"),
+        "next-words": config["Autocompletion"].get("NextWords"),
+        "ngram-min-count": config["Autocompletion"].get("NGramMinCount", 2),
+        "ngram-buffer-size": config["Autocompletion"].get("NGramBufferSize", 5_000_000),
+    }
+
+    next_words_path = Path(AUTOCOMPLETION_CONFIG["next-words"])
+    lmdb_env = open_file_database(LMDB_CONFIG["path"], int(LMDB_CONFIG["size"]))
+    codec = DocumentCodec(lmdb_env)
+    counters = {order: NGramCounter(next_words_path / f"{order}-gram-runs",
+                                    int(AUTOCOMPLETION_CONFIG["ngram-buffer-size"]))
+                for order in NGRAM_ORDERS}
+
+    with lmdb_env.begin(buffers=True) as txn:
+        for key, value in tqdm.tqdm(txn.cursor(), total=txn.stat()["entries"], unit='doc'):
+            if not is_document_key(key):
+                continue
+            for sentence in sentences(codec.decode(value)):
+                words = WORD_PATTERN.findall(sentence.lower())
+                for order, counter in counters.items():
+                    counter.add(" ".join(words[i:i + order]) for i in range(len(words) - order + 1))
+
+    min_count = int(AUTOCOMPLETION_CONFIG["ngram-min-count"])
+    for order, counter in counters.items():
+        # the merged counts come sorted, so they are streamed to disk as they are read
+        count = ScoredCompletions.build_sorted(
+            next_words_path / f"{order}-grams", counter.items(min_count))
+        counter.close()
+        if order == 2:
+            # the bigram DAWG stays available as the unscored fallback of the service; its keys
+            # are read back in order from the completions just written instead of merging again
+            dawg.CompletionDAWG(ScoredCompletions(next_words_path / f"{order}-grams").keys(),
+                                input_is_sorted=True).save(AUTOCOMPLETION_CONFIG["next-word-dawg"])
+        logger.info(f"Stored {count} {order}-grams")
@@ -0,0 +1,32 @@
+import logging
+from pathlib import Path
+
+import tomli
+
+from wikisearch.autocomplete.scored_completions import ScoredCompletions
+from wikisearch.spell.symspell_checker import read_frequencies
+
+# Builds the frequency-ranked word completions from the word frequency list written by
+# wikisearch/spell/generate_dictionary_from_corpora.py.
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    logger = logging.getLogger('WikiSearch')
+
+    path_to_config = Path("./config.toml")
+    with open(path_to_config, "rb") as f:
+        config = tomli.load(f)
+
+    AUTOCOMPLETION_CONFIG = {
+        "word-completions": config["Autocompletion"].get("WordCompletions"),
+    }
+
+    SPELL_CONFIG = {
+        "frequency_path": config["SpellChecker"].get("FrequencyPath"),
+    }
+
+    count = ScoredCompletions.build(
+        Path(AUTOCOMPLETION_CONFIG["word-completions"]),
+        ((word.lower(), frequency) for word, frequency in read_frequencies(Path(SPELL_CONFIG["frequency_path"]))))
+    logger.info(f"Stored {count} word completions")
@@ -1,16 +1,18 @@
 import os
 from pathlib import Path
 
-import lmdb
 import tomli
 from dotenv import load_dotenv
 from elasticsearch import Elasticsearch
 
 from wikisearch.db.database_connection import DatabaseConnectionService
+from wikisearch.db.document_codec import DocumentCodec
+from wikisearch.db.file_database import open_file_database
 from wikisearch.eval.elastic.evaluator import BatchEvaluator
 
 
 def add_to_es_index(db_connection, lmdb_env, es_client, index_name):
+    codec = DocumentCodec(lmdb_env)
     cursor = db_connection.cursor()
     cursor.execute(
         """
@@ -19,7 +21,7 @@ def add_to_es_index(db_connection, lmdb_env, es_client, index_name):
     """)
     for doc_id, title in cursor.fetchall():
         with lmdb_env.begin(write=True) as txn:
-            text = txn.get(str(doc_id).encode()).decode()
+            text = codec.decode(txn.get(str(doc_id).encode()))
             es_client.index(index=index_name, id=doc_id, document={
                             "title": title, "content": text})
 
@@ -60,7 +62,7 @@ if __name__ == "__main__":
     }
 
     es_client = Elasticsearch(EVAL_CONFIG["es_host"], basic_auth=("elastic", "22092001"));
-    lmdb_env = lmdb.open(LMDB_CONFIG["path"], map_size=int(LMDB_CONFIG["size"]))
+    lmdb_env = open_file_database(LMDB_CONFIG["path"], int(LMDB_CONFIG["size"]))
 
     with DatabaseConnectionService(DB_CONFIG) as connection:
         # if not es_client.indices.exists(index=EVAL_CONFIG["es_index"]):
@@ -0,0 +1,117 @@
+import logging
+import os
+import sys
+from pathlib import Path
+
+import tomli
+from dotenv import load_dotenv
+
+from wikisearch.db.database_connection import DatabaseConnectionService
+from wikisearch.db.file_database import open_file_database
+from wikisearch.eval.elastic.query_generator import QueryGenerator
+from wikisearch.eval.embeddings.recall_evaluator import RecallEvaluator
+from wikisearch.index.embedding_store import EmbeddingStore
+from wikisearch.index.embeddings_generator import EmbeddingsGenerator
+from wikisearch.index.faiss_semantic_index import FAISSIndexService
+from wikisearch.index.flat_semantic_index import FlatIndexService
+from wikisearch.index.sharded_usearch_index import ShardedUSearchIndexService
+from wikisearch.index.usearch_semantic_index import USearchIndexService
+
+# Measures the recall of a vector index against exact search over the embedding store.
+# Usage: python scripts/evaluate_ann_recall.py [usearch|faiss]
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    index_type = sys.argv[1] if len(sys.argv) > 1 else "usearch"
+
+    load_dotenv()
+    DB_CONFIG = {
+        "host": os.getenv("DB_HOST"),
+        "user": os.getenv("DB_USER"),
+        "password": os.getenv("DB_PASSWORD"),
+        "database": os.getenv("DB_DATABASE"),
+    }
+
+    path_to_config = Path("./config.toml")
+    with open(path_to_config, "rb") as f:
+        config = tomli.load(f)
+
+    USEARCH_CONFIG = {
+        "path": config["USearchIndex"].get("Path", "/data/WikiSearchData/SemanticIndex/index.usearch"),
+        "dimension": config["USearchIndex"].get("Dimension", 768),
+        "shards": config["USearchIndex"].get("Shards", 1),
+    }
+
+    FAISS_CONFIG = {
+        "path": config["FAISSIndex"].get("Path", "/data/WikiSearchData/SemanticIndex/index.faiss"),
+        "dimension": config["FAISSIndex"].get("Dimension", 768),
+        "M": config["FAISSIndex"].get("M", 32),
+        "ef_search": config["FAISSIndex"].get("EfSearch", 50),
+        "index_type": config["FAISSIndex"].get("IndexType", "hnsw"),
+        "nlist": config["FAISSIndex"].get("NList", 4096),
+        "pq_m": config["FAISSIndex"].get("PQM", 64),
+        "pq_nbits": config["FAISSIndex"].get("PQBits", 8),
+        "nprobe": config["FAISSIndex"].get("NProbe", 16),
+        "rerank_factor": config["FAISSIndex"].get("RerankFactor", 0),
+    }
+
+    EMBEDDING_STORE_CONFIG = {
+        "path": config["EmbeddingStore"].get("Path", "/data/WikiSearchData/SemanticIndex/embeddings"),
+    }
+
+    SEMANTIC_CONFIG = {
+        "flat_block_size": config["SemanticSearch"].get("FlatBlockSize", 16384),
+    }
+
+    EVAL_CONFIG = {
+        "num_queries": config["Evaluator"].get("RecallQueries", 100),
+        "results_per_query": config["Evaluator"].get("ResultsPerQuery", 20),
+        "recall_metrics": config["Evaluator"].get(
+            "RecallMetrics", "/data/WikiSearchData/Stats/recall_metrics.json"),
+    }
+
+    LMDB_CONFIG = {
+        "path": config["FileDatabase"].get("Path"),
+        "size": config["FileDatabase"].get("Size", 10**9)
+    }
+
+    lmdb_env = open_file_database(LMDB_CONFIG["path"], int(LMDB_CONFIG["size"]))
+
+    with DatabaseConnectionService(DB_CONFIG) as connection:
+        queries = QueryGenerator(connection, lmdb_env).get_random_article_titles(
+            int(EVAL_CONFIG["num_queries"]))
+
+    embeddings_generator = EmbeddingsGenerator(int(USEARCH_CONFIG["dimension"]))
+    embedding_store = EmbeddingStore(
+        Path(EMBEDDING_STORE_CONFIG["path"]), int(USEARCH_CONFIG["dimension"]), read_only=True)
+    oracle = FlatIndexService(
+        embedding_store, embeddings_generator, int(SEMANTIC_CONFIG["flat_block_size"]))
+
+    if index_type == "faiss":
+        candidate = FAISSIndexService(
+            Path(FAISS_CONFIG["path"]), int(FAISS_CONFIG["dimension"]), None,
+            hnsw_M=int(FAISS_CONFIG["M"]), embeddings_generator=embeddings_generator,
+            embedding_store=embedding_store,
+            ef_search=int(FAISS_CONFIG["ef_search"]),
+            index_type=FAISS_CONFIG["index_type"],
+            nlist=int(FAISS_CONFIG["nlist"]),
+            pq_m=int(FAISS_CONFIG["pq_m"]),
+            pq_nbits=int(FAISS_CONFIG["pq_nbits"]),
+            nprobe=int(FAISS_CONFIG["nprobe"]),
+            rerank_factor=int(FAISS_CONFIG["rerank_factor"]))
+    elif index_type == "usearch" and int(USEARCH_CONFIG["shards"]) > 1:
+        candidate = ShardedUSearchIndexService(
+            Path(USEARCH_CONFIG["path"]), int(USEARCH_CONFIG["dimension"]),
+            int(USEARCH_CONFIG["shards"]), embeddings_generator=embeddings_generator)
+    elif index_type == "usearch":
+        candidate = USearchIndexService(
+            Path(USEARCH_CONFIG["path"]), int(USEARCH_CONFIG["dimension"]),
+            embeddings_generator=embeddings_generator)
+    else:
+        raise ValueError(f"Unknown index type '{index_type}'")
+
+    evaluator = RecallEvaluator(oracle, candidate,
+                                int(EVAL_CONFIG["results_per_query"]),
+                                Path(EVAL_CONFIG["recall_metrics"]))
+    evaluator.run_evaluation(queries)
@@ -0,0 +1,93 @@
+import os
+from pathlib import Path
+
+import tomli
+from dotenv import load_dotenv
+
+from wikisearch.db.database_connection import DatabaseConnectionService
+from wikisearch.db.document_codec import DocumentCodec
+from wikisearch.db.file_database import open_file_database
+from wikisearch.eval.elastic.query_generator import QueryGenerator
+from wikisearch.eval.embeddings.backend_evaluator import BackendEvaluator
+from wikisearch.index.embeddings_generator import EmbeddingsGenerator
+
+
+def sample_documents(db_connection, lmdb_env, n):
+    cursor = db_connection.cursor()
+    cursor.execute("""
+        SELECT id FROM document
+        WHERE id IN (SELECT * FROM usearch)
+        ORDER BY RAND()
+        LIMIT %s
+    """, (n, ))
+    codec = DocumentCodec(lmdb_env)
+    documents = []
+    with lmdb_env.begin() as txn:
+        for (doc_id, ) in cursor.fetchall():
+            body = txn.get(str(doc_id).encode())
+            if body:
+                documents.append(codec.decode(body))
+    return documents
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    DB_CONFIG = {
+        "host": os.getenv("DB_HOST"),
+        "user": os.getenv("DB_USER"),
+        "password": os.getenv("DB_PASSWORD"),
+        "database": os.getenv("DB_DATABASE"),
+    }
+
+    path_to_config = Path("./config.toml")
+    with open(path_to_config, "rb") as f:
+        config = tomli.load(f)
+
+    EMBEDDINGS_CONFIG = {
+        "backend": config["Embeddings"].get("Backend", "torch"),
+        "onnx_file_name": config["Embeddings"].get("OnnxFileName") or None,
+        "segment_length": config["Embeddings"].get("SegmentLength", 512),
+        "segment_by_tokens": config["Embeddings"].get("SegmentByTokens", False),
+        "segment_overlap": config["Embeddings"].get("SegmentOverlap", 0),
+        "dimension": config["USearchIndex"].get("Dimension", 768),
+    }
+
+    EVAL_CONFIG = {
+        "num_documents": config["Evaluator"].get("BackendDocuments", 200),
+        "num_queries": config["Evaluator"].get("BackendQueries", 100),
+        "results_per_query": config["Evaluator"].get("ResultsPerQuery", 20),
+        "backend_metrics": config["Evaluator"].get(
+            "BackendMetrics", "/data/WikiSearchData/Stats/backend_metrics.json"),
+    }
+
+    LMDB_CONFIG = {
+        "path": config["FileDatabase"].get("Path"),
+        "size": config["FileDatabase"].get("Size", 10**9)
+    }
+
+    lmdb_env = open_file_database(LMDB_CONFIG["path"], int(LMDB_CONFIG["size"]))
+
+    with DatabaseConnectionService(DB_CONFIG) as connection:
+        documents = sample_documents(
+            connection, lmdb_env, int(EVAL_CONFIG["num_documents"]))
+        queries = QueryGenerator(connection, lmdb_env).get_random_article_titles(
+            int(EVAL_CONFIG["num_queries"]))
+
+    reference = EmbeddingsGenerator(
+        int(EMBEDDINGS_CONFIG["dimension"]),
+        int(EMBEDDINGS_CONFIG["segment_length"]),
+        backend="torch",
+        segment_by_tokens=bool(EMBEDDINGS_CONFIG["segment_by_tokens"]),
+        segment_overlap=int(EMBEDDINGS_CONFIG["segment_overlap"]))
+    candidate = EmbeddingsGenerator(
+        int(EMBEDDINGS_CONFIG["dimension"]),
+        int(EMBEDDINGS_CONFIG["segment_length"]),
+        backend=EMBEDDINGS_CONFIG["backend"],
+        onnx_file_name=EMBEDDINGS_CONFIG["onnx_file_name"],
+        segment_by_tokens=bool(EMBEDDINGS_CONFIG["segment_by_tokens"]),
+        segment_overlap=int(EMBEDDINGS_CONFIG["segment_overlap"]))
+
+    evaluator = BackendEvaluator(reference, candidate,
+                                 int(EVAL_CONFIG["results_per_query"]),
+                                 Path(EVAL_CONFIG["backend_metrics"]))
+    evaluator.run_evaluation(documents, queries)
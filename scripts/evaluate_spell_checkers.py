@@ -0,0 +1,49 @@
+import logging
+from pathlib import Path
+
+import tomli
+
+from wikisearch.eval.spell.spell_evaluator import SpellEvaluator
+from wikisearch.spell.hunspell_checker import HunSpellChecker
+from wikisearch.spell.symspell_checker import SymSpellChecker, read_frequencies
+
+# Measures the per-word latency and accuracy of the Hunspell and SymSpell backends
+# on corpus words with one random typo each.
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    path_to_config = Path("./config.toml")
+    with open(path_to_config, "rb") as f:
+        config = tomli.load(f)
+
+    SPELL_CONFIG = {
+        "aff": config["SpellChecker"].get("AffPath"),
+        "dic": config["SpellChecker"].get("DicPath"),
+        "frequency_path": config["SpellChecker"].get("FrequencyPath"),
+        "symspell_index_path": config["SpellChecker"].get("SymSpellIndexPath"),
+        "max_edit_distance": config["SpellChecker"].get("MaxEditDistance", 2),
+        "prefix_length": config["SpellChecker"].get("PrefixLength", 7),
+    }
+
+    EVAL_CONFIG = {
+        "num_queries": config["Evaluator"].get("SpellQueries", 1000),
+        "spell_metrics": config["Evaluator"].get(
+            "SpellMetrics", "/data/WikiSearchData/Stats/spell_metrics.json"),
+    }
+
+    checkers = {
+        # without the vocabulary fast path, to measure Hunspell itself
+        "hunspell": HunSpellChecker(Path(SPELL_CONFIG["aff"]), Path(SPELL_CONFIG["dic"])),
+        "symspell": SymSpellChecker(
+            Path(SPELL_CONFIG["frequency_path"]),
+            Path(SPELL_CONFIG["symspell_index_path"]) if SPELL_CONFIG["symspell_index_path"] else None,
+            int(SPELL_CONFIG["max_edit_distance"]),
+            int(SPELL_CONFIG["prefix_length"])),
+    }
+
+    words = [word for word, _ in read_frequencies(Path(SPELL_CONFIG["frequency_path"]))]
+    pairs = SpellEvaluator.sample_pairs(words, int(EVAL_CONFIG["num_queries"]))
+    evaluator = SpellEvaluator(checkers, Path(EVAL_CONFIG["spell_metrics"]))
+    evaluator.run_evaluation(pairs)
@@ -2,12 +2,13 @@ import logging
 import os
 from pathlib import Path
 
-import lmdb
 import tomli
 from dotenv import load_dotenv
 
 from wikisearch.crawler.wiki_processor import WikipediaProcessor
 from wikisearch.db.database_connection import DatabaseConnectionService
+from wikisearch.db.file_database import open_file_database
+from wikisearch.document.metadata_table import DocumentMetadataTable
 
 if __name__ == "__main__":
     logging.basicConfig(
@@ -30,6 +31,10 @@ if __name__ == "__main__":
         "size": int(config["FileDatabase"].get("Size", 10**9))
     }
 
+    METADATA_CONFIG = {
+        "path": config["DocumentMetadata"].get("Path", "/data/WikiSearchData/Metadata"),
+    }
+
     PROCESSOR_CONFIG = {
         "path": config["WikipediaProcessor"].get("Path", "bgwiki-20250120-pages-articles.xml"),
         "seed_urls": config["Crawler"].get("SeedURLs", "root"),
@@ -37,11 +42,10 @@ if __name__ == "__main__":
     }
 
     db_connection_service = DatabaseConnectionService(DB_CONFIG)
-    if not os.path.exists(LMDB_CONFIG["path"]):
-        os.makedirs(LMDB_CONFIG["path"])
-    lmdb_env = lmdb.open(LMDB_CONFIG["path"], map_size=LMDB_CONFIG["size"])
+    lmdb_env = open_file_database(LMDB_CONFIG["path"], LMDB_CONFIG["size"])
 
     with DatabaseConnectionService(DB_CONFIG) as connection:
         processor = WikipediaProcessor(
-            connection, lmdb_env, None, Path(PROCESSOR_CONFIG["path"]), PROCESSOR_CONFIG["crawl_limit"])
+            connection, lmdb_env, None, Path(PROCESSOR_CONFIG["path"]), PROCESSOR_CONFIG["crawl_limit"],
+            DocumentMetadataTable(Path(METADATA_CONFIG["path"])))
         processor.process_dump()
@@ -3,12 +3,14 @@ import os
 from concurrent.futures import ThreadPoolExecutor, wait
 from pathlib import Path
 
-import lmdb
 import tomli
 from dotenv import load_dotenv
 from tqdm import tqdm
 
 from wikisearch.db.database_connection import DatabaseConnectionService
+from wikisearch.db.document_codec import DocumentCodec
+from wikisearch.db.file_database import open_file_database
+from wikisearch.index.embedding_store import EmbeddingStore
 from wikisearch.index.faiss_semantic_index import FAISSIndexService
 from wikisearch.index.inverted_index import InvertedIndexService
 from wikisearch.index.usearch_semantic_index import USearchIndexService
@@ -18,6 +20,10 @@ def store_document_in_usearch(usearch_index, doc_id, body):
     usearch_index.store_document(doc_id, body)
 
 
+def store_documents_in_usearch(usearch_index, documents):
+    usearch_index.store_documents(documents)
+
+
 def store_document_in_faiss(faiss_index, doc_id, body):
     faiss_index.store_document(doc_id, body)
 
@@ -53,18 +59,25 @@ if __name__ == "__main__":
         "dimension": config["USearchIndex"].get("Dimension", 768)
     }
 
+    EMBEDDING_STORE_CONFIG = {
+        "path": config["EmbeddingStore"].get("Path", "/data/WikiSearchData/SemanticIndex/embeddings"),
+    }
+
     FAISS_CONFIG = {
         "path": config["FAISSIndex"].get("Path", "/data/WikiSearchData/SemanticIndex/index.faiss"),
         "dimension": config["FAISSIndex"].get("Dimension", 768)
     }
 
-    if not os.path.exists(LMDB_CONFIG["path"]):
-        os.makedirs(LMDB_CONFIG["path"])
-    lmdb_env = lmdb.open(LMDB_CONFIG["path"], map_size=LMDB_CONFIG["size"])
+    lmdb_env = open_file_database(LMDB_CONFIG["path"], LMDB_CONFIG["size"])
+    codec = DocumentCodec(lmdb_env)
 
     with DatabaseConnectionService(DB_CONFIG) as connection:
-        # usearch_semantic_index = USearchIndexService(
-        # Path(USEARCH_CONFIG["path"]), int(USEARCH_CONFIG["dimension"]))
+        # embeddings are persisted, so the vector indexes can be rebuilt without re-encoding
+        embedding_store = EmbeddingStore(
+            Path(EMBEDDING_STORE_CONFIG["path"]), int(USEARCH_CONFIG["dimension"]))
+        usearch_semantic_index = USearchIndexService(
+            Path(USEARCH_CONFIG["path"]), int(USEARCH_CONFIG["dimension"]),
+            embedding_store=embedding_store)
         # faiss_semantic_index = FAISSIndexService(
             # Path(FAISS_CONFIG["path"]), int(FAISS_CONFIG["dimension"]), connection)
         inverted_index = InvertedIndexService(connection)
@@ -76,12 +89,15 @@ if __name__ == "__main__":
         cursor.execute(
             "SELECT id, title FROM document WHERE id IN (SELECT document_id FROM usearch)")
         # cursor.execute("SELECT id, title FROM document")
+        # documents are embedded in batches, so segments of similar length share padding
+        pending_documents = []
+        batch_size = 64
         # with ThreadPoolExecutor() as executor:
         for doc_id, title in tqdm(cursor.fetchall(), total=total_docs, desc="Indexing documents"):
             with lmdb_env.begin(write=True) as txn:
                 body = txn.get(str(doc_id).encode())
             if body:
-                body = body.decode('utf-8')
+                body = codec.decode(body)
                 body = "\n".join(
                     line for line in body.splitlines()
                     if line.strip() and not line.startswith("Категория:")
@@ -94,9 +110,14 @@ if __name__ == "__main__":
                 #     executor.submit(store_document_in_inverted,
                 #                     inverted_index, doc_id, title, body)
                 # ]
-                # store_document_in_usearch(usearch_semantic_index, doc_id, body)
+                pending_documents.append((doc_id, body))
+                if len(pending_documents) >= batch_size:
+                    store_documents_in_usearch(usearch_semantic_index, pending_documents)
+                    pending_documents = []
                 # cursor.execute("INSERT INTO usearch (document_id) VALUES (%s)", (doc_id,))
                 # connection.commit()
                 store_document_in_inverted(inverted_index, doc_id, title, body)
                 # store_document_in_faiss(faiss_semantic_index, doc_id, body)
                 # wait(futures)
+        if pending_documents:
+            store_documents_in_usearch(usearch_semantic_index, pending_documents)
@@ -0,0 +1,54 @@
+import logging
+from pathlib import Path
+
+import tomli
+import tqdm
+
+from wikisearch.db.file_database import is_document_key, open_file_database
+from wikisearch.summary.summary_service import SummaryService
+from wikisearch.summary.term_offsets import encode_term_offsets
+
+# Computes the static summary and the term offsets of every stored document once, so that
+# result hydration reads a few hundred bytes per result instead of the whole article.
+# Documents ingested afterwards get their summary when they are saved.
+
+BATCH_SIZE = 10000
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    logger = logging.getLogger('WikiSearch')
+
+    path_to_config = Path("./config.toml")
+    with open(path_to_config, "rb") as f:
+        config = tomli.load(f)
+
+    LMDB_CONFIG = {
+        "path": config["FileDatabase"].get("Path"),
+        "size": config["FileDatabase"].get("Size", 10**9)
+    }
+
+    lmdb_env = open_file_database(LMDB_CONFIG["path"], int(LMDB_CONFIG["size"]))
+    summarizer = SummaryService(lmdb_env, writable=True)
+
+    def store(batch):
+        with lmdb_env.begin(write=True) as write_txn:
+            for key, summary, term_offsets in batch:
+                write_txn.put(key, summary.encode(), db=summarizer.summaries_db)
+                write_txn.put(key, term_offsets, db=summarizer.term_offsets_db)
+
+    count = 0
+    batch = []
+    with lmdb_env.begin(buffers=True) as txn:
+        for key, value in tqdm.tqdm(txn.cursor(), total=txn.stat()["entries"], unit='doc'):
+            if not is_document_key(key):
+                continue
+            text = summarizer.codec.decode(value)
+            batch.append((bytes(key), summarizer.static_summary(text), encode_term_offsets(text)))
+            if len(batch) >= BATCH_SIZE:
+                store(batch)
+                count += len(batch)
+                batch = []
+    store(batch)
+    count += len(batch)
+    logger.info(f"Stored summaries of {count} documents")
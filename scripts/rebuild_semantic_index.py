@@ -0,0 +1,105 @@
+import logging
+import os
+import sys
+from pathlib import Path
+
+import tomli
+
+from wikisearch.index.embedding_store import EmbeddingStore
+from wikisearch.index.embeddings_generator import EmbeddingsGenerator
+from wikisearch.index.faiss_semantic_index import FAISSIndexService
+from wikisearch.index.sharded_usearch_index import ShardedUSearchIndexService
+from wikisearch.index.usearch_semantic_index import USearchIndexService
+
+# Rebuilds a vector index from the persisted segment embeddings, without re-encoding the corpus.
+# Usage: python scripts/rebuild_semantic_index.py [usearch|faiss]
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    logger = logging.getLogger('WikiSearch')
+    index_type = sys.argv[1] if len(sys.argv) > 1 else "usearch"
+
+    path_to_config = Path("./config.toml")
+    with open(path_to_config, "rb") as f:
+        config = tomli.load(f)
+
+    USEARCH_CONFIG = {
+        "path": config["USearchIndex"].get("Path", "/data/WikiSearchData/SemanticIndex/index.usearch"),
+        "dimension": config["USearchIndex"].get("Dimension", 768),
+        "shards": config["USearchIndex"].get("Shards", 1),
+    }
+
+    FAISS_CONFIG = {
+        "path": config["FAISSIndex"].get("Path", "/data/WikiSearchData/SemanticIndex/index.faiss"),
+        "dimension": config["FAISSIndex"].get("Dimension", 768),
+        "M": config["FAISSIndex"].get("M", 32),
+        "ef_search": config["FAISSIndex"].get("EfSearch", 50),
+        "index_type": config["FAISSIndex"].get("IndexType", "hnsw"),
+        "nlist": config["FAISSIndex"].get("NList", 4096),
+        "pq_m": config["FAISSIndex"].get("PQM", 64),
+        "pq_nbits": config["FAISSIndex"].get("PQBits", 8),
+        "nprobe": config["FAISSIndex"].get("NProbe", 16),
+        "training_samples": config["FAISSIndex"].get("TrainingSamples", 262144),
+        "rerank_factor": config["FAISSIndex"].get("RerankFactor", 0),
+    }
+
+    EMBEDDING_STORE_CONFIG = {
+        "path": config["EmbeddingStore"].get("Path", "/data/WikiSearchData/SemanticIndex/embeddings"),
+    }
+
+    # read-only, so a crawler or indexer appending to the store at the same time is not truncated
+    embedding_store = EmbeddingStore(
+        Path(EMBEDDING_STORE_CONFIG["path"]), int(USEARCH_CONFIG["dimension"]), read_only=True)
+    # a rebuild never encodes text, so the model is never loaded
+    embeddings_generator = EmbeddingsGenerator(
+        int(USEARCH_CONFIG["dimension"]), load_model=False)
+
+    if index_type == "faiss":
+        target = Path(FAISS_CONFIG["path"])
+    elif index_type == "usearch":
+        target = Path(USEARCH_CONFIG["path"])
+    else:
+        raise ValueError(f"Unknown index type '{index_type}'")
+
+    # build next to the live index and swap it in once complete; a leftover from an
+    # interrupted rebuild would be loaded and get every vector a second time
+    rebuild_path = target.with_name(target.name + ".rebuild")
+    rebuild_path.unlink(missing_ok=True)
+    for shard_id in range(int(USEARCH_CONFIG["shards"])):
+        rebuild_path.with_name(f"{rebuild_path.name}.shard{shard_id}").unlink(missing_ok=True)
+
+    if index_type == "faiss":
+        index = FAISSIndexService(
+            rebuild_path, int(FAISS_CONFIG["dimension"]), None,
+            hnsw_M=int(FAISS_CONFIG["M"]), embeddings_generator=embeddings_generator,
+            ef_search=int(FAISS_CONFIG["ef_search"]),
+            index_type=FAISS_CONFIG["index_type"],
+            nlist=int(FAISS_CONFIG["nlist"]),
+            pq_m=int(FAISS_CONFIG["pq_m"]),
+            pq_nbits=int(FAISS_CONFIG["pq_nbits"]),
+            nprobe=int(FAISS_CONFIG["nprobe"]))
+        # compressed indexes learn their quantizers from a sample of the stored vectors
+        index.train_from_store(
+            embedding_store, int(FAISS_CONFIG["training_samples"]))
+        index.load_from_store(embedding_store)
+    elif int(USEARCH_CONFIG["shards"]) > 1:
+        index = ShardedUSearchIndexService(
+            rebuild_path, int(USEARCH_CONFIG["dimension"]), int(USEARCH_CONFIG["shards"]),
+            embeddings_generator=embeddings_generator)
+        # shards are built in parallel, one thread each
+        index.load_from_store(embedding_store)
+    else:
+        index = USearchIndexService(
+            rebuild_path, int(USEARCH_CONFIG["dimension"]),
+            embeddings_generator=embeddings_generator)
+        index.load_from_store(embedding_store)
+
+    if isinstance(index, ShardedUSearchIndexService):
+        for shard_id in range(index.num_shards):
+            os.replace(index.shard_path(shard_id),
+                       target.with_name(f"{target.name}.shard{shard_id}"))
+    else:
+        os.replace(rebuild_path, target)
+    index.path_to_index = target
+    logger.info(f"Rebuilt {index_type} index at {target}")
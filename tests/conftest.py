@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+DIMENSION = 16
+
+
+class QueryEmbeddings:
+    """Stands in for the sentence-transformer model, embedding every query as a fixed vector."""
+
+    def __init__(self, embedding: np.ndarray):
+        self.embedding = embedding
+
+    def str_to_embedding(self, query: str) -> np.ndarray:
+        return self.embedding[None, :]
+
+
+def normalized(vectors: np.ndarray) -> np.ndarray:
+    return (vectors / np.linalg.norm(vectors, axis=-1, keepdims=True)).astype(np.float32)
+
+
+@pytest.fixture
+def dimension():
+    return DIMENSION
+
+
+@pytest.fixture
+def query_embeddings():
+    return QueryEmbeddings
+
+
+@pytest.fixture
+def documents():
+    """Normalized segment vectors of a few documents, by document id."""
+    rng = np.random.default_rng(0)
+    return {doc_id: normalized(rng.normal(size=(num_segments, DIMENSION)))
+            for doc_id, num_segments in ((1, 4), (2, 3), (3, 1), (4, 5), (5, 2), (6, 3))}
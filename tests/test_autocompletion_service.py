@@ -0,0 +1,50 @@
+import pytest
+
+dawg = pytest.importorskip("dawg")
+
+from wikisearch.autocomplete.autocompletion_service import AutocompletionService  # noqa: E402
+from wikisearch.autocomplete.scored_completions import ScoredCompletions  # noqa: E402
+
+WORDS = {"котка": 5, "котел": 9, "кон": 1, "черна": 4, "много": 3}
+BIGRAMS = {"черна котка": 3, "черна кола": 9, "бяла котка": 4, "котка спи": 6, "котел ври": 2}
+TRIGRAMS = {"много черна котка": 5}
+
+
+@pytest.fixture(params=[True, False], ids=["scored", "dawg"])
+def service(request, tmp_path):
+    dawg.CompletionDAWG(WORDS).save(str(tmp_path / "word-completion.dawg"))
+    dawg.CompletionDAWG(BIGRAMS).save(str(tmp_path / "next-word.dawg"))
+    if not request.param:
+        return AutocompletionService(str(tmp_path / "word-completion.dawg"),
+                                     str(tmp_path / "next-word.dawg"), 5)
+    ScoredCompletions.build(tmp_path / "word-completions", WORDS.items())
+    ScoredCompletions.build(tmp_path / "next-words" / "2-grams", BIGRAMS.items())
+    ScoredCompletions.build(tmp_path / "next-words" / "3-grams", TRIGRAMS.items())
+    return AutocompletionService(str(tmp_path / "word-completion.dawg"),
+                                 str(tmp_path / "next-word.dawg"), 5,
+                                 str(tmp_path / "word-completions"), str(tmp_path / "next-words"))
+
+
+def test_single_word_prefix_is_filled_with_word_pairs(service):
+    suggestions = service.suggest("кот")
+    assert sorted(suggestions[:2]) == ["котел", "котка"]
+    assert sorted(suggestions[2:]) == ["котел ври", "котка спи"]
+    if service.next_words is not None:
+        assert suggestions == ["котел", "котка", "котка спи", "котел ври"]
+
+
+def test_single_word_next_words(service):
+    assert sorted(service.suggest_next_words("кот")) == ["котел ври", "котка спи"]
+    assert service.suggest_next_words("") == []
+
+
+def test_next_words_follow_the_last_word(service):
+    assert sorted(service.suggest("черна ")) == ["черна кола", "черна котка"]
+    assert service.suggest_next_words("черна ко", 1)[0] in ("черна кола", "черна котка")
+
+
+def test_next_words_prefer_trigram_continuations(service):
+    if service.next_words is None:
+        pytest.skip("the DAWG has no frequencies")
+    assert service.suggest("много черна ") == ["черна котка", "черна кола"]
+    assert service.suggest("черна ") == ["черна кола", "черна котка"]
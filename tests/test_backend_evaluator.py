@@ -0,0 +1,18 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("sentence_transformers")
+
+from wikisearch.eval.embeddings.backend_evaluator import top_k_documents  # noqa: E402
+
+
+def test_top_k_documents_skips_documents_without_segments():
+    # documents 0 and 3 have no segments; document 1 has two, document 2 one
+    segments = np.array([[1.0, 0.0], [0.0, 1.0], [0.6, 0.8]], dtype=np.float32)
+    starts = np.array([0, 2])
+    ids = np.array([1, 2])
+    queries = np.array([[0.0, 1.0], [1.0, 0.0]], dtype=np.float32)
+
+    assert top_k_documents(queries, segments, starts, ids, 1) == [{1}, {1}]
+    assert top_k_documents(queries, segments, starts, ids, 5) == [{1, 2}, {1, 2}]
+    assert top_k_documents(queries, segments[:0], starts[:0], ids[:0], 3) == [set(), set()]
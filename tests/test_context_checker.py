@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from wikisearch.spell.bigram_table import BigramTable
+from wikisearch.spell.context_checker import ContextSpellChecker
+from wikisearch.spell.symspell_checker import SymSpellChecker
+
+# word ids are the lines of the frequency list
+WORDS = {"бяла": 50, "вода": 100, "рода": 100, "студена": 80}
+BIAL, VODA, RODA, STUDENA = range(4)
+
+
+@pytest.fixture
+def symspell(tmp_path):
+    path = tmp_path / "frequencies.txt"
+    path.write_text("".join(f"{word}\t{count}\n" for word, count in WORDS.items()), encoding="utf-8")
+    return SymSpellChecker(path)
+
+
+@pytest.fixture
+def bigrams(tmp_path):
+    sentences = [np.array([BIAL, RODA])] * 40 + [np.array([STUDENA, VODA, BIAL])] * 30
+    BigramTable.build(tmp_path / "bigrams", sentences, buffer_size=16)
+    return BigramTable(tmp_path / "bigrams")
+
+
+def test_bigram_table_counts_adjacent_pairs(tmp_path):
+    sentences = [np.array([0, 1, 2]), np.array([1, 2]), np.array([3]), np.array([2, 0, 1])]
+    assert BigramTable.build(tmp_path / "all", sentences, buffer_size=2) == 3
+    assert BigramTable.build(tmp_path / "frequent", sentences, min_count=2, buffer_size=2) == 2
+
+    table = BigramTable(tmp_path / "all")
+    counts = table.lookup(np.array([0, 1, 2, 1, 3]), np.array([1, 2, 0, 0, 1]))
+    assert counts.tolist() == [2, 2, 1, 0, 0]
+    assert BigramTable(tmp_path / "frequent").lookup(np.array([0, 2]), np.array([1, 0])).tolist() == [2, 0]
+    assert BigramTable(tmp_path / "missing").lookup(np.array([0]), np.array([1])).tolist() == [0]
+
+
+def test_typo_is_corrected_to_the_word_that_fits_its_neighbours(symspell, bigrams):
+    checker = ContextSpellChecker(symspell, bigrams, error_probability=0.3)
+
+    assert checker.spellcheck("бяла рада") == "бяла рода"
+    # "вода" is one edit away and "рода" two, but only "рода" follows "бяла" in the corpus
+    assert checker.spellcheck("бяла вада") == "бяла рода"
+    assert checker.spellcheck("вада") == "вода"
+
+
+def test_known_words_and_unknown_tokens(symspell, bigrams):
+    checker = ContextSpellChecker(symspell, bigrams, error_probability=0.3)
+
+    # a correctly spelled word is replaced if a neighbour strongly suggests another one
+    assert checker.spellcheck("бяла вода") == "бяла рода"
+    assert checker.spellcheck("вода") == "вода"
+    assert checker.spellcheck("2024 вода") == "2024 вода"
+    assert checker.check_and_correct([]) == []
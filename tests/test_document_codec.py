@@ -0,0 +1,51 @@
+import pytest
+
+pytest.importorskip("lmdb")
+pytest.importorskip("zstandard")
+
+from wikisearch.db.document_codec import DocumentCodec  # noqa: E402
+from wikisearch.db.file_database import open_file_database  # noqa: E402
+
+TEXTS = [f"Статия номер {i} за София, България и Балканския полуостров. " * (i % 5 + 1)
+         for i in range(200)]
+
+
+@pytest.fixture
+def lmdb_env(tmp_path):
+    env = open_file_database(str(tmp_path / "lmdb"), 10**8)
+    yield env
+    env.close()
+
+
+def test_plain_values_are_read_as_is(lmdb_env):
+    codec = DocumentCodec(lmdb_env)
+    value = TEXTS[0].encode("utf-8")
+
+    assert not codec.is_compressed(value)
+    assert codec.decode(value) == TEXTS[0]
+    assert codec.read_prefix(memoryview(value), 10) == value[:10]
+
+
+@pytest.mark.parametrize("with_dictionary", [False, True])
+def test_compressed_round_trip(lmdb_env, with_dictionary):
+    codec = DocumentCodec(lmdb_env)
+    if with_dictionary:
+        codec.train_dictionary([text.encode("utf-8") for text in TEXTS], size=4096)
+
+    for text in TEXTS[:20]:
+        value = codec.encode(text)
+        assert codec.is_compressed(value)
+        assert codec.decode(memoryview(value)) == text
+        assert codec.read_prefix(value, 7) == text.encode("utf-8")[:7]
+
+
+def test_new_dictionary_is_loaded_for_its_frames(lmdb_env):
+    reader = DocumentCodec(lmdb_env)
+    writer = DocumentCodec(lmdb_env)
+    writer.train_dictionary([text.encode("utf-8") for text in TEXTS], size=4096)
+
+    value = writer.encode(TEXTS[3])
+
+    assert reader.dictionary is None
+    assert reader.decode(value) == TEXTS[3]
+    assert reader.dictionary_id() == writer.dictionary_id()
@@ -0,0 +1,58 @@
+import pytest
+
+from wikisearch.index.document_bitmap import DocumentFilterService
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = {query: list(ids) for query, ids in rows.items()}
+        self.pending = []
+        self.closed = False
+
+    def execute(self, query, params=None):
+        self.pending = [(doc_id,) for doc_id in self.rows[query]]
+
+    def fetchmany(self, size):
+        batch, self.pending = self.pending[:size], self.pending[size:]
+        return batch
+
+    def close(self):
+        self.closed = True
+
+
+class FakeConnection:
+    def __init__(self, rows):
+        self.rows = rows
+        self.cursors = []
+
+    def cursor(self, **kwargs):
+        self.cursors.append(FakeCursor(self.rows))
+        return self.cursors[-1]
+
+
+QUERIES = {"even": "SELECT even", "small": "SELECT small"}
+ROWS = {"SELECT even": range(0, 20, 2), "SELECT small": range(5)}
+
+
+def test_resolve_reads_the_refreshed_bitmaps():
+    service = DocumentFilterService(QUERIES, fetch_size=3)
+    connection = FakeConnection(ROWS)
+    service.refresh(connection)
+
+    assert service.resolve("even, small").ids().tolist() == [0, 2, 4]
+    assert service.resolve(None) is None
+    assert len(connection.cursors) == 2
+    assert all(cursor.closed for cursor in connection.cursors)
+
+
+def test_refresh_replaces_bitmaps_and_keeps_those_that_fail():
+    service = DocumentFilterService(QUERIES)
+    service.refresh(FakeConnection(ROWS))
+
+    # "small" fails to build, its query has no rows configured
+    service.refresh(FakeConnection({"SELECT even": [1, 3]}))
+
+    assert service.bitmap("even").ids().tolist() == [1, 3]
+    assert service.bitmap("small").ids().tolist() == [0, 1, 2, 3, 4]
+    with pytest.raises(ValueError):
+        service.resolve("missing")
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("sentence_transformers")
+
+from wikisearch.index.embeddings_batcher import EmbeddingsBatcher  # noqa: E402
+
+
+class LengthEmbeddings:
+    """Embeds a string as its length, recording the batches it is called with."""
+
+    dimension = 1
+
+    def __init__(self):
+        self.calls = []
+
+    def list_to_embeddings(self, strings, batch_size=32):
+        self.calls.append((len(strings), batch_size))
+        return np.array([[len(string)] for string in strings], dtype=np.float32)
+
+
+def test_flush_keeps_document_order_across_buckets():
+    generator = LengthEmbeddings()
+    batcher = EmbeddingsBatcher(generator, bucket_boundaries=(8, 64), max_tokens_per_batch=128,
+                                chars_per_token=2.0)
+    documents = {1: ["a" * 100, "bb"], 2: ["c" * 10], 3: ["d" * 3, "e" * 40, "f"]}
+    for doc_id, segments in documents.items():
+        batcher.add(doc_id, segments)
+
+    results = batcher.flush()
+
+    assert [doc_id for doc_id, _ in results] == [1, 2, 3]
+    for doc_id, embeddings in results:
+        assert embeddings[:, 0].tolist() == [len(segment) for segment in documents[doc_id]]
+    # segments of up to 16 characters share the 8-token bucket, the others the 64-token one
+    assert sorted(generator.calls) == [(2, 2), (4, 16)]
@@ -0,0 +1,68 @@
+import pytest
+
+pytest.importorskip("sentence_transformers")
+pytest.importorskip("usearch")
+pytest.importorskip("faiss")
+
+from wikisearch.index.embedding_store import EmbeddingStore  # noqa: E402
+from wikisearch.index.faiss_semantic_index import FAISSIndexService  # noqa: E402
+from wikisearch.index.sharded_usearch_index import ShardedUSearchIndexService  # noqa: E402
+from wikisearch.index.usearch_semantic_index import USearchIndexService  # noqa: E402
+
+
+@pytest.fixture(params=["usearch", "sharded", "faiss"])
+def open_service(request, tmp_path, dimension, query_embeddings, documents):
+    def open_service(store=None):
+        generator = query_embeddings(documents[1][0])
+        if request.param == "faiss":
+            return FAISSIndexService(tmp_path / "index.faiss", dimension,
+                                     embeddings_generator=generator, embedding_store=store)
+        if request.param == "sharded":
+            return ShardedUSearchIndexService(tmp_path / "index.usearch", dimension, 2,
+                                              embeddings_generator=generator, embedding_store=store)
+        return USearchIndexService(tmp_path / "index.usearch", dimension,
+                                   embeddings_generator=generator, embedding_store=store)
+    return open_service
+
+
+def index_files(tmp_path):
+    return {path.name: path.read_bytes() for path in tmp_path.glob("index.*")}
+
+
+def test_unchanged_index_does_not_overwrite_a_rebuilt_file(tmp_path, open_service, documents):
+    writer = open_service()
+    writer.index_embeddings(1, documents[1])
+    writer.save_index()
+    serving = open_service()
+
+    # another process rebuilds the index while the serving one still holds the old one
+    rebuilder = open_service()
+    for doc_id, vectors in documents.items():
+        rebuilder.index_embeddings(doc_id, vectors)
+    rebuilder.save_index()
+    rebuilt = index_files(tmp_path)
+
+    serving.save_index()  # as at exit
+    assert index_files(tmp_path) == rebuilt
+
+    serving.index_embeddings(2, documents[2])
+    serving.save_index()
+    assert index_files(tmp_path) != rebuilt
+
+
+def test_rebuild_from_a_read_only_store_is_not_saved(tmp_path, open_service, dimension, documents):
+    service = open_service()
+    if not hasattr(service, "rebuild"):
+        pytest.skip("the backend has no in-process rebuild")
+    writable = EmbeddingStore(tmp_path / "store", dimension)
+    for doc_id, vectors in documents.items():
+        writable.append(doc_id, vectors)
+    service = open_service(EmbeddingStore(tmp_path / "store", dimension, read_only=True))
+    before = index_files(tmp_path)
+
+    service.rebuild("store")
+    service.save_index()
+
+    assert index_files(tmp_path) == before
+    shards = service.index if isinstance(service.index, list) else [service.index]
+    assert sum(len(shard) for shard in shards) == len(writable)
@@ -0,0 +1,52 @@
+import pytest
+
+from wikisearch.document.metadata_table import DocumentMetadataTable
+
+DOCUMENTS = [(7, "София", "https://bg.wikipedia.org/wiki/София"),
+             (3, "Пловдив", "https://bg.wikipedia.org/wiki/Пловдив"),
+             (12, "", "https://bg.wikipedia.org/wiki/Празна")]
+
+
+def test_lookup_returns_appended_documents(tmp_path):
+    table = DocumentMetadataTable(tmp_path)
+    table.append_many(DOCUMENTS)
+
+    assert len(table) == 3
+    assert table.lookup([12, 3, 5, 7]) == {document_id: (title, url)
+                                           for document_id, title, url in DOCUMENTS}
+    assert table.lookup([]) == {}
+    assert table.document_ids().tolist() == [3, 7, 12]
+    table.close()
+
+
+def test_last_entry_wins_and_readers_see_new_rows(tmp_path):
+    writer = DocumentMetadataTable(tmp_path)
+    writer.append_many(DOCUMENTS)
+    reader = DocumentMetadataTable(tmp_path, read_only=True)
+    assert reader.lookup([3])[3][0] == "Пловдив"
+
+    writer.append(3, "Пловдив (град)", "https://bg.wikipedia.org/wiki/Пловдив_(град)")
+    writer.append(20, "Русе", "https://bg.wikipedia.org/wiki/Русе")
+
+    assert reader.lookup([3, 20]) == {3: ("Пловдив (град)", "https://bg.wikipedia.org/wiki/Пловдив_(град)"),
+                                      20: ("Русе", "https://bg.wikipedia.org/wiki/Русе")}
+    with pytest.raises(ValueError):
+        reader.append(1, "title", "url")
+    writer.close()
+
+
+def test_reopening_drops_partially_written_entries(tmp_path):
+    table = DocumentMetadataTable(tmp_path)
+    table.append_many(DOCUMENTS)
+    table.close()
+    with open(tmp_path / DocumentMetadataTable.ENTRIES_FILE, "ab") as f:
+        f.write(b"\x01\x02\x03")
+
+    reopened = DocumentMetadataTable(tmp_path)
+    assert len(reopened) == 3
+    reopened.append(5, "Варна", "https://bg.wikipedia.org/wiki/Варна")
+
+    assert reopened.lookup([5, 7]) == {5: ("Варна", "https://bg.wikipedia.org/wiki/Варна"),
+                                       7: DOCUMENTS[0][1:]}
+    assert DocumentMetadataTable(tmp_path / "missing", read_only=True).lookup([1]) == {}
+    reopened.close()
@@ -0,0 +1,45 @@
+from collections import Counter
+
+import pytest
+
+from wikisearch.autocomplete.ngram_counter import NGramCounter
+from wikisearch.autocomplete.scored_completions import ScoredCompletions
+
+SENTENCES = ["в началото беше словото", "словото беше у бога", "и бог беше словото",
+             "в началото беше", "беше словото"]
+
+
+def bigrams(sentence):
+    words = sentence.split()
+    return [" ".join(words[i:i + 2]) for i in range(len(words) - 1)]
+
+
+def test_spilled_runs_merge_to_the_same_counts(tmp_path):
+    counter = NGramCounter(tmp_path / "runs", max_entries=3)
+    for sentence in SENTENCES:
+        counter.add(bigrams(sentence))
+
+    expected = Counter(bigram for sentence in SENTENCES for bigram in bigrams(sentence))
+    assert len(counter.runs) > 1
+    assert list(counter.items()) == sorted(expected.items())
+    assert list(counter.items(min_count=2)) == sorted(
+        (key, count) for key, count in expected.items() if count >= 2)
+
+    counter.close()
+    assert not any((tmp_path / "runs").iterdir())
+
+
+def test_written_completions_yield_the_merged_keys_in_order(tmp_path):
+    counter = NGramCounter(tmp_path / "runs", max_entries=2)
+    for sentence in SENTENCES:
+        counter.add(bigrams(sentence))
+    merged = list(counter.items())
+
+    ScoredCompletions.build_sorted(tmp_path / "2-grams", counter.items())
+    completions = ScoredCompletions(tmp_path / "2-grams")
+
+    assert list(completions.keys()) == [key for key, _ in merged]
+    dawg = pytest.importorskip("dawg")
+    completion_dawg = dawg.CompletionDAWG(completions.keys(), input_is_sorted=True)
+    assert completion_dawg.keys("беше ") == sorted(
+        key for key, _ in merged if key.startswith("беше "))
@@ -0,0 +1,52 @@
+import random
+
+import pytest
+
+from wikisearch.autocomplete.scored_completions import ScoredCompletions
+
+
+@pytest.fixture
+def items():
+    generator = random.Random(7)
+    alphabet = "абвгд"
+    keys = {"".join(generator.choice(alphabet) for _ in range(generator.randint(1, 5)))
+            for _ in range(500)}
+    return {key: generator.randint(1, 50) for key in keys}
+
+
+def brute_force_top_k(items, prefix, k):
+    matches = [(key, score) for key, score in items.items() if key.startswith(prefix)]
+    return sorted(matches, key=lambda item: -item[1])[:k]
+
+
+@pytest.mark.parametrize("chunk_size", [3, 1 << 20])
+def test_top_k_matches_brute_force(tmp_path, items, chunk_size):
+    count = ScoredCompletions.build_sorted(tmp_path, sorted(items.items()), chunk_size=chunk_size)
+    completions = ScoredCompletions(tmp_path)
+
+    assert count == len(completions) == len(items)
+    for prefix in ["", "а", "бв", "гдг", "ддддд", "е"]:
+        for k in [1, 5, 40]:
+            result = completions.top_k(prefix, k)
+            expected = brute_force_top_k(items, prefix, k)
+            # equal scores may come in any order
+            assert [score for _, score in result] == [score for _, score in expected]
+            assert all(key.startswith(prefix) and items[key] == score for key, score in result)
+            assert len({key for key, _ in result}) == len(result)
+
+
+def test_build_adds_up_scores_of_equal_keys(tmp_path):
+    ScoredCompletions.build(tmp_path, [("бял", 2), ("бяла", 5), ("бял", 4), ("аз", 1)])
+    completions = ScoredCompletions(tmp_path)
+
+    assert list(completions.keys()) == ["аз", "бял", "бяла"]
+    assert completions.top_k("бя", 5) == [("бял", 6), ("бяла", 5)]
+    assert completions.top_k("бя", 0) == []
+
+
+def test_unsorted_keys_are_rejected_and_empty_store_is_readable(tmp_path):
+    with pytest.raises(ValueError):
+        ScoredCompletions.build_sorted(tmp_path / "unsorted", [("б", 1), ("а", 2)])
+
+    ScoredCompletions.build_sorted(tmp_path / "empty", [])
+    assert ScoredCompletions(tmp_path / "empty").top_k("", 3) == []
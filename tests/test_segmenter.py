@@ -0,0 +1,72 @@
+import random
+
+import pytest
+
+from wikisearch.nlp.segmenter import StreamingSegmenter, sentence_spans
+
+
+def random_text(generator: random.Random, num_sentences: int) -> str:
+    # every sentence starts with its number, so repeated sentences can be told apart
+    return ". ".join(" ".join([str(number)] + ["дума" * generator.randint(1, 3)
+                                              for _ in range(generator.randint(0, 11))])
+                     for number in range(num_sentences))
+
+
+def test_sentence_spans():
+    text = "Първо изречение. Второ. Трето"
+    spans = list(sentence_spans(text))
+
+    assert [text[start:end] for start, end in spans] == ["Първо изречение", "Второ", "Трето"]
+    assert list(sentence_spans("")) == [(0, 0)]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_segments_cover_the_text_within_the_maximum_length(seed):
+    generator = random.Random(seed)
+    text = random_text(generator, 40)
+    segmenter = StreamingSegmenter(120)
+
+    segments = list(segmenter.segments(text))
+
+    assert ". ".join(segments) == text
+    for segment in segments:
+        assert len(segment) <= 120 or ". " not in segment
+
+
+def test_long_sentence_is_its_own_segment():
+    segmenter = StreamingSegmenter(10)
+    assert list(segmenter.segments("кратко. " + "дълго" * 5 + ". край")) == [
+        "кратко", "дълго" * 5, "край"]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_overlap_repeats_trailing_sentences(seed):
+    generator = random.Random(seed)
+    text = random_text(generator, 40)
+    segmenter = StreamingSegmenter(150, overlap=60)
+
+    segments = list(segmenter.segments(text))
+    sentences = text.split(". ")
+
+    assert len(segments) > 1
+    num_shared = 0
+    for previous, segment in zip(segments, segments[1:]):
+        previous_sentences, segment_sentences = previous.split(". "), segment.split(". ")
+        shared = [sentence for sentence in segment_sentences if sentence in previous_sentences]
+        assert len(". ".join(shared)) <= 60
+        assert shared == previous_sentences[len(previous_sentences) - len(shared):]
+        assert shared == segment_sentences[:len(shared)]
+        num_shared += len(shared)
+    assert num_shared > 0
+    # apart from the repeated sentences every sentence appears once, in order
+    seen = [sentence for segment in segments for sentence in segment.split(". ")]
+    assert list(dict.fromkeys(seen)) == sentences
+
+
+def test_lengths_are_measured_with_the_length_function():
+    # the separator ". " counts as one word
+    words = StreamingSegmenter(5, length_function=lambda string: len(string.split()), separator=". ")
+    assert list(words.segments("а б. в г. д е ж. з")) == ["а б. в г", "д е ж. з"]
+
+    with pytest.raises(ValueError):
+        StreamingSegmenter(10, overlap=10)
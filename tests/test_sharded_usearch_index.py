@@ -0,0 +1,68 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytest.importorskip("sentence_transformers")
+pytest.importorskip("usearch")
+
+from wikisearch.index.embedding_store import EmbeddingStore  # noqa: E402
+from wikisearch.index.sharded_usearch_index import ShardedUSearchIndexService  # noqa: E402
+
+NUM_SHARDS = 3
+
+
+@pytest.fixture
+def store(tmp_path, dimension, documents):
+    store = EmbeddingStore(tmp_path / "store", dimension)
+    for doc_id, vectors in documents.items():
+        store.append(doc_id, vectors)
+    return store
+
+
+def test_build_reads_the_store_once(tmp_path, dimension, query_embeddings, documents, store):
+    service = ShardedUSearchIndexService(tmp_path / "index.usearch", dimension, NUM_SHARDS,
+                                         embeddings_generator=query_embeddings(documents[1][0]))
+    iter_batches = store.iter_batches
+    calls = []
+    store.iter_batches = lambda *args, **kwargs: calls.append(args) or iter_batches(*args, **kwargs)
+
+    service.load_from_store(store, batch_size=4)
+
+    assert len(calls) == 1
+    for shard_id, shard in enumerate(service.index):
+        owned = [doc_id for doc_id in documents if doc_id % NUM_SHARDS == shard_id]
+        assert len(shard) == sum(len(documents[doc_id]) for doc_id in owned)
+        assert {int(key) for key in shard.keys} == set(owned)
+
+
+def test_search_is_served_while_rebuild_is_in_flight(tmp_path, dimension, query_embeddings, documents, store):
+    service = ShardedUSearchIndexService(tmp_path / "index.usearch", dimension, NUM_SHARDS,
+                                         embeddings_generator=query_embeddings(documents[1][0]),
+                                         embedding_store=store)
+    service.load_from_store(store)
+    before = service.search_embedding(documents[1][0][None, :], 3)
+
+    # hold the rebuild inside its read of the store
+    building, release = threading.Event(), threading.Event()
+    iter_batches = store.iter_batches
+
+    def held_iter_batches(*args, **kwargs):
+        building.set()
+        release.wait(10)
+        yield from iter_batches(*args, **kwargs)
+
+    store.iter_batches = held_iter_batches
+    try:
+        assert service.rebuild_async("store")
+        assert building.wait(5)
+        with ThreadPoolExecutor(max_workers=1) as client:
+            during = client.submit(service.search_embedding, documents[1][0][None, :], 3).result(timeout=5)
+        assert service.rebuild_thread.is_alive()
+    finally:
+        release.set()
+    service.rebuild_thread.join(10)
+
+    assert during == before
+    assert during[0][0] == 1
+    assert sum(len(shard) for shard in service.index) == len(store)
@@ -0,0 +1,63 @@
+import pytest
+
+from wikisearch.spell.symspell_checker import SymSpellChecker, deletes, edit_distance
+
+FREQUENCIES = {"София": 900, "софия": 100, "сила": 500, "село": 800, "слово": 300, "словото": 200}
+
+
+@pytest.fixture
+def frequency_path(tmp_path):
+    path = tmp_path / "frequencies.txt"
+    path.write_text("".join(f"{word}\t{count}\n" for word, count in FREQUENCIES.items()),
+                    encoding="utf-8")
+    return path
+
+
+def test_deletes():
+    assert deletes("абв", 1) == {"абв", "бв", "ав", "аб"}
+    assert deletes("абв", 2) == {"абв", "бв", "ав", "аб", "а", "б", "в"}
+
+
+@pytest.mark.parametrize("source, target, distance", [
+    ("слово", "слово", 0),
+    ("сово", "слово", 1),
+    ("солво", "слово", 1),
+    ("сиал", "сила", 1),
+    ("сл", "слово", 3),
+    ("абвгд", "вгдаб", 3),
+])
+def test_edit_distance(source, target, distance):
+    assert edit_distance(source, target, 2) == min(distance, 3)
+
+
+def test_candidates_are_ranked_by_distance_then_frequency(frequency_path):
+    checker = SymSpellChecker(frequency_path)
+
+    assert checker.candidates("сило") == [("село", 1, 800), ("сила", 1, 500)]
+    assert checker.candidates("Слово") == [("слово", 0, 300)]
+    assert [word for word, _, _ in checker.candidates("слово", include_known=True)] == [
+        "слово", "словото"]
+    # words that only differ in case keep the count of the most frequent one
+    assert checker.candidates("софия") == [("софия", 0, 900)]
+
+
+def test_spellcheck_corrects_each_word(frequency_path):
+    checker = SymSpellChecker(frequency_path)
+
+    assert checker.spellcheck("слвото на софиа") == "словото на софия"
+    assert checker.correct("") == ""
+
+
+def test_index_is_stored_and_rebuilt_for_other_parameters(tmp_path, frequency_path):
+    index_path = tmp_path / "symspell.npz"
+    built = SymSpellChecker(frequency_path, index_path)
+    assert index_path.is_file()
+
+    loaded = SymSpellChecker(frequency_path, index_path)
+    assert loaded.hashes.tolist() == built.hashes.tolist()
+    assert loaded.hash_word_ids.tolist() == built.hash_word_ids.tolist()
+
+    narrower = SymSpellChecker(frequency_path, index_path, max_edit_distance=1)
+    assert narrower.candidates("слвото") == [("словото", 1, 200)]
+    assert narrower.candidates("свлото") == []
+    assert len(narrower.hashes) < len(built.hashes)
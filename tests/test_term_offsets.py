@@ -0,0 +1,18 @@
+from wikisearch.nlp.segmenter import StreamingSegmenter
+from wikisearch.summary.term_offsets import TermOffsets, encode_term_offsets, sentences, term_hash
+
+TEXT = "  Първо изречение. Второ изречение!\n\nТрета линия. Четвърто.  \nПоследно"
+
+
+def test_sentences_split_lines_like_the_segmenter():
+    assert list(sentences(TEXT)) == [
+        "Първо изречение", "Второ изречение!", "Трета линия", "Четвърто", "Последно"]
+    for line in TEXT.split("\n"):
+        line_sentences = [sentence.strip() for sentence in StreamingSegmenter(100).sentences(line)]
+        assert [sentence for sentence in line_sentences if sentence] == list(sentences(line))
+
+
+def test_snippet_starts_at_its_sentence():
+    offsets = TermOffsets(encode_term_offsets(TEXT))
+    start = offsets.densest_window([term_hash("четвърто")], 200)
+    assert TEXT.encode("utf-8")[start:].decode("utf-8").startswith("Четвърто")
@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("sentence_transformers")
+pytest.importorskip("usearch")
+
+from wikisearch.index.document_bitmap import DocumentBitmap  # noqa: E402
+from wikisearch.index.embedding_store import EmbeddingStore  # noqa: E402
+from wikisearch.index.flat_semantic_index import FlatIndexService  # noqa: E402
+from wikisearch.index.sharded_usearch_index import ShardedUSearchIndexService  # noqa: E402
+from wikisearch.index.usearch_semantic_index import USearchIndexService  # noqa: E402
+
+COUNT = 5
+
+
+def flat_nearest(store: EmbeddingStore, query_embedding: np.ndarray, document_filter: DocumentBitmap):
+    flat = FlatIndexService(store, embeddings_generator=object())
+    distances, rows = flat.exact_search(query_embedding[None, :], COUNT, document_filter)
+    return [(int(doc_id), float(distance))
+            for doc_id, distance in zip(store.segments()[rows[0], 0], distances[0])]
+
+
+@pytest.mark.parametrize("with_store", [True, False])
+@pytest.mark.parametrize("sharded", [False, True])
+def test_filtered_search_matches_flat_search(tmp_path, dimension, query_embeddings, documents,
+                                             with_store, sharded):
+    query_embedding = documents[3][0]
+    store = EmbeddingStore(tmp_path / "store", dimension)
+    for doc_id, vectors in documents.items():
+        store.append(doc_id, vectors)
+
+    arguments = dict(embeddings_generator=query_embeddings(query_embedding),
+                     embedding_store=store if with_store else None)
+    if sharded:
+        service = ShardedUSearchIndexService(tmp_path / "index.usearch", dimension, 2, **arguments)
+    else:
+        service = USearchIndexService(tmp_path / "index.usearch", dimension, **arguments)
+    service.load_from_store(store)
+
+    document_filter = DocumentBitmap.from_ids([1, 2, 4, 6])
+    hits = service.search_filtered(query_embedding[None, :], COUNT, document_filter)
+
+    expected = flat_nearest(store, query_embedding, document_filter)
+    assert [doc_id for doc_id, _ in hits] == [doc_id for doc_id, _ in expected]
+    assert [distance for _, distance in hits] == pytest.approx(
+        [distance for _, distance in expected], abs=1e-3)
+
+
+def test_filtered_search_skips_shards_without_allowed_documents(tmp_path, dimension, query_embeddings,
+                                                               documents):
+    store = EmbeddingStore(tmp_path / "store", dimension)
+    for doc_id, vectors in documents.items():
+        store.append(doc_id, vectors)
+    service = ShardedUSearchIndexService(tmp_path / "index.usearch", dimension, 2,
+                                         embeddings_generator=query_embeddings(documents[1][0]))
+    service.load_from_store(store)
+
+    searched = []
+    search_shards = service.search_shards
+    service.search_shards = lambda shards, *args: searched.append(shards) or search_shards(shards, *args)
+
+    # documents 2, 4 and 6 all live in shard 0
+    hits = service.search_filtered(documents[4][0][None, :], COUNT, DocumentBitmap.from_ids([2, 4, 6]))
+
+    assert searched and all(shards == [service.index[0]] for shards in searched)
+    assert {doc_id for doc_id, _ in hits} <= {2, 4, 6}
+    assert hits[0][0] == 4
+
+
+def test_filtered_search_window_is_capped(tmp_path, dimension, query_embeddings, documents):
+    service = USearchIndexService(tmp_path / "index.usearch", dimension,
+                                  embeddings_generator=query_embeddings(documents[1][0]),
+                                  max_filter_window=4)
+    for doc_id, vectors in documents.items():
+        service.index_embeddings(doc_id, vectors)
+
+    windows = []
+    search_shards = service.search_shards
+    service.search_shards = lambda shards, query, count: windows.append(count) or search_shards(
+        shards, query, count)
+
+    # the query is a segment of document 1, so its own segments fill the capped window
+    hits = service.search_filtered(documents[1][0][None, :], COUNT, DocumentBitmap.from_ids([5]))
+
+    assert windows and max(windows) == 4
+    assert all(doc_id == 5 for doc_id, _ in hits)
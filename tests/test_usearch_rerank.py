@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("sentence_transformers")
+pytest.importorskip("usearch")
+
+from wikisearch.index.embedding_store import EmbeddingStore  # noqa: E402
+from wikisearch.index.usearch_semantic_index import USearchIndexService  # noqa: E402
+
+
+def test_rerank_scores_match_stored_vectors(tmp_path, dimension, query_embeddings, documents):
+    query_embedding = documents[2][1]
+    store = EmbeddingStore(tmp_path / "store", dimension)
+    service = USearchIndexService(tmp_path / "index.usearch", dimension,
+                                  embeddings_generator=query_embeddings(query_embedding),
+                                  embedding_store=store)
+    for doc_id, vectors in documents.items():
+        service.index_embeddings(doc_id, vectors)
+
+    candidates = [(doc_id, 0.0) for doc_id in documents]
+    reranked = service.rerank("query", candidates, limit=len(candidates))
+
+    expected = {doc_id: float((vectors @ query_embedding).max())
+                for doc_id, vectors in documents.items()}
+    assert reranked[0][0] == 2
+    assert reranked[0][1] == pytest.approx(1.0, abs=1e-5)
+    assert dict(reranked) == pytest.approx(expected, abs=1e-5)
+    assert [doc_id for doc_id, _ in reranked] == sorted(expected, key=expected.get, reverse=True)
+
+
+def test_rerank_without_store_keeps_candidates(tmp_path, dimension, query_embeddings, documents):
+    service = USearchIndexService(tmp_path / "index.usearch", dimension,
+                                  embeddings_generator=query_embeddings(documents[1][0]))
+    for doc_id, vectors in documents.items():
+        service.index_embeddings(doc_id, vectors)
+
+    candidates = [(4, 3.0), (1, 2.0), (3, 1.0)]
+    assert service.rerank("query", candidates, limit=2, offset=1) == candidates[1:3]
@@ -1,21 +1,38 @@
 import logging
+from itertools import islice
+from pathlib import Path
 
 import dawg
 
+from wikisearch.autocomplete.scored_completions import ScoredCompletions
+
 
 class AutocompletionService:
-    def __init__(self, completion_dawg_path: str, next_word_dawg_path: str, num_suggestions: int = 10):
+    def __init__(self, completion_dawg_path: str, next_word_dawg_path: str, num_suggestions: int = 10,
+                 word_completions_path: str | None = None, next_words_path: str | None = None):
+        """
+        :param word_completions_path: Optional ScoredCompletions of the words with their corpus
+            frequencies. If given, word completions are the most frequent words first instead
+            of the alphabetically first ones.
+        :param next_words_path: Optional directory with the bigram and trigram ScoredCompletions
+            written by scripts/construct_next_word_dawg.py. If given, next words are the most
+            frequent continuations of the last two words, then of the last word.
+        """
         self.logger = logging.getLogger(__name__)
         self.completion_dawg = dawg.CompletionDAWG().load(completion_dawg_path)
+        self.word_completions = ScoredCompletions(
+            Path(word_completions_path)) if word_completions_path else None
         # self.next_word_dawg = dawg.IntCompletionDAWG().load(next_word_dawg_path)
         self.next_word_dawg = dawg.CompletionDAWG().load(next_word_dawg_path)
+        self.next_words = {order: ScoredCompletions(Path(next_words_path) / f"{order}-grams")
+                           for order in (3, 2)} if next_words_path else None
         self.num_suggestions = num_suggestions
 
     def suggest(self, user_input: str):
         self.logger.debug(f"Suggest called with input: {user_input}")
-        user_input = user_input.lower().strip()
+        user_input = user_input.lower().lstrip()
 
-        if not user_input:  # If the input is empty, return no suggestions
+        if not user_input.strip():  # If the input is empty, return no suggestions
             self.logger.debug("Empty input, returning no suggestions")
             return []
 
@@ -29,7 +46,11 @@ class AutocompletionService:
         parts = user_input.rsplit(" ", 1)
         prefix = parts[-1] if len(parts) > 1 else user_input
 
-        suggestions = list(self.completion_dawg.keys(prefix))[:self.num_suggestions]
+        if self.word_completions is not None:
+            suggestions = [word for word, _ in self.word_completions.top_k(
+                prefix, self.num_suggestions)]
+        else:
+            suggestions = list(islice(self.completion_dawg.iterkeys(prefix), self.num_suggestions))
         self.logger.debug(f"Word completions found: {suggestions}")
 
         # Fill remaining slots with next-word suggestions if needed
@@ -40,14 +61,41 @@ class AutocompletionService:
 
         return suggestions
 
-    def suggest_next_words(self, user_input: str, limit: None):
-        limit = limit or self.num_suggestions
-        self.logger.info(f"Suggesting word completions for: {user_input}")
-        parts = user_input.rsplit(" ", 1)
-        prefix = parts[-1] if len(parts) > 1 else user_input
+    def suggest_next_words(self, user_input: str, limit: int | None = None):
+        """
+        Suggest the words following the last complete words of the input, as "<last word> <next word>".
 
-        suggestions = list(self.next_word_dawg.keys(prefix))[:limit]
-        self.logger.debug(f"Word completions found: {suggestions}")
+        The unfinished last word, if any, restricts the next words to its completions. Without
+        a complete word, the suggestions are the word pairs starting with the unfinished one.
+        """
+        limit = limit or self.num_suggestions
+        self.logger.info(f"Suggesting next words for: {user_input}")
+        *context, partial = user_input.split(" ")
+        context = [word for word in context if word]
+        if not context:
+            if not partial:
+                return []
+            if self.next_words is None:
+                suggestions = list(islice(self.next_word_dawg.iterkeys(partial), limit))
+            else:
+                suggestions = [bigram for bigram, _ in self.next_words[2].top_k(partial, limit)]
+        elif self.next_words is None:
+            suggestions = list(islice(self.next_word_dawg.iterkeys(f"{context[-1]} {partial}"), limit))
+        else:
+            suggestions = []
+            # back off from the last two words to the last word
+            for order, ngrams in self.next_words.items():
+                if len(context) < order - 1:
+                    continue
+                prefix = " ".join(context[1 - order:] + [partial])
+                for ngram, _ in ngrams.top_k(prefix, limit):
+                    suggestion = f"{context[-1]} {ngram.rsplit(' ', 1)[-1]}"
+                    if suggestion not in suggestions:
+                        suggestions.append(suggestion)
+                if len(suggestions) >= limit:
+                    break
+            suggestions = suggestions[:limit]
+        self.logger.debug(f"Next words found: {suggestions}")
 
         return suggestions
 
@@ -0,0 +1,71 @@
+import heapq
+import logging
+import tempfile
+from collections import Counter
+from pathlib import Path
+from typing import Iterable, Iterator, List, Tuple
+
+
+def read_run(path: Path) -> Iterator[Tuple[str, int]]:
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            key, count = line.rstrip("\n").split("\t")
+            yield key, int(count)
+
+
+class NGramCounter:
+    def __init__(self, directory: Path, max_entries: int = 5_000_000):
+        """
+        Counts string keys, e.g. word n-grams, in bounded memory.
+
+        Counts are kept in memory until there are max_entries distinct keys, then written to
+        disk as a run sorted by key. The runs are merged when the counts are read, so memory
+        holds at most max_entries keys however many distinct keys the corpus has.
+
+        :param directory: Directory for the temporary runs.
+        :param max_entries: Number of distinct keys counted in memory before spilling.
+        """
+        self.logger = logging.getLogger(__name__)
+        self.directory = directory
+        self.max_entries = max_entries
+        self.counts = Counter()
+        self.runs: List[Path] = []
+
+    def add(self, keys: Iterable[str]):
+        self.counts.update(keys)
+        if len(self.counts) >= self.max_entries:
+            self.spill()
+
+    def spill(self):
+        """Write the counts in memory to a sorted run. Keys must not contain tabs or line breaks."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=self.directory, suffix=".run",
+                                         delete=False) as f:
+            f.writelines(f"{key}\t{count}\n" for key, count in sorted(self.counts.items()))
+            self.runs.append(Path(f.name))
+        self.logger.info(f"Spilled {len(self.counts)} keys to run {len(self.runs)}")
+        self.counts.clear()
+
+    def items(self, min_count: int = 1) -> Iterator[Tuple[str, int]]:
+        """
+        Yield (key, count) of every key in key order, merging the runs.
+
+        :param min_count: Keys counted fewer times are skipped.
+        """
+        runs = [read_run(path) for path in self.runs]
+        merged = heapq.merge(*runs, sorted(self.counts.items()))
+        current, total = None, 0
+        for key, count in merged:
+            if key != current:
+                if current is not None and total >= min_count:
+                    yield current, total
+                current, total = key, 0
+            total += count
+        if current is not None and total >= min_count:
+            yield current, total
+
+    def close(self):
+        for path in self.runs:
+            path.unlink(missing_ok=True)
+        self.runs = []
+        self.counts.clear()
@@ -0,0 +1,184 @@
+import heapq
+import logging
+from pathlib import Path
+from typing import Iterable, Iterator, List, Tuple
+
+import numpy as np
+
+
+class ScoredCompletions:
+    STRINGS_FILE = "strings.bin"
+    OFFSETS_FILE = "offsets.i64"
+    SCORES_FILE = "scores.i64"
+    TREE_FILE = "tree.i64"
+
+    def __init__(self, path: Path):
+        """
+        Read-only, memory-mapped completions with scores, e.g. words with their frequencies.
+
+        Keys are stored sorted by their UTF-8 bytes, so the completions of a prefix are a
+        contiguous range found by binary search. A segment tree holds the position of the best
+        score of every power-of-two block, so the best completions of a range are extracted
+        best-first with a heap in O(k log n), however many completions the prefix has.
+
+        :param path: Directory holding the files written by ScoredCompletions.build.
+        """
+        self.logger = logging.getLogger(__name__)
+        self.path = path
+        self.offsets = np.memmap(self.path / self.OFFSETS_FILE, dtype=np.int64, mode="r")
+        self.tree = np.memmap(self.path / self.TREE_FILE, dtype=np.int64, mode="r")
+        if len(self.offsets) > 1:
+            self.scores = np.memmap(self.path / self.SCORES_FILE, dtype=np.int64, mode="r")
+            self.strings = np.memmap(self.path / self.STRINGS_FILE, dtype=np.uint8, mode="r")
+        else:
+            self.logger.warning(f"No completions in {self.path}")
+            self.scores = np.empty(0, dtype=np.int64)
+            self.strings = np.empty(0, dtype=np.uint8)
+        # plain array views of the mappings index much faster than np.memmap
+        self.offsets, self.tree, self.scores, self.strings = (
+            np.asarray(array) for array in (self.offsets, self.tree, self.scores, self.strings))
+        self.leaves = len(self.tree) // 2
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    def key_bytes(self, index: int) -> bytes:
+        return self.strings[self.offsets[index]:self.offsets[index + 1]].tobytes()
+
+    def key(self, index: int) -> str:
+        return self.key_bytes(index).decode('utf-8')
+
+    def keys(self) -> Iterator[str]:
+        """All keys in ascending order, read from the mapped files."""
+        return (self.key(index) for index in range(len(self)))
+
+    def prefix_range(self, prefix: str) -> Tuple[int, int]:
+        """The range [start, end) of the keys starting with prefix."""
+        encoded = prefix.encode('utf-8')
+        low, high = 0, len(self)
+        while low < high:
+            middle = (low + high) // 2
+            if self.key_bytes(middle) < encoded:
+                low = middle + 1
+            else:
+                high = middle
+        start, high = low, len(self)
+        while low < high:
+            middle = (low + high) // 2
+            if self.key_bytes(middle)[:len(encoded)] == encoded:
+                low = middle + 1
+            else:
+                high = middle
+        return start, low
+
+    def best(self, start: int, end: int) -> int:
+        """Position of the highest score in [start, end), which must not be empty."""
+        best = start
+        start += self.leaves
+        end += self.leaves
+        while start < end:
+            if start & 1:
+                if self.scores[self.tree[start]] > self.scores[best]:
+                    best = int(self.tree[start])
+                start += 1
+            if end & 1:
+                end -= 1
+                if self.scores[self.tree[end]] > self.scores[best]:
+                    best = int(self.tree[end])
+            start //= 2
+            end //= 2
+        return best
+
+    def top_k(self, prefix: str, k: int) -> List[Tuple[str, int]]:
+        """The k keys starting with prefix with the highest scores, best first, as (key, score)."""
+        start, end = self.prefix_range(prefix)
+        results = []
+        heap = []
+        if start < end and k > 0:
+            best = self.best(start, end)
+            heap.append((-int(self.scores[best]), best, start, end))
+        while heap and len(results) < k:
+            negative_score, best, start, end = heapq.heappop(heap)
+            results.append((self.key(best), -negative_score))
+            for range_start, range_end in ((start, best), (best + 1, end)):
+                if range_start < range_end:
+                    position = self.best(range_start, range_end)
+                    heapq.heappush(heap, (-int(self.scores[position]), position, range_start, range_end))
+        return results
+
+    @staticmethod
+    def build(path: Path, items: Iterable[Tuple[str, int]]) -> int:
+        """
+        Write completions from (key, score) pairs; scores of equal keys are added up.
+
+        All keys are held in memory, see build_sorted for streams of sorted keys.
+
+        :return: The number of distinct keys.
+        """
+        scores_by_key = {}
+        for key, score in items:
+            scores_by_key[key] = scores_by_key.get(key, 0) + score
+        return ScoredCompletions.build_sorted(
+            path, ((key, scores_by_key[key]) for key in sorted(scores_by_key)))
+
+    @staticmethod
+    def build_sorted(path: Path, items: Iterable[Tuple[str, int]], chunk_size: int = 1 << 20) -> int:
+        """
+        Write completions from (key, score) pairs with strictly ascending keys.
+
+        Keys, offsets and scores are streamed to disk and the segment tree is built over the
+        memory-mapped scores one chunk at a time, so memory does not grow with the number of
+        keys. Python orders strings by code point, which is the UTF-8 byte order of the files.
+
+        :param chunk_size: Number of rows buffered or computed at once.
+        :return: The number of keys.
+        """
+        path.mkdir(parents=True, exist_ok=True)
+        count = 0
+        offset = 0
+        previous = None
+        offsets = [0]
+        scores = []
+        with open(path / ScoredCompletions.STRINGS_FILE, "wb") as strings_file, \
+                open(path / ScoredCompletions.OFFSETS_FILE, "wb") as offsets_file, \
+                open(path / ScoredCompletions.SCORES_FILE, "wb") as scores_file:
+            for key, score in items:
+                if previous is not None and key <= previous:
+                    raise ValueError(f"Keys must be strictly ascending, got '{key}' after '{previous}'")
+                previous = key
+                encoded = key.encode('utf-8')
+                strings_file.write(encoded)
+                offset += len(encoded)
+                offsets.append(offset)
+                scores.append(score)
+                count += 1
+                if len(scores) >= chunk_size:
+                    np.array(offsets, dtype=np.int64).tofile(offsets_file)
+                    np.array(scores, dtype=np.int64).tofile(scores_file)
+                    offsets, scores = [], []
+            np.array(offsets, dtype=np.int64).tofile(offsets_file)
+            np.array(scores, dtype=np.int64).tofile(scores_file)
+
+        leaves = 1
+        while leaves < max(count, 1):
+            leaves *= 2
+        # padding leaves are never inside a queried range, whatever they point at
+        tree = np.memmap(path / ScoredCompletions.TREE_FILE, dtype=np.int64, mode="w+",
+                         shape=(2 * leaves,))
+        if count:
+            all_scores = np.memmap(path / ScoredCompletions.SCORES_FILE, dtype=np.int64, mode="r")
+            for start in range(0, count, chunk_size):
+                end = min(start + chunk_size, count)
+                tree[leaves + start:leaves + end] = np.arange(start, end)
+            node = leaves // 2
+            while node >= 1:
+                for start in range(node, 2 * node, chunk_size):
+                    end = min(start + chunk_size, 2 * node)
+                    left = np.asarray(tree[2 * start:2 * end:2])
+                    right = np.asarray(tree[2 * start + 1:2 * end:2])
+                    tree[start:end] = np.where(all_scores[right] > all_scores[left], right, left)
+                node //= 2
+            del all_scores
+        tree.flush()
+        del tree
+        return count
@@ -8,12 +8,18 @@ from urllib.parse import urljoin, urlparse
 from bs4 import BeautifulSoup
 
 from wikisearch.crawler.shared_buffer import SharedBuffer
+from wikisearch.db.document_codec import DocumentCodec
+from wikisearch.document.metadata_table import DocumentMetadataTable
+from wikisearch.summary.summary_service import SummaryService
 
 
 class WebCrawlerService:
-    def __init__(self, total_crawl_limit: int, db_connection, lmdb_env, buffer: SharedBuffer):
+    def __init__(self, total_crawl_limit: int, db_connection, lmdb_env, buffer: SharedBuffer,
+                 metadata_table: DocumentMetadataTable | None = None):
         """
         Initializes the web crawler.
+
+        :param metadata_table: Optional table of titles and URLs to append saved pages to.
         """
         self.logger = logging.getLogger(__name__)
         self.total_count = 0
@@ -24,6 +30,9 @@ class WebCrawlerService:
         self.conn = db_connection
         self.cursor = self.conn.cursor()
         self.lmdb_env = lmdb_env
+        self.codec = DocumentCodec(lmdb_env)
+        self.summarizer = SummaryService(lmdb_env, writable=True)
+        self.metadata_table = metadata_table
 
         self.buffer = buffer
 
@@ -78,7 +87,10 @@ class WebCrawlerService:
         document_id = self.cursor.lastrowid
 
         with self.lmdb_env.begin(write=True) as txn:
-            txn.put(str(document_id).encode(), content.encode())
+            txn.put(str(document_id).encode(), self.codec.encode(content))
+            self.summarizer.store_summaries(txn, document_id, content)
+        if self.metadata_table is not None:
+            self.metadata_table.append(document_id, title, url)
 
     def crawl_website(self, doc_id: int, url: str):
         self.logger.info(f"Crawling {url}...")
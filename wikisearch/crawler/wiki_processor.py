@@ -11,10 +11,15 @@ from lxml import etree
 
 from wikisearch.crawler.shared_buffer import SharedBuffer
 from wikisearch.db.database_connection import DatabaseConnectionService
+from wikisearch.db.document_codec import DocumentCodec
+from wikisearch.db.file_database import open_file_database
+from wikisearch.document.metadata_table import DocumentMetadataTable
+from wikisearch.summary.summary_service import SummaryService
 
 
 class WikipediaProcessor:
-    def __init__(self, mysql_conn, lmdb_env: lmdb.Environment, shared_buffer: SharedBuffer | None, xml_file_path: Path, total_pages: int):
+    def __init__(self, mysql_conn, lmdb_env: lmdb.Environment, shared_buffer: SharedBuffer | None, xml_file_path: Path, total_pages: int,
+                 metadata_table: DocumentMetadataTable | None = None):
         """
         Initialize the WikipediaProcessor with MySQL connection, LMDB environment, and SharedBuffer.
 
@@ -23,9 +28,13 @@ class WikipediaProcessor:
         :param shared_buffer: SharedBuffer instance to add document data.
         :param xml_file_path: Path to the extracted Wikipedia XML dump.
         :param total_pages: Total number of pages to process (for progress bar).
+        :param metadata_table: Optional table of titles and URLs to append saved pages to.
         """
         self.conn = mysql_conn
         self.lmdb_env = lmdb_env
+        self.codec = DocumentCodec(lmdb_env)
+        self.summarizer = SummaryService(lmdb_env, writable=True)
+        self.metadata_table = metadata_table
         # self.shared_buffer = shared_buffer
         self.xml_file_path = xml_file_path
         self.cursor = self.conn.cursor()
@@ -61,7 +70,10 @@ class WikipediaProcessor:
             f"Document ID {document_id} generated for page: {title}")
 
         with self.lmdb_env.begin(write=True) as txn:
-            txn.put(str(document_id).encode(), content.encode())
+            txn.put(str(document_id).encode(), self.codec.encode(content))
+            self.summarizer.store_summaries(txn, document_id, content)
+        if self.metadata_table is not None:
+            self.metadata_table.append(document_id, title, url)
 
         # self.shared_buffer.put((document_id, title, content))
         self.logger.debug(f"Page {title} saved to LMDB and shared buffer.")
@@ -137,6 +149,10 @@ if __name__ == "__main__":
         "size": int(config["FileDatabase"].get("Size", 10**9))
     }
 
+    METADATA_CONFIG = {
+        "path": config["DocumentMetadata"].get("Path", "/data/WikiSearchData/Metadata"),
+    }
+
     PROCESSOR_CONFIG = {
         "path": config["WikipediaProcessor"].get("Path", "bgwiki-20250120-pages-articles.xml"),
         "seed_urls": config["Crawler"].get("SeedURLs", "root"),
@@ -144,11 +160,10 @@ if __name__ == "__main__":
     }
 
     db_connection_service = DatabaseConnectionService(DB_CONFIG)
-    if not os.path.exists(LMDB_CONFIG["path"]):
-        os.makedirs(LMDB_CONFIG["path"])
-    lmdb_env = lmdb.open(LMDB_CONFIG["path"], map_size=LMDB_CONFIG["size"])
+    lmdb_env = open_file_database(LMDB_CONFIG["path"], LMDB_CONFIG["size"])
 
     with DatabaseConnectionService(DB_CONFIG) as connection:
         processor = WikipediaProcessor(
-            connection, lmdb_env, None, Path(PROCESSOR_CONFIG["path"]), PROCESSOR_CONFIG["crawl_limit"])
+            connection, lmdb_env, None, Path(PROCESSOR_CONFIG["path"]), PROCESSOR_CONFIG["crawl_limit"],
+            DocumentMetadataTable(Path(METADATA_CONFIG["path"])))
         processor.process_dump()
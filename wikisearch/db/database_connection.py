@@ -1,16 +1,17 @@
 import logging
+from contextlib import contextmanager
 
 from mysql.connector import pooling
 
 
 class DatabaseConnectionService:
-    def __init__(self, config):
+    def __init__(self, config, pool_size: int = 10):
         self.logger = logging.getLogger(__name__)
         self.logger.debug(
             "Initializing DatabaseConnectionService with config: %s", config)
         self.pool = pooling.MySQLConnectionPool(
             pool_name="pool",
-            pool_size=10,
+            pool_size=pool_size,
             **config
         )
 
@@ -18,13 +19,22 @@ class DatabaseConnectionService:
         self.logger.debug("Getting a connection from the pool")
         return self.pool.get_connection()
 
+    @contextmanager
+    def connection(self):
+        """Check out a pooled connection for the duration of a with block, e.g. one request."""
+        connection = self.get_connection()
+        try:
+            yield connection
+        finally:
+            connection.close()
+
     def __enter__(self):
         self.logger.debug("Entering context and getting a connection")
-        self.connection = self.get_connection()
-        return self.connection
+        self.context_connection = self.get_connection()
+        return self.context_connection
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.logger.debug("Exiting context and closing the connection")
-        self.connection.close()
+        self.context_connection.close()
         if exc_type:
             self.logger.error("Exception occurred: %s", exc_val)
@@ -0,0 +1,113 @@
+import logging
+import threading
+from typing import List
+
+import lmdb
+import zstandard
+
+from wikisearch.db.file_database import META_DB, open_sub_database
+
+# every zstd frame starts with these bytes; UTF-8 text never does (0xB5 cannot follow an ASCII byte)
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+DICTIONARY_KEY = b"zstd_dictionary"
+
+
+class DocumentCodec:
+    def __init__(self, lmdb_env: lmdb.Environment, level: int = 3):
+        """
+        Compression of the document texts stored in the main LMDB database.
+
+        Texts are stored as zstd frames, compressed with the dictionary kept in the meta
+        sub-database if one has been trained. Values stored before compression was enabled
+        are plain UTF-8 and are recognized by the missing zstd magic bytes, so old and new
+        values can be read side by side. A frame compressed with another dictionary than the
+        loaded one, e.g. by a migration running next to the API, reloads the dictionary.
+
+        :param lmdb_env: LMDB environment of the documents, opened with named sub-databases enabled.
+        :param level: zstd compression level of new values.
+        """
+        self.logger = logging.getLogger(__name__)
+        self.lmdb_env = lmdb_env
+        self.level = level
+        # zstd compressors and decompressors must not be shared between threads
+        self.local = threading.local()
+        self.dictionary = None
+        self.dictionary_lock = threading.Lock()
+        self.load_dictionary()
+
+    def load_dictionary(self):
+        """Use the dictionary stored in the meta sub-database, if there is one."""
+        meta_db = open_sub_database(self.lmdb_env, META_DB)
+        if meta_db is None:
+            return
+        with self.lmdb_env.begin(db=meta_db) as txn:
+            data = txn.get(DICTIONARY_KEY)
+        if data is None:
+            return
+        self.dictionary = zstandard.ZstdCompressionDict(data)
+        self.local = threading.local()
+        self.logger.info(
+            f"Loaded compression dictionary {self.dictionary.dict_id()} of {len(data)} bytes")
+
+    def dictionary_id(self) -> int:
+        return self.dictionary.dict_id() if self.dictionary is not None else 0
+
+    def check_dictionary(self, value):
+        """Reload the dictionary if the frame was compressed with another one."""
+        dict_id = zstandard.get_frame_parameters(value).dict_id
+        if dict_id == 0 or dict_id == self.dictionary_id():
+            return
+        with self.dictionary_lock:
+            if dict_id != self.dictionary_id():
+                self.load_dictionary()
+        if dict_id != self.dictionary_id():
+            self.logger.error(
+                f"Value is compressed with dictionary {dict_id}, the stored one is {self.dictionary_id()}")
+
+    def train_dictionary(self, samples: List[bytes], size: int = 112640):
+        """Train a dictionary on sample texts, store it in the meta sub-database and use it for new values."""
+        dictionary = zstandard.train_dictionary(size, samples, level=self.level)
+        meta_db = open_sub_database(self.lmdb_env, META_DB, create=True)
+        with self.lmdb_env.begin(write=True, db=meta_db) as txn:
+            txn.put(DICTIONARY_KEY, dictionary.as_bytes())
+        self.dictionary = dictionary
+        self.local = threading.local()
+        self.logger.info(
+            f"Trained compression dictionary {dictionary.dict_id()} on {len(samples)} samples")
+
+    def compressor(self) -> zstandard.ZstdCompressor:
+        if not hasattr(self.local, "compressor"):
+            self.local.compressor = zstandard.ZstdCompressor(
+                level=self.level, dict_data=self.dictionary)
+        return self.local.compressor
+
+    def decompressor(self) -> zstandard.ZstdDecompressor:
+        if not hasattr(self.local, "decompressor"):
+            self.local.decompressor = zstandard.ZstdDecompressor(
+                dict_data=self.dictionary)
+        return self.local.decompressor
+
+    @staticmethod
+    def is_compressed(value) -> bool:
+        return bytes(value[:len(ZSTD_MAGIC)]) == ZSTD_MAGIC
+
+    def encode(self, text: str) -> bytes:
+        return self.compressor().compress(text.encode('utf-8'))
+
+    def decode(self, value) -> str:
+        return self.read(value).decode('utf-8')
+
+    def read(self, value) -> bytes:
+        """The UTF-8 encoded text of a stored value."""
+        if not self.is_compressed(value):
+            return bytes(value)
+        self.check_dictionary(value)
+        return self.decompressor().decompress(value)
+
+    def read_prefix(self, value, size: int) -> bytes:
+        """At most the first size bytes of the UTF-8 encoded text, decompressing no more than needed."""
+        if not self.is_compressed(value):
+            return bytes(value[:size])
+        self.check_dictionary(value)
+        with self.decompressor().stream_reader(value) as reader:
+            return reader.read(size)
@@ -0,0 +1,29 @@
+import os
+
+import lmdb
+
+# named sub-databases stored next to the documents of the main database
+SUMMARIES_DB = b"summaries"
+TERM_OFFSETS_DB = b"term_offsets"
+META_DB = b"meta"
+MAX_DBS = 8
+
+
+def open_file_database(path: str, size: int) -> lmdb.Environment:
+    """Open the LMDB environment of the documents, creating its directory if needed."""
+    if not os.path.exists(path):
+        os.makedirs(path)
+    return lmdb.open(path, map_size=int(size), max_dbs=MAX_DBS)
+
+
+def open_sub_database(lmdb_env: lmdb.Environment, name: bytes, create: bool = False):
+    """Handle of a named sub-database, or None if it does not exist and create is False."""
+    try:
+        return lmdb_env.open_db(name, create=create)
+    except lmdb.NotFoundError:
+        return None
+
+
+def is_document_key(key) -> bool:
+    """Whether a key of the main database is a document id rather than the name of a sub-database."""
+    return bytes(key).isdigit()
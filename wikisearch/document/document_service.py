@@ -1,19 +1,72 @@
+from typing import Dict, Iterable, List, Tuple
 
+from wikisearch.document.metadata_table import DocumentMetadataTable
 from wikisearch.summary.summary_service import SummaryService
+from wikisearch.summary.term_offsets import highlight_spans
 
 
 class DocumentService():
-    def __init__(self, db_connection, lmdb_env) -> None:
-        self.db_connection = db_connection
-        self.cursor = self.db_connection.cursor()
+    def __init__(self, lmdb_env, metadata_table: DocumentMetadataTable | None = None) -> None:
+        """
+        :param metadata_table: Table to read titles and URLs from without querying the database.
+            Documents missing from it are looked up in the database with the connection of the call.
+        """
         self.summarizer = SummaryService(lmdb_env)
+        self.metadata_table = metadata_table
 
-    def fetch_document(self, document_id: int, score: float):
-        self.cursor.execute(
-            "SELECT id, title, url FROM document WHERE id = %s", (document_id,))
-        document = self.cursor.fetchone()
-        if document is None:
-            return None
-        summary = self.summarizer.summarize_static(document_id)
-        return {"document_id": document_id, "title": document[1],
-                "url": document[2], "summary": summary, "score": score}
+    def fetch_document(self, document_id: int, score: float, connection):
+        """
+        Fetch the title, URL and summary of a search result.
+
+        :param connection: Connection to query with, e.g. one checked out for the current request.
+        """
+        documents = self.fetch_documents([document_id], [score], connection=connection)
+        return documents[0] if documents else None
+
+    def fetch_metadata(self, document_ids: List[int], connection) -> Dict[int, Tuple[str, str]]:
+        """Title and URL of the given documents, from the metadata table and one query for the rest."""
+        rows = self.metadata_table.lookup(document_ids) if self.metadata_table is not None else {}
+        missing_ids = [document_id for document_id in document_ids if document_id not in rows]
+        if not missing_ids:
+            return rows
+        placeholders = ', '.join(['%s'] * len(missing_ids))
+        cursor = connection.cursor()
+        try:
+            cursor.execute(
+                f"SELECT id, title, url FROM document WHERE id IN ({placeholders})", tuple(missing_ids))
+            rows.update({row[0]: (row[1], row[2]) for row in cursor.fetchall()})
+        finally:
+            cursor.close()
+        return rows
+
+    def fetch_documents(self, document_ids: List[int], scores: List[float], connection,
+                        terms: Iterable[str] | None = None, dynamic: bool = False) -> List[dict]:
+        """
+        Fetch the title, URL and summary of a page of search results at once.
+
+        Titles and URLs come from the metadata table, or from one query for all rows, and all
+        summaries from one read-only LMDB transaction.
+        Results keep the order of document_ids; documents that no longer exist are skipped.
+
+        :param connection: Connection to query with, e.g. one checked out for the current request.
+        :param terms: Words to highlight, e.g. the query words and their inflected forms.
+            "title_highlights" and "highlights" hold the character spans of these words in the
+            title and the summary.
+        :param dynamic: Return query-biased snippets around the terms instead of static summaries.
+        """
+        if not document_ids:
+            return []
+        rows = self.fetch_metadata(document_ids, connection)
+
+        found_ids = [document_id for document_id in document_ids if document_id in rows]
+        terms = {term.lower() for term in terms or []}
+        if dynamic and terms:
+            summaries = self.summarizer.summarize_dynamic_many(found_ids, sorted(terms))
+        else:
+            summaries = {document_id: (summary, highlight_spans(summary, terms)) for document_id, summary
+                         in self.summarizer.summarize_static_many(found_ids).items()}
+        return [{"document_id": document_id, "title": rows[document_id][0],
+                 "title_highlights": highlight_spans(rows[document_id][0], terms),
+                 "url": rows[document_id][1], "summary": summaries.get(document_id, ("", []))[0],
+                 "highlights": summaries.get(document_id, ("", []))[1], "score": score}
+                for document_id, score in zip(document_ids, scores) if document_id in rows]
@@ -0,0 +1,130 @@
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+
+class DocumentMetadataTable:
+    ENTRIES_FILE = "entries.i64"
+    STRINGS_FILE = "strings.bin"
+
+    def __init__(self, path: Path, read_only: bool = False):
+        """
+        Append-only on-disk table of the title and URL of every document.
+
+        Titles and URLs are packed, UTF-8 encoded, into one blob file. A parallel int64 table
+        holds (document_id, offset, title_length, url_length) for every entry, so a page of
+        results is rendered from two memory-mapped files without a database round trip.
+        When a document is appended again, its last entry wins.
+
+        :param path: Directory holding the table files.
+        :param read_only: Open the table for reading only, e.g. while the crawler appends to it.
+        """
+        self.logger = logging.getLogger(__name__)
+        self.path = path
+        self.read_only = read_only
+        self.entries_path = self.path / self.ENTRIES_FILE
+        self.strings_path = self.path / self.STRINGS_FILE
+        self.entry_size = 4 * np.dtype(np.int64).itemsize
+        self.lock = threading.Lock()
+        self.entries_file = None
+        self.strings_file = None
+        # entries sorted by document id, rebuilt lazily when the table has grown
+        self.mapped_rows = 0
+        self.entries = np.empty((0, 4), dtype=np.int64)
+        self.strings = np.empty(0, dtype=np.uint8)
+        self.sorted_doc_ids = np.empty(0, dtype=np.int64)
+        self.sorted_rows = np.empty(0, dtype=np.int64)
+
+        if not self.read_only:
+            self.path.mkdir(parents=True, exist_ok=True)
+            self.entries_path.touch()
+            self.strings_path.touch()
+            self._truncate_partial_rows()
+
+    def _truncate_partial_rows(self):
+        """Drop entries that were only partially written, e.g. after a crash."""
+        rows = len(self)
+        if self.entries_path.stat().st_size != rows * self.entry_size:
+            self.logger.warning(
+                f"Truncating {self.entries_path} to {rows} complete entries")
+            with open(self.entries_path, "r+b") as f:
+                f.truncate(rows * self.entry_size)
+
+    def __len__(self) -> int:
+        if not (self.entries_path.is_file() and self.strings_path.is_file()):
+            return 0
+        return self.entries_path.stat().st_size // self.entry_size
+
+    def append_many(self, documents: Iterable[Tuple[int, str, str]]):
+        """Append the (document_id, title, url) of several documents."""
+        if self.read_only:
+            raise ValueError("Cannot append to a read-only metadata table")
+        with self.lock:
+            if self.entries_file is None or self.strings_file is None:
+                self.entries_file = open(self.entries_path, "ab")
+                self.strings_file = open(self.strings_path, "ab")
+            offset = self.strings_file.tell()
+            strings = []
+            entries = []
+            for document_id, title, url in documents:
+                title_bytes, url_bytes = title.encode('utf-8'), url.encode('utf-8')
+                strings.append(title_bytes + url_bytes)
+                entries.append((document_id, offset, len(title_bytes), len(url_bytes)))
+                offset += len(title_bytes) + len(url_bytes)
+            # strings first: an entry only counts once the strings it points to are written
+            self.strings_file.write(b"".join(strings))
+            self.strings_file.flush()
+            self.entries_file.write(
+                np.array(entries, dtype=np.int64).reshape(-1, 4).tobytes())
+            self.entries_file.flush()
+
+    def append(self, document_id: int, title: str, url: str):
+        """Append the title and URL of a document, e.g. when it is saved."""
+        self.append_many([(document_id, title, url)])
+
+    def _mapped(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Memory-mapped entries and strings with the sort order by document id, remapped when the table has grown."""
+        with self.lock:
+            rows = len(self)
+            if rows and rows != self.mapped_rows:
+                self.entries = np.memmap(self.entries_path, dtype=np.int64, mode="r", shape=(rows, 4))
+                if self.strings_path.stat().st_size:
+                    self.strings = np.memmap(self.strings_path, dtype=np.uint8, mode="r")
+                stored_doc_ids = np.array(self.entries[:, 0])
+                self.sorted_rows = np.argsort(stored_doc_ids, kind="stable")
+                self.sorted_doc_ids = stored_doc_ids[self.sorted_rows]
+                self.mapped_rows = rows
+            return self.entries, self.strings, self.sorted_doc_ids, self.sorted_rows
+
+    def document_ids(self) -> np.ndarray:
+        """Ids of all documents in the table."""
+        return np.unique(self._mapped()[2])
+
+    def lookup(self, document_ids: List[int]) -> Dict[int, Tuple[str, str]]:
+        """Title and URL of every given document that is in the table."""
+        entries, strings, sorted_doc_ids, sorted_rows = self._mapped()
+        if not len(document_ids) or not len(sorted_doc_ids):
+            return {}
+        ids = np.asarray(document_ids, dtype=np.int64)
+        # the last of equal ids in the stable order is the latest entry
+        positions = np.searchsorted(sorted_doc_ids, ids, side="right") - 1
+        found = (positions >= 0) & (sorted_doc_ids[np.maximum(positions, 0)] == ids)
+
+        documents = {}
+        for document_id, row in zip(ids[found].tolist(), sorted_rows[positions[found]].tolist()):
+            _, offset, title_length, url_length = entries[row].tolist()
+            data = strings[offset:offset + title_length + url_length].tobytes()
+            documents[document_id] = (data[:title_length].decode('utf-8'),
+                                      data[title_length:].decode('utf-8'))
+        return documents
+
+    def close(self):
+        with self.lock:
+            for f in (self.entries_file, self.strings_file):
+                if f is not None:
+                    f.close()
+            self.entries_file = None
+            self.strings_file = None
@@ -105,7 +105,7 @@ class BatchEvaluator:
                 # Get results from your custom indexes.
                 # Assume these functions return a list of tuples: (doc_id, distance).
                 inv_raw = self.inverted_index.search(
-                    query, self.num_results_per_query)
+                    query, self.num_results_per_query, connection=self.db_connection)
                 sem_raw = self.semantic_index.search(
                     query, self.num_results_per_query, 0, "avg")
 
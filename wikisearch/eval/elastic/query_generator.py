@@ -5,7 +5,6 @@ import re
 from pathlib import Path
 from typing import List
 
-import lmdb
 import nltk
 import requests
 import tomli
@@ -14,6 +13,8 @@ from nltk.collocations import BigramCollocationFinder
 from nltk.metrics import BigramAssocMeasures
 
 from wikisearch.db.database_connection import DatabaseConnectionService
+from wikisearch.db.document_codec import DocumentCodec
+from wikisearch.db.file_database import open_file_database
 
 nltk.download('punkt')
 nltk.download('stopwords')
@@ -23,6 +24,7 @@ class QueryGenerator:
     def __init__(self, db_connection, lmdb_env):
         self.db_connection = db_connection
         self.lmdb_env = lmdb_env
+        self.codec = DocumentCodec(lmdb_env)
         self.cursor = self.db_connection.cursor()
 
     def get_random_article_titles(self, n) -> List[str]:
@@ -54,7 +56,7 @@ class QueryGenerator:
         collocations = []
         for doc_id in doc_ids:
             with self.lmdb_env.begin(write=True) as txn:
-                text = txn.get(str(doc_id).encode()).decode().replace('\n', ' ')
+                text = self.codec.decode(txn.get(str(doc_id).encode())).replace('\n', ' ')
 
                 tokens = nltk.word_tokenize(text)
                 tokens = [token.lower()
@@ -169,7 +171,7 @@ def main():
         "path": config["FileDatabase"].get("Path", "./lmdb_store"),
         "size": int(config["FileDatabase"].get("Size", 10**9))
     }
-    lmdb_env = lmdb.open(LMDB_CONFIG["path"], map_size=LMDB_CONFIG["size"])
+    lmdb_env = open_file_database(LMDB_CONFIG["path"], LMDB_CONFIG["size"])
     with DatabaseConnectionService(DB_CONFIG) as connection:
         generator = QueryGenerator(connection, lmdb_env)
 
@@ -0,0 +1,106 @@
+import json
+import statistics
+import time
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+from wikisearch.index.embeddings_generator import EmbeddingsGenerator
+
+
+def top_k_documents(query_embeddings: np.ndarray, segment_embeddings: np.ndarray,
+                    document_starts: np.ndarray, document_ids: np.ndarray, k: int) -> List[set]:
+    """
+    Rank documents by their most similar segment and return the top k document ids per query.
+    Segments of a document must be contiguous, starting at the offsets in document_starts, which
+    must be strictly increasing, i.e. documents without segments are left out.
+    """
+    if not len(document_starts):
+        return [set() for _ in range(len(query_embeddings))]
+    similarities = query_embeddings @ segment_embeddings.T
+    document_scores = np.maximum.reduceat(similarities, document_starts, axis=1)
+    k = min(k, document_scores.shape[1])
+    candidates = np.argpartition(-document_scores, k - 1, axis=1)[:, :k]
+    return [set(document_ids[row].tolist()) for row in candidates]
+
+
+class BackendEvaluator:
+    def __init__(self, reference: EmbeddingsGenerator, candidate: EmbeddingsGenerator,
+                 num_results_per_query: int = 10, output_metrics: Path | None = None):
+        """
+        Compare an embeddings backend against the fp32 reference model.
+
+        :param reference: Generator using the reference (fp32 PyTorch) backend.
+        :param candidate: Generator using the backend under test.
+        :param num_results_per_query: Number of documents compared per query.
+        :param output_metrics: Optional path to store the metrics as JSON.
+        """
+        self.reference = reference
+        self.candidate = candidate
+        self.num_results_per_query = num_results_per_query
+        self.output_metrics = output_metrics
+
+    @staticmethod
+    def query_latency(generator: EmbeddingsGenerator, queries: List[str]) -> float:
+        """Median latency of embedding a single query, in milliseconds."""
+        generator.str_to_embedding(queries[0])  # warm-up
+        latencies = []
+        for query in queries:
+            start = time.perf_counter()
+            generator.str_to_embedding(query)
+            latencies.append((time.perf_counter() - start) * 1000)
+        return statistics.median(latencies)
+
+    def run_evaluation(self, documents: List[str], queries: List[str]) -> dict:
+        segments = []
+        document_starts = []
+        document_ids = []
+        for document_id, text in enumerate(documents):
+            document_segments = self.reference.split_text(text)
+            # reduceat needs strictly increasing starts, so empty documents are left out
+            if document_segments:
+                document_starts.append(len(segments))
+                document_ids.append(document_id)
+                segments.extend(document_segments)
+        starts = np.array(document_starts, dtype=np.int64)
+        ids = np.array(document_ids, dtype=np.int64)
+
+        reference_segments = self.reference.list_to_embeddings(segments)
+        candidate_segments = self.candidate.list_to_embeddings(segments)
+        # embeddings are normalized, so the row-wise dot product is the cosine similarity
+        segment_cosines = np.sum(reference_segments * candidate_segments, axis=1)
+
+        reference_queries = self.reference.list_to_embeddings(queries)
+        candidate_queries = self.candidate.list_to_embeddings(queries)
+        query_cosines = np.sum(reference_queries * candidate_queries, axis=1)
+
+        reference_results = top_k_documents(
+            reference_queries, reference_segments, starts, ids, self.num_results_per_query)
+        candidate_results = top_k_documents(
+            candidate_queries, candidate_segments, starts, ids, self.num_results_per_query)
+        overlaps = [len(ref & cand) / len(ref)
+                    for ref, cand in zip(reference_results, candidate_results) if ref]
+
+        metrics = {
+            "backend": self.candidate.backend,
+            "documents": len(documents),
+            "segments": len(segments),
+            "queries": len(queries),
+            "segment_cosine_mean": float(segment_cosines.mean()),
+            "segment_cosine_min": float(segment_cosines.min()),
+            "query_cosine_mean": float(query_cosines.mean()),
+            "query_cosine_min": float(query_cosines.min()),
+            f"overlap_at_{self.num_results_per_query}": float(np.mean(overlaps)) if overlaps else 0.0,
+            "reference_query_latency_ms": self.query_latency(self.reference, queries),
+            "candidate_query_latency_ms": self.query_latency(self.candidate, queries),
+        }
+
+        if self.output_metrics is not None:
+            with open(self.output_metrics, "w", encoding="utf-8") as f:
+                json.dump(metrics, f, ensure_ascii=False, indent=2)
+
+        print(f"\n=== {self.reference.backend} vs {self.candidate.backend} ===")
+        for key, value in metrics.items():
+            print(f"{key}: {value:.4f}" if isinstance(value, float) else f"{key}: {value}")
+        return metrics
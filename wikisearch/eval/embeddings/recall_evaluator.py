@@ -0,0 +1,68 @@
+import json
+import statistics
+import time
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+from wikisearch.index.flat_semantic_index import FlatIndexService
+
+
+class RecallEvaluator:
+    def __init__(self, oracle: FlatIndexService, candidate, num_results_per_query: int = 10,
+                 output_metrics: Path | None = None):
+        """
+        Measure the recall of an approximate semantic index against exact search.
+
+        Both services rank documents by their nearest segment ("min" aggregation), so the
+        recall is the fraction of the exact top documents the approximate index also returns.
+
+        :param oracle: Exact search over the embedding store holding the indexed vectors.
+        :param candidate: The approximate index service under test.
+        :param num_results_per_query: Number of documents compared per query.
+        :param output_metrics: Optional path to store the metrics as JSON.
+        """
+        self.oracle = oracle
+        self.candidate = candidate
+        self.num_results_per_query = num_results_per_query
+        self.output_metrics = output_metrics
+
+    def timed_search(self, service, queries: List[str]):
+        """Top documents of every query and the median search latency in milliseconds."""
+        results = []
+        latencies = []
+        for query in queries:
+            start = time.perf_counter()
+            documents = service.search(
+                query, self.num_results_per_query, strategy="min")
+            latencies.append((time.perf_counter() - start) * 1000)
+            results.append({doc_id for doc_id, _ in documents})
+        return results, statistics.median(latencies)
+
+    def run_evaluation(self, queries: List[str]) -> dict:
+        self.oracle.embeddings_generator.str_to_embedding(queries[0])  # warm-up
+        exact_results, exact_latency = self.timed_search(self.oracle, queries)
+        candidate_results, candidate_latency = self.timed_search(
+            self.candidate, queries)
+        recalls = [len(exact & approximate) / len(exact)
+                   for exact, approximate in zip(exact_results, candidate_results) if exact]
+
+        metrics = {
+            "index": type(self.candidate).__name__,
+            "segments": len(self.oracle.embedding_store),
+            "queries": len(queries),
+            f"recall_at_{self.num_results_per_query}": float(np.mean(recalls)) if recalls else 0.0,
+            f"recall_at_{self.num_results_per_query}_min": float(np.min(recalls)) if recalls else 0.0,
+            "exact_query_latency_ms": exact_latency,
+            "candidate_query_latency_ms": candidate_latency,
+        }
+
+        if self.output_metrics is not None:
+            with open(self.output_metrics, "w", encoding="utf-8") as f:
+                json.dump(metrics, f, ensure_ascii=False, indent=2)
+
+        print(f"\n=== {metrics['index']} vs exact search ===")
+        for key, value in metrics.items():
+            print(f"{key}: {value:.4f}" if isinstance(value, float) else f"{key}: {value}")
+        return metrics
@@ -0,0 +1,65 @@
+import json
+import random
+import statistics
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+
+def misspell(word: str, rng: random.Random) -> str:
+    """The word with one random deletion, insertion, substitution or transposition."""
+    alphabet = "абвгдежзийклмнопрстуфхцчшщъьюя"
+    position = rng.randrange(len(word))
+    edit = rng.choice(["delete", "insert", "substitute", "transpose"])
+    if edit == "delete" and len(word) > 1:
+        return word[:position] + word[position + 1:]
+    if edit == "transpose" and position < len(word) - 1:
+        return word[:position] + word[position + 1] + word[position] + word[position + 2:]
+    if edit == "substitute":
+        return word[:position] + rng.choice(alphabet) + word[position + 1:]
+    return word[:position] + rng.choice(alphabet) + word[position:]
+
+
+class SpellEvaluator:
+    def __init__(self, checkers: Dict[str, object], output_metrics: Path | None = None):
+        """
+        Compare the latency and accuracy of spell checking backends.
+
+        :param checkers: Spell checkers by name, e.g. {"hunspell": ..., "symspell": ...}.
+        :param output_metrics: Optional path to store the metrics as JSON.
+        """
+        self.checkers = checkers
+        self.output_metrics = output_metrics
+
+    @staticmethod
+    def sample_pairs(words: List[str], n: int, seed: int = 0) -> List[Tuple[str, str]]:
+        """n (misspelled, correct) pairs of distinct vocabulary words with at least four letters."""
+        rng = random.Random(seed)
+        candidates = sorted({word.lower() for word in words if len(word) >= 4 and word.isalpha()})
+        return [(misspell(word, rng), word) for word in rng.sample(candidates, min(n, len(candidates)))]
+
+    def run_evaluation(self, pairs: List[Tuple[str, str]]) -> dict:
+        metrics = {"queries": len(pairs)}
+        for name, checker in self.checkers.items():
+            latencies = []
+            correct = 0
+            # every word is checked once, so the correction caches do not hide the lookup cost
+            for misspelled, expected in pairs:
+                start = time.perf_counter()
+                corrected = checker.check_and_correct([misspelled])[0]
+                latencies.append((time.perf_counter() - start) * 1000)
+                correct += corrected.lower() == expected
+            metrics[f"{name}_median_latency_ms"] = statistics.median(latencies)
+            metrics[f"{name}_p95_latency_ms"] = float(np.percentile(latencies, 95))
+            metrics[f"{name}_accuracy"] = correct / len(pairs) if pairs else 0.0
+
+        if self.output_metrics is not None:
+            with open(self.output_metrics, "w", encoding="utf-8") as f:
+                json.dump(metrics, f, ensure_ascii=False, indent=2)
+
+        print("\n=== Spell checking backends ===")
+        for key, value in metrics.items():
+            print(f"{key}: {value:.4f}" if isinstance(value, float) else f"{key}: {value}")
+        return metrics
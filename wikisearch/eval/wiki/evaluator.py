@@ -129,7 +129,7 @@ class BatchEvaluator:
                     query, self.num_results_per_query)
 
                 inv_results = self.inverted_index.search(
-                    query, self.num_results_per_query)
+                    query, self.num_results_per_query, connection=self.db_connection)
                 sem_results = self.semantic_index.search(
                     query, self.num_results_per_query)
 
@@ -0,0 +1,89 @@
+from itertools import groupby
+from operator import itemgetter
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+# Raw ANN hits are (document_id, cosine_distance) pairs, one per matching segment.
+
+
+def aggregate_sum(raw_results: List[Tuple[int, float]]) -> List[Tuple[int, float]]:
+    """Sum (1 - distance) over the segments of each document, best first."""
+    aggregated_results = []
+    for doc_id, group in groupby(sorted(raw_results, key=itemgetter(0)), key=itemgetter(0)):
+        scores = [score for _, score in group]
+        aggregated_results.append((doc_id, sum(1 - s for s in scores)))
+    aggregated_results.sort(key=lambda x: x[1], reverse=True)
+    return aggregated_results
+
+
+def aggregate_min(raw_results: List[Tuple[int, float]]) -> List[Tuple[int, float]]:
+    """Keep the smallest distance of each document, best (lowest) first."""
+    aggregated_results = []
+    for doc_id, group in groupby(sorted(raw_results, key=itemgetter(0)), key=itemgetter(0)):
+        scores = [score for _, score in group]
+        aggregated_results.append((doc_id, min(scores) if scores else 1.0))
+    aggregated_results.sort(key=lambda x: x[1])
+    return aggregated_results
+
+
+def aggregate_avg(raw_results: List[Tuple[int, float]]) -> List[Tuple[int, float]]:
+    """Average (1 - distance) over the segments of each document, best first."""
+    aggregated_results = []
+    for doc_id, group in groupby(sorted(raw_results, key=itemgetter(0)), key=itemgetter(0)):
+        scores = [score for _, score in group]
+        aggregated_score = sum(1 - s for s in scores) / \
+            len(scores) if scores else 0.0
+        aggregated_results.append((doc_id, aggregated_score))
+    aggregated_results.sort(key=lambda x: x[1], reverse=True)
+    return aggregated_results
+
+
+AGGREGATION_STRATEGIES: Dict[str, Callable[[List[Tuple[int, float]]], List[Tuple[int, float]]]] = {
+    "sum": aggregate_sum,
+    "min": aggregate_min,
+    "avg": aggregate_avg,
+}
+
+
+def rerank_candidates(candidates: List[Tuple[int, float]], row_doc_ids: np.ndarray, vectors: np.ndarray,
+                      query_embedding: np.ndarray) -> List[Tuple[int, float]]:
+    """Re-score candidate documents by the cosine similarity of their best segment to the query.
+
+    All segment vectors are scored with a single matrix product. Candidates without
+    vectors keep their original order after the re-scored ones.
+
+    :param candidates: (document_id, score) pairs, e.g. from BM25.
+    :param row_doc_ids: Document id of every row of vectors.
+    :param vectors: Normalized segment vectors of the candidates, shape (rows, dimension).
+    :param query_embedding: Normalized query embedding, shape (dimension,).
+    """
+    best_similarity: Dict[int, float] = {}
+    if len(vectors):
+        similarities = vectors @ query_embedding
+        for doc_id, similarity in zip(row_doc_ids.tolist(), similarities.tolist()):
+            if similarity > best_similarity.get(doc_id, -np.inf):
+                best_similarity[doc_id] = similarity
+
+    reranked = sorted(best_similarity.items(), key=lambda x: x[1], reverse=True)
+    reranked += [(doc_id, 0.0) for doc_id, _ in candidates if doc_id not in best_similarity]
+    return reranked
+
+
+def nearest_segments(row_doc_ids: np.ndarray, vectors: np.ndarray, query_embedding: np.ndarray,
+                     count: int) -> List[Tuple[int, float]]:
+    """Exact count nearest segments as (document_id, cosine distance) pairs, nearest first.
+
+    :param row_doc_ids: Document id of every row of vectors.
+    :param vectors: Normalized segment vectors, shape (rows, dimension).
+    :param query_embedding: Normalized query embedding, shape (dimension,).
+    """
+    if not len(vectors) or count <= 0:
+        return []
+    distances = 1 - vectors @ query_embedding
+    if count < len(distances):
+        nearest = np.argpartition(distances, count - 1)[:count]
+    else:
+        nearest = np.arange(len(distances))
+    nearest = nearest[np.argsort(distances[nearest])]
+    return [(int(row_doc_ids[i]), float(distances[i])) for i in nearest]
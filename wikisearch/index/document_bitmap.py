@@ -0,0 +1,152 @@
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+# Named document subsets, each selected by a query returning one document id per row.
+FILTER_QUERIES: Dict[str, str] = {
+    "inverted": "SELECT DISTINCT document_id FROM body_tf",
+    "usearch": "SELECT document_id FROM usearch",
+}
+
+
+class DocumentBitmap:
+    def __init__(self, bits: np.ndarray | None = None):
+        """
+        Set of document ids stored as a bitmap with one bit per id.
+
+        Document ids are dense auto-increment keys, so a flat bitmap of the largest id is
+        compact (a few dozen kB for the whole corpus) and membership tests are a single
+        vectorized lookup. Bits are in little-endian order within each byte, the layout
+        expected by faiss.IDSelectorBitmap.
+
+        :param bits: Packed bitmap as a uint8 array.
+        """
+        self.bits = np.zeros(0, dtype=np.uint8) if bits is None else np.ascontiguousarray(
+            bits, dtype=np.uint8)
+        self.cardinality = int(np.unpackbits(self.bits).sum())
+
+    @classmethod
+    def from_ids(cls, doc_ids: Iterable[int]) -> "DocumentBitmap":
+        doc_ids = np.fromiter(doc_ids, dtype=np.int64) if not isinstance(
+            doc_ids, np.ndarray) else doc_ids.astype(np.int64)
+        if len(doc_ids) == 0:
+            return cls()
+        if doc_ids.min() < 0:
+            raise ValueError("Document ids must be non-negative")
+        mask = np.zeros(int(doc_ids.max()) + 1, dtype=bool)
+        mask[doc_ids] = True
+        return cls(np.packbits(mask, bitorder="little"))
+
+    @classmethod
+    def load(cls, path: Path) -> "DocumentBitmap":
+        return cls(np.load(path))
+
+    def save(self, path: Path):
+        np.save(path, self.bits)
+
+    def __len__(self) -> int:
+        return self.cardinality
+
+    def __contains__(self, doc_id: int) -> bool:
+        return bool(self.contains(np.array([doc_id]))[0])
+
+    def contains(self, doc_ids: np.ndarray) -> np.ndarray:
+        """Boolean mask of the document ids that are in the set."""
+        doc_ids = np.asarray(doc_ids, dtype=np.int64)
+        result = np.zeros(doc_ids.shape, dtype=bool)
+        in_range = (doc_ids >= 0) & (doc_ids < len(self.bits) * 8)
+        ids = doc_ids[in_range]
+        result[in_range] = (self.bits[ids >> 3] >> (ids & 7)) & 1
+        return result
+
+    def ids(self) -> np.ndarray:
+        """All document ids in the set, ascending."""
+        return np.flatnonzero(np.unpackbits(self.bits, bitorder="little"))
+
+    def __and__(self, other: "DocumentBitmap") -> "DocumentBitmap":
+        size = min(len(self.bits), len(other.bits))
+        return DocumentBitmap(self.bits[:size] & other.bits[:size])
+
+    def __or__(self, other: "DocumentBitmap") -> "DocumentBitmap":
+        size = max(len(self.bits), len(other.bits))
+        return DocumentBitmap(np.pad(self.bits, (0, size - len(self.bits)))
+                              | np.pad(other.bits, (0, size - len(other.bits))))
+
+
+class DocumentFilterService:
+    def __init__(self, queries: Dict[str, str] | None = None, fetch_size: int = 65536):
+        """
+        Holds the bitmaps of named document subsets.
+
+        The bitmaps are built by refresh, at startup and when the indexes are reloaded, so
+        requests only read them and never scan a table.
+
+        :param queries: Filter name to SQL query returning document ids, defaults to FILTER_QUERIES.
+        :param fetch_size: Number of rows fetched at once while building a bitmap.
+        """
+        self.logger = logging.getLogger(__name__)
+        self.queries = FILTER_QUERIES if queries is None else queries
+        self.fetch_size = fetch_size
+        self.bitmaps: Dict[str, DocumentBitmap] = {}
+        # serializes refreshes; requests read the bitmaps without it
+        self.lock = threading.Lock()
+
+    def names(self) -> List[str]:
+        return list(self.queries)
+
+    def bitmap(self, name: str) -> DocumentBitmap:
+        """Bitmap of the named subset, as of the last refresh."""
+        if name not in self.queries:
+            raise ValueError(
+                f"Unknown document filter '{name}', expected one of {self.names()}")
+        bitmaps = self.bitmaps
+        if name not in bitmaps:
+            raise ValueError(f"Document filter '{name}' is not available")
+        return bitmaps[name]
+
+    def _build(self, name: str, connection) -> DocumentBitmap:
+        cursor = connection.cursor()
+        try:
+            cursor.execute(self.queries[name])
+            chunks = []
+            while rows := cursor.fetchmany(self.fetch_size):
+                chunks.append(np.array([row[0] for row in rows], dtype=np.int64))
+        finally:
+            cursor.close()
+        bitmap = DocumentBitmap.from_ids(
+            np.concatenate(chunks) if chunks else np.empty(0, dtype=np.int64))
+        self.logger.info(
+            f"Built document filter '{name}' with {len(bitmap)} documents")
+        return bitmap
+
+    def resolve(self, names: str | None) -> DocumentBitmap | None:
+        """Intersection of the comma-separated named subsets, or None if no filter is given."""
+        if not names:
+            return None
+        bitmaps = [self.bitmap(name.strip())
+                   for name in names.split(",") if name.strip()]
+        if not bitmaps:
+            return None
+        result = bitmaps[0]
+        for bitmap in bitmaps[1:]:
+            result = result & bitmap
+        return result
+
+    def refresh(self, connection):
+        """
+        Rebuild every bitmap from the database and switch to the new ones.
+
+        Requests keep reading the previous bitmaps while the new ones are built. A bitmap that
+        fails to build keeps its previous version.
+        """
+        with self.lock:
+            bitmaps = dict(self.bitmaps)
+            for name in self.queries:
+                try:
+                    bitmaps[name] = self._build(name, connection)
+                except Exception as e:
+                    self.logger.error(f"Failed to build document filter '{name}': {e}")
+            self.bitmaps = bitmaps
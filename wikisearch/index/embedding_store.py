@@ -0,0 +1,145 @@
+import logging
+import threading
+from pathlib import Path
+from typing import Iterator, Tuple
+
+import numpy as np
+
+
+class EmbeddingStore:
+    VECTORS_FILE = "vectors.f32"
+    SEGMENTS_FILE = "segments.i64"
+
+    def __init__(self, path: Path, dimension: int, read_only: bool = False):
+        """
+        Append-only on-disk store of segment embeddings.
+
+        Vectors are kept in a raw float32 file that is read back as a memory-mapped
+        (rows, dimension) array. A parallel int64 table holds (document_id, segment_offset)
+        for every row, so ANN indexes can be rebuilt without re-encoding the corpus.
+
+        :param path: Directory holding the store files.
+        :param dimension: Dimension of the stored embeddings.
+        :param read_only: Open the store for reading only, e.g. while another process appends to it.
+        """
+        self.logger = logging.getLogger(__name__)
+        self.path = path
+        self.dimension = dimension
+        self.read_only = read_only
+        self.vectors_path = self.path / self.VECTORS_FILE
+        self.segments_path = self.path / self.SEGMENTS_FILE
+        self.vector_size = self.dimension * np.dtype(np.float32).itemsize
+        self.segment_size = 2 * np.dtype(np.int64).itemsize
+        self.lock = threading.Lock()
+        self.vectors_file = None
+        self.segments_file = None
+        # rows sorted by document id, rebuilt lazily when the store has grown
+        self.sorted_doc_ids = np.empty(0, dtype=np.int64)
+        self.sorted_rows = np.empty(0, dtype=np.int64)
+
+        if not self.read_only:
+            self.path.mkdir(parents=True, exist_ok=True)
+            self.vectors_path.touch()
+            self.segments_path.touch()
+            self._truncate_partial_rows()
+
+    def _truncate_partial_rows(self):
+        """Drop rows that were only partially written, e.g. after a crash."""
+        rows = len(self)
+        for file_path, row_size in ((self.vectors_path, self.vector_size), (self.segments_path, self.segment_size)):
+            if file_path.stat().st_size != rows * row_size:
+                self.logger.warning(
+                    f"Truncating {file_path} to {rows} complete rows")
+                with open(file_path, "r+b") as f:
+                    f.truncate(rows * row_size)
+
+    def __len__(self) -> int:
+        if not (self.vectors_path.is_file() and self.segments_path.is_file()):
+            return 0
+        return min(self.vectors_path.stat().st_size // self.vector_size,
+                   self.segments_path.stat().st_size // self.segment_size)
+
+    def append(self, doc_id: int, embeddings: np.ndarray):
+        """Append the segment embeddings of a document."""
+        if self.read_only:
+            raise ValueError("Cannot append to a read-only embedding store")
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        if embeddings.ndim != 2 or embeddings.shape[1] != self.dimension:
+            raise ValueError(
+                "Embeddings must be a NumPy array of shape (num_segments, dimension)")
+
+        segments = np.empty((embeddings.shape[0], 2), dtype=np.int64)
+        segments[:, 0] = doc_id
+        segments[:, 1] = np.arange(embeddings.shape[0])
+
+        with self.lock:
+            if self.vectors_file is None or self.segments_file is None:
+                self.vectors_file = open(self.vectors_path, "ab")
+                self.segments_file = open(self.segments_path, "ab")
+            # vectors first: a row only counts once its table entry is written as well
+            self.vectors_file.write(embeddings.tobytes())
+            self.vectors_file.flush()
+            self.segments_file.write(segments.tobytes())
+            self.segments_file.flush()
+
+    def vectors(self) -> np.ndarray:
+        """Memory-mapped, read-only (rows, dimension) array of all stored embeddings."""
+        rows = len(self)
+        if rows == 0:
+            return np.empty((0, self.dimension), dtype=np.float32)
+        return np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dimension))
+
+    def segments(self) -> np.ndarray:
+        """Memory-mapped, read-only (rows, 2) array of (document_id, segment_offset)."""
+        rows = len(self)
+        if rows == 0:
+            return np.empty((0, 2), dtype=np.int64)
+        return np.memmap(self.segments_path, dtype=np.int64, mode="r", shape=(rows, 2))
+
+    def iter_batches(self, batch_size: int = 65536, start: int = 0, stop: int | None = None
+                     ) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """Yield (document_ids, vectors) for consecutive blocks of rows in [start, stop)."""
+        vectors = self.vectors()
+        segments = self.segments()
+        stop = len(vectors) if stop is None else min(stop, len(vectors))
+        for offset in range(start, stop, batch_size):
+            end = min(offset + batch_size, stop)
+            yield np.array(segments[offset:end, 0]), np.array(vectors[offset:end])
+
+    def document_rows(self, doc_ids: np.ndarray) -> np.ndarray:
+        """Row numbers of all stored segments of the given documents."""
+        with self.lock:
+            if len(self.sorted_rows) != len(self):
+                stored_doc_ids = np.array(self.segments()[:, 0])
+                self.sorted_rows = np.argsort(stored_doc_ids, kind="stable")
+                self.sorted_doc_ids = stored_doc_ids[self.sorted_rows]
+            sorted_doc_ids, sorted_rows = self.sorted_doc_ids, self.sorted_rows
+
+        doc_ids = np.asarray(doc_ids, dtype=np.int64)
+        if not len(doc_ids):
+            return np.empty(0, dtype=np.int64)
+        starts = np.searchsorted(sorted_doc_ids, doc_ids, side="left")
+        ends = np.searchsorted(sorted_doc_ids, doc_ids, side="right")
+        return np.concatenate([sorted_rows[start:end] for start, end in zip(starts, ends)])
+
+    def document_vectors(self, doc_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (document_ids, vectors) of all stored segments of the given documents."""
+        rows = np.sort(self.document_rows(doc_ids))
+        return np.array(self.segments()[rows, 0]), np.array(self.vectors()[rows])
+
+    def sample(self, n: int, seed: int = 0) -> np.ndarray:
+        """Uniform random sample of n stored vectors, e.g. for training quantizers."""
+        vectors = self.vectors()
+        if n >= len(vectors):
+            return np.array(vectors)
+        rows = np.sort(np.random.default_rng(seed).choice(
+            len(vectors), n, replace=False))
+        return np.array(vectors[rows])
+
+    def close(self):
+        with self.lock:
+            for f in (self.vectors_file, self.segments_file):
+                if f is not None:
+                    f.close()
+            self.vectors_file = None
+            self.segments_file = None
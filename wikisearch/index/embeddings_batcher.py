@@ -0,0 +1,119 @@
+import logging
+import time
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+from wikisearch.index.embeddings_generator import EmbeddingsGenerator
+
+
+class EmbeddingsBatcher:
+    def __init__(self, embeddings_generator: EmbeddingsGenerator,
+                 bucket_boundaries: Sequence[int] = (32, 64, 128, 256, 512, 1024, 8192),
+                 max_tokens_per_batch: int = 16384,
+                 max_batch_size: int = 256,
+                 max_pending_segments: int = 2048,
+                 chars_per_token: float = 3.0):
+        """
+        Collect segments across documents and encode them in length-bucketed batches.
+
+        Segments are bucketed by their token length, estimated from their character length so
+        that they are not tokenized once more before encoding, and each batch only pads up to
+        about the longest segment of its bucket. The batch size of a bucket is chosen such that
+        batch_size * bucket_length stays within max_tokens_per_batch.
+
+        :param embeddings_generator: The generator wrapping the sentence-transformer model.
+        :param bucket_boundaries: Ascending upper token lengths of the buckets.
+        :param max_tokens_per_batch: Token budget (including padding) of a single batch.
+        :param max_batch_size: Upper bound for the batch size of the shortest buckets.
+        :param max_pending_segments: Number of collected segments after which the batcher is full.
+        :param chars_per_token: Average number of characters per model token of the corpus.
+        """
+        self.logger = logging.getLogger(__name__)
+        self.embeddings_generator = embeddings_generator
+        self.bucket_boundaries = sorted(bucket_boundaries)
+        self.max_tokens_per_batch = max_tokens_per_batch
+        self.max_batch_size = max_batch_size
+        self.max_pending_segments = max_pending_segments
+        self.chars_per_token = chars_per_token
+
+        self.pending_documents: List[Tuple[int, int]] = []
+        self.pending_segments: List[str] = []
+        self.total_segments = 0
+        self.total_seconds = 0.0
+
+    def add(self, doc_id: int, segments: List[str]) -> bool:
+        """Queue the segments of a document for encoding.
+
+        :return: True when enough segments are pending and the batcher should be flushed.
+        """
+        self.pending_documents.append((doc_id, len(segments)))
+        self.pending_segments.extend(segments)
+        return self.is_full()
+
+    def is_full(self) -> bool:
+        return len(self.pending_segments) >= self.max_pending_segments
+
+    def batch_size_for(self, bucket_length: int) -> int:
+        return max(1, min(self.max_batch_size, self.max_tokens_per_batch // bucket_length))
+
+    def estimated_token_lengths(self, segments: List[str]) -> np.ndarray:
+        return np.ceil(np.array([len(segment) for segment in segments]) / self.chars_per_token)
+
+    def encode(self, segments: List[str]) -> np.ndarray:
+        """Encode segments bucket by bucket and return the embeddings in the original order."""
+        embeddings = np.empty(
+            (len(segments), self.embeddings_generator.dimension), dtype=np.float32)
+        if not segments:
+            return embeddings
+
+        lengths = self.estimated_token_lengths(segments)
+        order = np.argsort(lengths, kind="stable")
+        bucket_ids = np.searchsorted(
+            self.bucket_boundaries, lengths[order], side="left")
+
+        for bucket_id in np.unique(bucket_ids):
+            indices = order[bucket_ids == bucket_id]
+            bucket_length = self.bucket_boundaries[min(
+                bucket_id, len(self.bucket_boundaries) - 1)]
+            batch_size = self.batch_size_for(bucket_length)
+            self.logger.debug(
+                f"Encoding {len(indices)} segments of up to {bucket_length} tokens with batch size {batch_size}")
+            embeddings[indices] = self.embeddings_generator.list_to_embeddings(
+                [segments[i] for i in indices], batch_size)
+        return embeddings
+
+    def flush(self) -> List[Tuple[int, np.ndarray]]:
+        """Encode all pending segments.
+
+        :return: A list of tuples (document_id, embeddings) in the order the documents were added.
+        """
+        if not self.pending_segments:
+            self.pending_documents = []
+            return []
+
+        documents, segments = self.pending_documents, self.pending_segments
+        self.pending_documents, self.pending_segments = [], []
+
+        start = time.perf_counter()
+        embeddings = self.encode(segments)
+        elapsed = time.perf_counter() - start
+
+        self.total_segments += len(segments)
+        self.total_seconds += elapsed
+        self.logger.info(
+            f"Encoded {len(segments)} segments of {len(documents)} documents "
+            f"at {len(segments) / elapsed:.1f} segments/sec "
+            f"(overall {self.throughput():.1f} segments/sec)")
+
+        results = []
+        position = 0
+        for doc_id, num_segments in documents:
+            results.append(
+                (doc_id, embeddings[position:position + num_segments]))
+            position += num_segments
+        return results
+
+    def throughput(self) -> float:
+        """Average number of encoded segments per second since the batcher was created."""
+        return self.total_segments / self.total_seconds if self.total_seconds > 0 else 0.0
@@ -1,37 +1,87 @@
-from typing import List
+import logging
+import threading
+from typing import Iterator, List
 
 import numpy as np
 from sentence_transformers import SentenceTransformer
 
+from wikisearch.nlp.segmenter import StreamingSegmenter
+
+MODEL_NAME = "Alibaba-NLP/gte-multilingual-base"
+BACKENDS = ("torch", "torch-int8", "onnx")
+
 
 class EmbeddingsGenerator:
-    def __init__(self, dimension: int, max_segment_length: int = 512):
-        self.model = SentenceTransformer(
-            "Alibaba-NLP/gte-multilingual-base", trust_remote_code=True)
+    def __init__(self, dimension: int, max_segment_length: int = 512, backend: str = "torch",
+                 onnx_file_name: str | None = None, segment_by_tokens: bool = False, segment_overlap: int = 0,
+                 load_model: bool = True):
+        """
+        Initialize the EmbeddingsGenerator.
+
+        :param dimension: Dimension of the produced embeddings.
+        :param max_segment_length: Maximum length of a text segment, in characters or model tokens.
+        :param backend: Inference backend - "torch" (fp32 PyTorch), "torch-int8" (PyTorch with
+            dynamically int8-quantized linear layers) or "onnx" (ONNX Runtime on CPU).
+        :param onnx_file_name: ONNX graph to load for the "onnx" backend, relative to the model
+            directory, e.g. "onnx/model_qint8_avx512_vnni.onnx". Defaults to "onnx/model.onnx".
+        :param segment_by_tokens: Measure segment lengths in model tokens instead of characters.
+        :param segment_overlap: Length of trailing sentences repeated at the start of the next segment.
+        :param load_model: Load the model now. Otherwise it is loaded on first use, so tools that
+            never encode text, e.g. index rebuilds from the embedding store, do not load it at all.
+        """
+        self.logger = logging.getLogger(__name__)
         self.dimension = dimension
         self.max_segment_length = max_segment_length
+        self.backend = backend
+        self.onnx_file_name = onnx_file_name
+        self.model_lock = threading.Lock()
+        self._model = self.load_model(backend, onnx_file_name) if load_model else None
+        self.segmenter = StreamingSegmenter(
+            max_segment_length, segment_overlap,
+            self.count_tokens if segment_by_tokens else len)
 
-    def split_text(self, text: str) -> List[str]:
-        sentences = text.split(". ")
-        segments = []
-        current_segment = []
+    @property
+    def model(self) -> SentenceTransformer:
+        if self._model is None:
+            with self.model_lock:
+                if self._model is None:
+                    self._model = self.load_model(self.backend, self.onnx_file_name)
+        return self._model
 
-        for sentence in sentences:
-            current_segment.append(sentence)
-            segment_text = ". ".join(current_segment)
+    def load_model(self, backend: str, onnx_file_name: str | None = None) -> SentenceTransformer:
+        self.logger.info(f"Loading {MODEL_NAME} with the {backend} backend")
+        if backend == "onnx":
+            model_kwargs = {"file_name": onnx_file_name} if onnx_file_name else None
+            return SentenceTransformer(
+                MODEL_NAME, backend="onnx", device="cpu", model_kwargs=model_kwargs, trust_remote_code=True)
+        if backend == "torch":
+            return SentenceTransformer(MODEL_NAME, trust_remote_code=True)
+        if backend == "torch-int8":
+            import torch
+
+            model = SentenceTransformer(
+                MODEL_NAME, device="cpu", trust_remote_code=True)
+            transformer = model[0]
+            transformer.auto_model = torch.ao.quantization.quantize_dynamic(
+                transformer.auto_model, {torch.nn.Linear}, dtype=torch.qint8)
+            return model
+        raise ValueError(
+            f"Unknown embeddings backend '{backend}', expected one of {BACKENDS}")
+
+    def split_text(self, text: str) -> List[str]:
+        return list(self.iter_segments(text))
 
-            if len(segment_text) > self.max_segment_length:
-                segments.append(". ".join(current_segment[:-1]))
-                current_segment = [sentence]
+    def iter_segments(self, text: str) -> Iterator[str]:
+        return self.segmenter.segments(text)
 
-        if current_segment:
-            segments.append(". ".join(current_segment))
-        return segments
+    def count_tokens(self, string: str) -> int:
+        return len(self.model.tokenizer.encode(string, add_special_tokens=False))
 
     def str_to_embedding(self, string: str) -> np.ndarray:
         embeddings = self.model.encode([string], normalize_embeddings=True)
         return embeddings
 
-    def list_to_embeddings(self, strings: List[str]) -> np.ndarray:
-        embeddings = self.model.encode(strings, normalize_embeddings=True)
+    def list_to_embeddings(self, strings: List[str], batch_size: int = 32) -> np.ndarray:
+        embeddings = self.model.encode(
+            strings, batch_size=batch_size, normalize_embeddings=True)
         return np.array(embeddings)
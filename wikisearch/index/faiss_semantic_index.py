@@ -1,45 +1,149 @@
 import atexit
 import logging
 from pathlib import Path
+from typing import List, Tuple
 
 import faiss
+import numpy as np
 
+from wikisearch.index.aggregation import (AGGREGATION_STRATEGIES,
+                                          rerank_candidates)
+from wikisearch.index.document_bitmap import DocumentBitmap
+from wikisearch.index.embedding_store import EmbeddingStore
+from wikisearch.index.embeddings_batcher import EmbeddingsBatcher
 from wikisearch.index.embeddings_generator import EmbeddingsGenerator
 
 
+INDEX_TYPES = ("hnsw", "ivfpq", "opq-ivfpq")
+
+
 class FAISSIndexService:
-    def __init__(self, path_to_index: Path, dimension: int, db_connection, save_threshold: int = 10, hnsw_M: int = 32):
+    def __init__(self, path_to_index: Path, dimension: int, db_connection=None, save_threshold: int = 10, hnsw_M: int = 32,
+                 embeddings_generator: EmbeddingsGenerator | None = None,
+                 embedding_store: EmbeddingStore | None = None,
+                 ef_search: int = 50,
+                 index_type: str = "hnsw",
+                 nlist: int = 4096,
+                 pq_m: int = 64,
+                 pq_nbits: int = 8,
+                 nprobe: int = 16,
+                 rerank_factor: int = 0):
+        """
+        Vector index, wrapped in an ID map so that search results are document ids.
+
+        :param db_connection: Only needed to migrate indexes that still keep their
+            document mapping in the faiss_to_document_id table. It is used while loading and not kept.
+        :param ef_search: Default HNSW efSearch, can be overridden per query.
+        :param index_type: Type of a newly created index - "hnsw" (full vectors in an HNSW graph),
+            "ivfpq" (inverted lists of product-quantized codes) or "opq-ivfpq" (IVF-PQ with an
+            OPQ rotation). The compressed types must be trained before vectors can be added.
+        :param nlist: Number of IVF cells.
+        :param pq_m: Number of PQ sub-quantizers, i.e. bytes per vector with 8-bit codes.
+        :param pq_nbits: Bits per PQ code.
+        :param nprobe: Default number of IVF cells visited per query, can be overridden per query.
+        :param rerank_factor: If positive and an embedding store is given, fetch rerank_factor
+            times more candidates and re-score their stored full-precision vectors exactly.
+        """
         self.logger = logging.getLogger(__name__)
         self.path_to_index = path_to_index
         self.dimension: int = dimension
-        self.conn = db_connection
-        self.cursor = self.conn.cursor()
-        self.embeddings_generator = EmbeddingsGenerator(self.dimension)
+        self.embeddings_generator = embeddings_generator or EmbeddingsGenerator(
+            self.dimension)
+        self.embeddings_batcher = EmbeddingsBatcher(self.embeddings_generator)
+        self.embedding_store = embedding_store
         self.save_threshold = save_threshold
         self.document_save_count = 0
         self.hnsw_M = hnsw_M  # Parameter for HNSW controlling the number of neighbors
+        self.ef_search = ef_search
+        if index_type not in INDEX_TYPES:
+            raise ValueError(
+                f"Unknown FAISS index type '{index_type}', expected one of {INDEX_TYPES}")
+        self.index_type = index_type
+        self.nlist = nlist
+        self.pq_m = pq_m
+        self.pq_nbits = pq_nbits
+        self.nprobe = nprobe
+        self.rerank_factor = rerank_factor
+        # set by writes to the index; saves, including the one at exit, are skipped without it,
+        # so a serving process never overwrites an index rebuilt by another process
+        self.dirty = False
 
-        self.index = self.load_or_create_index()
+        self.index = self.load_or_create_index(db_connection)
         atexit.register(self.save_index)
 
-    def load_or_create_index(self) -> faiss.IndexHNSWFlat:
+    def load_or_create_index(self, db_connection=None) -> faiss.IndexIDMap:
         if self.path_to_index.is_file():
             self.logger.info(f"Loading HNSW index from {self.path_to_index}")
             self.index = faiss.read_index(str(self.path_to_index))
+            if not isinstance(self.index, faiss.IndexIDMap):
+                self.index = self.migrate_legacy_index(self.index, db_connection)
         else:
-            self.logger.info(
-                f"Creating new HNSW index with dimension {self.dimension} and M={self.hnsw_M}")
-            self.index = faiss.IndexHNSWFlat(self.dimension, self.hnsw_M)
-            # Optionally, you can set the number of efSearch for higher recall:
-            self.index.hnsw.efSearch = 50
+            self.index = faiss.IndexIDMap(self.create_index())
+            self.dirty = True
             self.save_index()
         return self.index
 
+    def create_index(self) -> faiss.Index:
+        if self.index_type == "hnsw":
+            self.logger.info(
+                f"Creating new HNSW index with dimension {self.dimension} and M={self.hnsw_M}")
+            return faiss.IndexHNSWFlat(self.dimension, self.hnsw_M, faiss.METRIC_INNER_PRODUCT)
+
+        factory_string = f"IVF{self.nlist},PQ{self.pq_m}x{self.pq_nbits}"
+        if self.index_type == "opq-ivfpq":
+            factory_string = f"OPQ{self.pq_m}," + factory_string
+        self.logger.info(
+            f"Creating new {factory_string} index with dimension {self.dimension}")
+        return faiss.index_factory(self.dimension, factory_string, faiss.METRIC_INNER_PRODUCT)
+
+    def train_index(self, sample: np.ndarray):
+        """Train the coarse quantizer, PQ codebooks and OPQ rotation of a compressed index."""
+        if self.index.is_trained:
+            self.logger.info("Index is already trained")
+            return
+        self.logger.info(f"Training index on {len(sample)} vectors")
+        self.index.train(np.ascontiguousarray(  # type: ignore
+            sample, dtype=np.float32))
+        self.dirty = True
+        self.save_index()
+
+    def train_from_store(self, embedding_store: EmbeddingStore, num_samples: int = 262144):
+        """Train the index on a random sample of the stored embeddings."""
+        self.train_index(embedding_store.sample(num_samples))
+
+    def migrate_legacy_index(self, legacy_index, db_connection) -> faiss.IndexIDMap:
+        """Move the faiss_to_document_id mapping of an older index into an ID map stored with the index."""
+        self.logger.info(
+            f"Migrating document mapping of {legacy_index.ntotal} vectors into the index")
+        if db_connection is None:
+            raise ValueError(
+                "A database connection is needed to migrate the document mapping of the index")
+        cursor = db_connection.cursor()
+        try:
+            cursor.execute(
+                "SELECT faiss_id, document_id FROM faiss_to_document_id ORDER BY faiss_id")
+            doc_ids = np.full(legacy_index.ntotal, -1, dtype=np.int64)
+            for faiss_id, doc_id in cursor.fetchall():
+                doc_ids[faiss_id] = doc_id
+        finally:
+            cursor.close()
+
+        # IndexIDMap only accepts an empty index, so the populated one is attached afterwards
+        index = faiss.IndexIDMap(faiss.IndexHNSWFlat(
+            self.dimension, self.hnsw_M))
+        index.index = legacy_index
+        index.ntotal = legacy_index.ntotal
+        faiss.copy_array_to_vector(doc_ids, index.id_map)
+        faiss.write_index(index, str(self.path_to_index))
+        return faiss.read_index(str(self.path_to_index))
+
     def save_index(self):
-        if self.index is not None:
+        """Persist the index to disk, if it changed since it was loaded or last saved."""
+        if self.index is not None and self.dirty:
             self.logger.info(f"Saving index to {self.path_to_index}")
             try:
                 faiss.write_index(self.index, str(self.path_to_index))
+                self.dirty = False
             except Exception as e:
                 self.logger.error(f"Failed to save index: {e}")
 
@@ -49,27 +153,166 @@ class FAISSIndexService:
 
         try:
             embeddings = self.embeddings_generator.list_to_embeddings(segments)
-            start_index = self.index.ntotal
-            self.index.add(embeddings)  # type: ignore
-            faiss_ids = list(range(start_index, self.index.ntotal))
-
-            # self.cursor.executemany(
-            #     "INSERT INTO faiss_to_document_id (faiss_id, document_id) VALUES (%s, %s)",
-            #     [(faiss_id, doc_id) for faiss_id in faiss_ids]
-            # )
-            for faiss_id in faiss_ids:
-                self.cursor.execute(
-                    "INSERT INTO faiss_to_document_id (faiss_id, document_id) VALUES (%s, %s)",
-                    (faiss_id, doc_id)
-                )
-            self.conn.commit()
-
-            self.document_save_count += 1
-            if self.document_save_count % self.save_threshold == 0:
-                self.logger.info(
-                    f"Document save count reached {self.document_save_count}. Saving index.")
-                self.save_index()
-
+            self.index_embeddings(doc_id, embeddings)
         except Exception as e:
             self.logger.error(f"Error storing document {doc_id}: {e}")
-            self.conn.rollback()
+
+    def store_documents(self, documents: List[Tuple[int, str]]):
+        """Stores a batch of documents, encoding the segments of all of them in length-bucketed batches."""
+        self.logger.info(f"Storing {len(documents)} documents")
+        try:
+            for doc_id, text in documents:
+                if self.embeddings_batcher.add(doc_id, self.embeddings_generator.split_text(text)):
+                    self._index_batch(self.embeddings_batcher.flush())
+            self._index_batch(self.embeddings_batcher.flush())
+        except Exception as e:
+            self.logger.error(f"Error storing batch of documents: {e}")
+
+    def _index_batch(self, batch: List[Tuple[int, np.ndarray]]):
+        for doc_id, embeddings in batch:
+            try:
+                self.index_embeddings(doc_id, embeddings)
+            except Exception as e:
+                self.logger.error(f"Error storing document {doc_id}: {e}")
+
+    def index_embeddings(self, doc_id: int, embeddings: np.ndarray):
+        if self.embedding_store is not None:
+            self.embedding_store.append(doc_id, embeddings)
+        self.add_embeddings(np.full(embeddings.shape[0], doc_id), embeddings)
+
+        self.document_save_count += 1
+        if self.document_save_count % self.save_threshold == 0:
+            self.logger.info(
+                f"Document save count reached {self.document_save_count}. Saving index.")
+            self.save_index()
+
+    def add_embeddings(self, doc_ids: np.ndarray, embeddings: np.ndarray):
+        self.index.add_with_ids(  # type: ignore
+            np.ascontiguousarray(embeddings, dtype=np.float32), doc_ids.astype(np.int64))
+        self.dirty = True
+
+    def load_from_store(self, embedding_store: EmbeddingStore, batch_size: int = 65536):
+        """Adds all embeddings of an embedding store to the index without re-encoding any text."""
+        self.logger.info(
+            f"Adding {len(embedding_store)} stored embeddings to the index")
+        for doc_ids, vectors in embedding_store.iter_batches(batch_size):
+            self.add_embeddings(doc_ids, vectors)
+        self.save_index()
+
+    def search_parameters(self, ef_search: int | None = None, nprobe: int | None = None,
+                          document_filter: DocumentBitmap | None = None):
+        """Per-query search parameters, restricted to the documents in document_filter if given."""
+        index = faiss.downcast_index(self.index.index)
+        selector = faiss.IDSelectorBitmap(
+            document_filter.bits) if document_filter is not None else None
+        if isinstance(index, faiss.IndexHNSW):
+            parameters = faiss.SearchParametersHNSW(efSearch=ef_search or self.ef_search)
+        else:
+            parameters = faiss.SearchParametersIVF(nprobe=nprobe or self.nprobe)
+        if isinstance(index, faiss.IndexPreTransform):
+            wrapper = faiss.SearchParametersPreTransform()
+            wrapper.index_params = parameters
+            # keep the nested parameters alive as long as the wrapper
+            wrapper.referenced_objects = [parameters]
+            if selector is not None:
+                # the ID map only translates the selector of the outer parameters, which the
+                # pre-transform does not pass on, so translate it for the inner index here
+                translated = faiss.IDSelectorTranslated(self.index.id_map, selector)
+                parameters.sel = translated
+                wrapper.referenced_objects += [translated, selector]
+            return wrapper
+        if selector is not None:
+            parameters.sel = selector
+            parameters.referenced_objects = [selector]
+        return parameters
+
+    def search_raw(self, query: str, count: int, ef_search: int | None = None,
+                   nprobe: int | None = None,
+                   document_filter: DocumentBitmap | None = None) -> List[Tuple[int, float]]:
+        """Embed the query and return the count nearest segments as (document_id, distance) pairs.
+
+        Distances are cosine distances, as returned by the USearch index.
+        """
+        query_embedding = np.ascontiguousarray(
+            self.embeddings_generator.str_to_embedding(query), dtype=np.float32)
+        rerank = self.rerank_factor > 0 and self.embedding_store is not None
+        shortlist_size = count * self.rerank_factor if rerank else count
+        distances, labels = self.index.search(  # type: ignore
+            query_embedding, shortlist_size, params=self.search_parameters(ef_search, nprobe, document_filter))
+        if rerank:
+            return self.rerank_shortlist(query_embedding[0], labels[0][labels[0] != -1], count)
+
+        if self.index.metric_type == faiss.METRIC_INNER_PRODUCT:
+            # inner product of normalized vectors is the cosine similarity
+            cosine_distances = 1 - distances[0]
+        else:
+            # squared L2 distance of normalized vectors is 2 - 2 * cosine similarity
+            cosine_distances = distances[0] / 2
+        return [(int(doc_id), float(distance))
+                for doc_id, distance in zip(labels[0], cosine_distances) if doc_id != -1]
+
+    def rerank_shortlist(self, query_embedding: np.ndarray, candidate_doc_ids: np.ndarray, count: int) -> List[Tuple[int, float]]:
+        """Re-score all stored segments of the shortlisted documents with exact cosine distances."""
+        doc_ids, vectors = self.embedding_store.document_vectors(  # type: ignore
+            np.unique(candidate_doc_ids))
+        cosine_distances = 1 - vectors @ query_embedding
+        best = np.argsort(cosine_distances)[:count]
+        return [(int(doc_ids[i]), float(cosine_distances[i])) for i in best]
+
+    def search(self, query: str, limit: int, offset: int = 0, strategy: str = "sum",
+               ef_search: int | None = None, nprobe: int | None = None,
+               document_filter: DocumentBitmap | None = None) -> List[Tuple[int, float]]:
+        """Search for the closest documents to the query using the chosen aggregation strategy.
+
+        :param query: The query string.
+        :param limit: The number of results to return.
+        :param offset: The offset into the results.
+        :param strategy: The aggregation strategy ("sum", "min", or "avg").
+        :param ef_search: HNSW efSearch for this query, defaults to the index setting.
+        :param nprobe: Number of IVF cells visited for this query, defaults to the index setting.
+        :param document_filter: If given, only documents in this set are searched.
+        :return: A list of tuples (document_id, aggregated_score)
+        """
+        if strategy not in AGGREGATION_STRATEGIES:
+            self.logger.warning(
+                f"Unknown strategy '{strategy}', defaulting to sum aggregation.")
+            strategy = "sum"
+        self.logger.info(
+            f"Searching for query: {query} using {strategy} aggregation")
+        try:
+            raw_results = self.search_raw(
+                query, limit + offset, ef_search, nprobe, document_filter)
+            paginated_results = AGGREGATION_STRATEGIES[strategy](
+                raw_results)[offset:(offset + limit)]
+            self.logger.info(
+                f"{strategy} aggregation results for query '{query}': {paginated_results}")
+            return paginated_results
+        except Exception as e:
+            self.logger.error(
+                f"Error during {strategy} aggregation search: {e}")
+            return []
+
+    def rerank(self, query: str, candidates: List[Tuple[int, float]], limit: int, offset: int = 0) -> List[Tuple[int, float]]:
+        """Re-rank candidate documents (e.g. BM25 results) by the similarity of their best segment to the query.
+
+        Segment vectors are read from the embedding store, as the ID map cannot look them up by document.
+        """
+        self.logger.info(
+            f"Re-ranking {len(candidates)} candidates for query: {query}")
+        if self.embedding_store is None:
+            self.logger.warning(
+                "Re-ranking needs an embedding store, returning candidates unchanged")
+            return candidates[offset:(offset + limit)]
+        try:
+            query_embedding = self.embeddings_generator.str_to_embedding(query)[0]
+            row_doc_ids, vectors = self.embedding_store.document_vectors(
+                np.array([doc_id for doc_id, _ in candidates]))
+            reranked = rerank_candidates(
+                candidates, row_doc_ids, vectors, query_embedding)
+            paginated_results = reranked[offset:(offset + limit)]
+            self.logger.info(
+                f"Re-ranked results for query '{query}': {paginated_results}")
+            return paginated_results
+        except Exception as e:
+            self.logger.error(f"Error during re-ranking: {e}")
+            return candidates[offset:(offset + limit)]
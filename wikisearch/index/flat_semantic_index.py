@@ -0,0 +1,147 @@
+import logging
+from typing import List, Tuple
+
+import numpy as np
+
+from wikisearch.index.aggregation import (AGGREGATION_STRATEGIES,
+                                          rerank_candidates)
+from wikisearch.index.document_bitmap import DocumentBitmap
+from wikisearch.index.embedding_store import EmbeddingStore
+from wikisearch.index.embeddings_generator import EmbeddingsGenerator
+
+
+class FlatIndexService:
+    def __init__(self, embedding_store: EmbeddingStore,
+                 embeddings_generator: EmbeddingsGenerator | None = None, block_size: int = 16384):
+        """
+        Exact semantic search by brute force over the memory-mapped embedding store.
+
+        Every stored segment is scored with a matrix product, one block of rows at a time so that
+        memory stays bounded, and the top hits are kept with argpartition. There is no index to
+        build or tune and no approximation error, which suits small corpora and makes it the
+        ground truth for measuring the recall of the ANN indexes.
+
+        :param embedding_store: Store holding the normalized segment embeddings.
+        :param block_size: Number of stored vectors scored at once.
+        """
+        self.logger = logging.getLogger(__name__)
+        self.embedding_store = embedding_store
+        self.dimension = embedding_store.dimension
+        self.embeddings_generator = embeddings_generator or EmbeddingsGenerator(
+            self.dimension)
+        self.block_size = block_size
+
+    def store_document(self, doc_id: int, text: str):
+        """Stores a document by splitting it into segments and appending their embeddings to the store."""
+        self.logger.info(f"Storing document with ID {doc_id}")
+        try:
+            embeddings = self.embeddings_generator.list_to_embeddings(
+                self.embeddings_generator.split_text(text))
+            self.embedding_store.append(doc_id, embeddings)
+        except Exception as e:
+            self.logger.error(f"Error storing document {doc_id}: {e}")
+
+    def exact_search(self, query_embeddings: np.ndarray, count: int,
+                     document_filter: DocumentBitmap | None = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Exact count nearest stored segments of every query.
+
+        :param query_embeddings: Normalized queries, shape (num_queries, dimension).
+        :param count: Number of nearest segments per query.
+        :param document_filter: If given, only segments of documents in this set are scored.
+        :return: A tuple (distances, rows) of shape (num_queries, <= count), nearest first, with
+            cosine distances and the store rows of the segments.
+        """
+        query_embeddings = np.atleast_2d(
+            np.asarray(query_embeddings, dtype=np.float32))
+        num_queries = query_embeddings.shape[0]
+        vectors = self.embedding_store.vectors()
+        segments = self.embedding_store.segments()
+        best_distances = np.empty((num_queries, 0), dtype=np.float32)
+        best_rows = np.empty((num_queries, 0), dtype=np.int64)
+
+        for start in range(0, len(vectors), self.block_size):
+            end = min(start + self.block_size, len(vectors))
+            rows = np.arange(start, end)
+            block = np.asarray(vectors[start:end])
+            if document_filter is not None:
+                allowed = document_filter.contains(segments[start:end, 0])
+                rows, block = rows[allowed], block[allowed]
+                if not len(rows):
+                    continue
+            distances = np.concatenate(
+                [best_distances, 1 - query_embeddings @ block.T], axis=1)
+            candidates = np.concatenate(
+                [best_rows, np.broadcast_to(rows, (num_queries, len(rows)))], axis=1)
+            if distances.shape[1] > count:
+                keep = np.argpartition(distances, count - 1, axis=1)[:, :count]
+                distances = np.take_along_axis(distances, keep, axis=1)
+                candidates = np.take_along_axis(candidates, keep, axis=1)
+            best_distances, best_rows = distances, candidates
+
+        order = np.argsort(best_distances, axis=1)
+        return np.take_along_axis(best_distances, order, axis=1), np.take_along_axis(best_rows, order, axis=1)
+
+    def search_embedding(self, query_embedding: np.ndarray, count: int,
+                         document_filter: DocumentBitmap | None = None) -> List[Tuple[int, float]]:
+        """Return the exact count nearest segments to a query embedding as (document_id, distance) pairs."""
+        if count <= 0:
+            return []
+        distances, rows = self.exact_search(
+            query_embedding, count, document_filter)
+        doc_ids = self.embedding_store.segments()[rows[0], 0] if rows.shape[1] else []
+        return [(int(doc_id), float(distance)) for doc_id, distance in zip(doc_ids, distances[0])]
+
+    def search_raw(self, query: str, count: int,
+                   document_filter: DocumentBitmap | None = None) -> List[Tuple[int, float]]:
+        """Embed the query and return the exact count nearest segments as (document_id, distance) pairs."""
+        query_embedding = self.embeddings_generator.str_to_embedding(query)
+        return self.search_embedding(query_embedding, count, document_filter)
+
+    def search(self, query: str, limit: int, offset: int = 0, strategy: str = "sum",
+               document_filter: DocumentBitmap | None = None) -> List[Tuple[int, float]]:
+        """Search for the closest documents to the query using the chosen aggregation strategy.
+
+        :param query: The query string.
+        :param limit: The number of results to return.
+        :param offset: The offset into the results.
+        :param strategy: The aggregation strategy ("sum", "min", or "avg").
+        :param document_filter: If given, only documents in this set are searched.
+        :return: A list of tuples (document_id, aggregated_score)
+        """
+        if strategy not in AGGREGATION_STRATEGIES:
+            self.logger.warning(
+                f"Unknown strategy '{strategy}', defaulting to sum aggregation.")
+            strategy = "sum"
+        self.logger.info(
+            f"Searching for query: {query} using {strategy} aggregation")
+        try:
+            raw_results = self.search_raw(
+                query, limit + offset, document_filter)
+            paginated_results = AGGREGATION_STRATEGIES[strategy](
+                raw_results)[offset:(offset + limit)]
+            self.logger.info(
+                f"{strategy} aggregation results for query '{query}': {paginated_results}")
+            return paginated_results
+        except Exception as e:
+            self.logger.error(
+                f"Error during {strategy} aggregation search: {e}")
+            return []
+
+    def rerank(self, query: str, candidates: List[Tuple[int, float]], limit: int, offset: int = 0) -> List[Tuple[int, float]]:
+        """Re-rank candidate documents (e.g. BM25 results) by the similarity of their best segment to the query."""
+        self.logger.info(
+            f"Re-ranking {len(candidates)} candidates for query: {query}")
+        try:
+            query_embedding = self.embeddings_generator.str_to_embedding(query)[0]
+            row_doc_ids, vectors = self.embedding_store.document_vectors(
+                np.array([doc_id for doc_id, _ in candidates]))
+            reranked = rerank_candidates(
+                candidates, row_doc_ids, vectors, query_embedding)
+            paginated_results = reranked[offset:(offset + limit)]
+            self.logger.info(
+                f"Re-ranked results for query '{query}': {paginated_results}")
+            return paginated_results
+        except Exception as e:
+            self.logger.error(f"Error during re-ranking: {e}")
+            return candidates[offset:(offset + limit)]
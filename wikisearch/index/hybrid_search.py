@@ -0,0 +1,92 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Sequence, Tuple
+
+FUSION_METHODS = ("rrf", "weighted")
+
+
+def reciprocal_rank_fusion(result_lists: Sequence[List[Tuple[int, float]]], weights: Sequence[float],
+                           k: int = 60) -> List[Tuple[int, float]]:
+    """Fuse ranked lists by summing weight / (k + rank) for every list a document appears in."""
+    fused: Dict[int, float] = {}
+    for results, weight in zip(result_lists, weights):
+        for rank, (doc_id, _) in enumerate(results, start=1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + weight / (k + rank)
+    return sorted(fused.items(), key=lambda x: x[1], reverse=True)
+
+
+def weighted_score_fusion(result_lists: Sequence[List[Tuple[int, float]]],
+                          weights: Sequence[float]) -> List[Tuple[int, float]]:
+    """Fuse lists by a weighted sum of their min-max normalized scores (higher is better)."""
+    fused: Dict[int, float] = {}
+    for results, weight in zip(result_lists, weights):
+        if not results:
+            continue
+        scores = [score for _, score in results]
+        low, high = min(scores), max(scores)
+        for doc_id, score in results:
+            normalized = (score - low) / (high - low) if high > low else 1.0
+            fused[doc_id] = fused.get(doc_id, 0.0) + weight * normalized
+    return sorted(fused.items(), key=lambda x: x[1], reverse=True)
+
+
+class HybridSearchService:
+    def __init__(self, inverted_index_service, semantic_index_service, fusion: str = "rrf",
+                 lexical_weight: float = 0.5, semantic_weight: float = 0.5, rrf_k: int = 60,
+                 candidate_depth: int = 100, executor: ThreadPoolExecutor | None = None):
+        """
+        Run lexical (BM25) and semantic search concurrently and fuse their rankings.
+
+        :param inverted_index_service: The BM25 index service.
+        :param semantic_index_service: The vector index service; its scores must be higher-is-better.
+        :param fusion: "rrf" (reciprocal rank fusion) or "weighted" (normalized score fusion).
+        :param lexical_weight: Weight of the lexical ranking.
+        :param semantic_weight: Weight of the semantic ranking.
+        :param rrf_k: Rank offset of reciprocal rank fusion.
+        :param candidate_depth: Minimum number of candidates fetched from each engine.
+        :param executor: Pool running the two searches; a private one is created if omitted.
+        """
+        self.logger = logging.getLogger(__name__)
+        if fusion not in FUSION_METHODS:
+            raise ValueError(
+                f"Unknown fusion method '{fusion}', expected one of {FUSION_METHODS}")
+        self.inverted_index_service = inverted_index_service
+        self.semantic_index_service = semantic_index_service
+        self.fusion = fusion
+        self.weights = (lexical_weight, semantic_weight)
+        self.rrf_k = rrf_k
+        self.candidate_depth = candidate_depth
+        self.executor = executor or ThreadPoolExecutor(
+            max_workers=4, thread_name_prefix="hybrid-search")
+
+    def search(self, query: str, limit: int, offset: int = 0, *, connection) -> List[Tuple[int, float]]:
+        """
+        Run both searches concurrently and fuse their rankings.
+
+        :param connection: Database connection for the lexical search, e.g. one checked out for the current request.
+        """
+        self.logger.info(f"Searching for query: {query} using {self.fusion} fusion")
+        depth = max(self.candidate_depth, limit + offset)
+        lexical_future = self.executor.submit(
+            self.inverted_index_service.search, query, depth, connection=connection)
+        semantic_future = self.executor.submit(
+            self.semantic_index_service.search, query, depth)
+
+        result_lists = []
+        for name, future in (("lexical", lexical_future), ("semantic", semantic_future)):
+            try:
+                result_lists.append(future.result())
+            except Exception as e:
+                self.logger.error(f"Error during {name} search: {e}")
+                result_lists.append([])
+
+        if self.fusion == "weighted":
+            fused = weighted_score_fusion(result_lists, self.weights)
+        else:
+            fused = reciprocal_rank_fusion(
+                result_lists, self.weights, self.rrf_k)
+
+        paginated_results = fused[offset:(offset + limit)]
+        self.logger.info(
+            f"Hybrid results for query '{query}': {paginated_results}")
+        return paginated_results
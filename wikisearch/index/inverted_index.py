@@ -1,30 +1,49 @@
+import functools
 import logging
+import threading
+from collections import OrderedDict
 from decimal import Decimal
-from typing import List, Tuple
+from typing import FrozenSet, List, Set, Tuple
 
 from wikisearch.nlp.nlp import NLPService
+from wikisearch.summary.term_offsets import WORD_PATTERN
+
+# number of analyzed queries and of lemmas with their word forms kept in memory
+QUERY_CACHE_SIZE = 1024
+LEMMA_FORMS_CACHE_SIZE = 100000
 
 
 class InvertedIndexService:
 
     def __init__(self, db_connection):
+        """
+        :param db_connection: Connection to count the documents with at startup and to write
+            documents with in store_document. Searches use the connection they are given.
+        """
         self.db_connection = db_connection
-        self.cursor = self.db_connection.cursor(buffered=True)
         self.num_documents: Decimal = Decimal('0')
         self.k1: Decimal = Decimal('0.5')
         self.b: Decimal = Decimal('0.75')
         self.nlp_service = NLPService(
             to_lower_case=True, preserve_ner_case=False)
         self.logger = logging.getLogger(__name__)
+        # the lemmas of a query are needed for ranking and again for highlighting the results
+        self.analyze_query = functools.lru_cache(maxsize=QUERY_CACHE_SIZE)(self._analyze_query)
+        # lemma -> lowercase words with that lemma, least recently used first
+        self.lemma_forms: OrderedDict[str, FrozenSet[str]] = OrderedDict()
+        self.lemma_forms_lock = threading.Lock()
         self.get_number_of_documents()
 
     def get_number_of_documents(self):
+        cursor = self.db_connection.cursor(buffered=True)
         try:
-            self.cursor.execute("SELECT COUNT(*) FROM document")
-            self.num_documents = self.cursor.fetchone()[0]
+            cursor.execute("SELECT COUNT(*) FROM document")
+            self.num_documents = cursor.fetchone()[0]
             self.logger.info(f"Number of documents: {self.num_documents}")
         except Exception as e:
             self.logger.error(f"Failed to get number of documents: {e}")
+        finally:
+            cursor.close()
         return self.num_documents
 
     def store_document(self, doc_id: int, title: str, body: str):
@@ -34,25 +53,26 @@ class InvertedIndexService:
         body_tokens, body_word_to_lemma = self.nlp_service.process(body)
         word_ids = {}
         lemma_ids = {}
+        cursor = self.db_connection.cursor(buffered=True)
 
         def insert_words_and_lemmas(word_to_lemma):
             for word, lemma in word_to_lemma.items():
                 try:
-                    self.cursor.execute(
+                    cursor.execute(
                         "INSERT IGNORE INTO word (token) VALUES (%s)", (word,))
-                    self.cursor.execute(
+                    cursor.execute(
                         "SELECT id FROM word WHERE token = %s", (word,))
-                    word_id = self.cursor.fetchone()[0]
+                    word_id = cursor.fetchone()[0]
                     word_ids[word] = word_id
 
-                    self.cursor.execute(
+                    cursor.execute(
                         "INSERT IGNORE INTO lemma (token) VALUES (%s)", (lemma,))
-                    self.cursor.execute(
+                    cursor.execute(
                         "SELECT id FROM lemma WHERE token = %s", (lemma,))
-                    lemma_id = self.cursor.fetchone()[0]
+                    lemma_id = cursor.fetchone()[0]
                     lemma_ids[lemma] = lemma_id
 
-                    self.cursor.execute(
+                    cursor.execute(
                         "INSERT IGNORE INTO word_lemma (word_id, lemma_id) VALUES (%s, %s)",
                         (word_id, lemma_id)
                     )
@@ -71,7 +91,7 @@ class InvertedIndexService:
 
             for lemma_id, freq in term_freq.items():
                 try:
-                    self.cursor.execute(
+                    cursor.execute(
                         f"INSERT INTO {table_name} (term_id, document_id, frequency) VALUES (%s, %s, %s) "
                         f"ON DUPLICATE KEY UPDATE frequency = frequency + %s",
                         (lemma_id, doc_id, freq, freq)
@@ -88,7 +108,7 @@ class InvertedIndexService:
                 word_id = word_ids.get(token)
                 if word_id:
                     try:
-                        self.cursor.execute(
+                        cursor.execute(
                             "INSERT INTO postings (word_id, document_id, position) VALUES (%s, %s, %s)",
                             (word_id, doc_id, position)
                         )
@@ -104,20 +124,84 @@ class InvertedIndexService:
             self.logger.info(f"Index updated for document ID: {doc_id}")
         except Exception as e:
             self.logger.error(f"Failed to commit transaction: {e}")
+        finally:
+            cursor.close()
+
+    def search(self, query: str, limit: int, offset: int = 0, *, connection) -> List[Tuple[int, float]]:
+        """
+        Rank documents for the query with BM25.
 
-    def search(self, query: str, limit: int, offset: int = 0) -> List[Tuple[int, float]]:
+        :param connection: Connection to query with, e.g. one checked out for the current request.
+        """
         self.logger.info(f"Searching for query: {query}")
-        query_tokens = self.nlp_service.tokenize(query)
+        cursor = connection.cursor(buffered=True)
+        try:
+            return self._search(cursor, query, limit, offset)
+        finally:
+            cursor.close()
+
+    def _analyze_query(self, query: str) -> Tuple[str, ...]:
+        return tuple(self.nlp_service.tokenize(query))
+
+    def word_forms(self, query: str, connection) -> Set[str]:
+        """
+        Lowercase words to highlight for a query: its words and every indexed word sharing a lemma with them.
+
+        Word forms come from the word_lemma table and are cached per lemma.
+
+        :param connection: Connection to query with, e.g. one checked out for the current request.
+        """
+        lemmas = set(self.analyze_query(query))
+        forms = set(WORD_PATTERN.findall(query.lower())) | {lemma.lower() for lemma in lemmas}
+        fetched: dict[str, Set[str]] = {}
+        with self.lemma_forms_lock:
+            missing = [lemma for lemma in lemmas if lemma not in self.lemma_forms]
+        if missing:
+            cursor = connection.cursor(buffered=True)
+            try:
+                placeholders = ', '.join(['%s'] * len(missing))
+                cursor.execute(f"""
+                    SELECT lemma.token, word.token FROM lemma
+                    JOIN word_lemma ON word_lemma.lemma_id = lemma.id
+                    JOIN word ON word.id = word_lemma.word_id
+                    WHERE lemma.token IN ({placeholders})
+                """, tuple(missing))
+                fetched = {lemma: set() for lemma in missing}
+                for lemma, word in cursor.fetchall():
+                    fetched.setdefault(lemma, set()).add(word.lower())
+            except Exception as e:
+                self.logger.error(f"Failed to fetch word forms of {missing}: {e}")
+                fetched = {}
+            finally:
+                cursor.close()
+            with self.lemma_forms_lock:
+                for lemma, words in fetched.items():
+                    self.lemma_forms[lemma] = frozenset(words)
+                while len(self.lemma_forms) > LEMMA_FORMS_CACHE_SIZE:
+                    self.lemma_forms.popitem(last=False)
+
+        with self.lemma_forms_lock:
+            for lemma in lemmas:
+                if lemma in self.lemma_forms:
+                    self.lemma_forms.move_to_end(lemma)
+                    forms |= self.lemma_forms[lemma]
+                else:
+                    # fetched by this call but already evicted again
+                    forms |= fetched.get(lemma, set())
+        return forms
+
+    def _search(self, cursor, query: str, limit: int, offset: int) -> List[Tuple[int, float]]:
+        query_tokens = list(self.analyze_query(query))
         if not query_tokens:
             return []
         self.logger.debug(f"Tokens are: {query_tokens}")
 
         query_tokens_placeholders = ', '.join(['%s'] * len(query_tokens))
         try:
-            self.cursor.execute(
+            cursor.execute(
                 f"SELECT token, id FROM lemma WHERE token IN ({query_tokens_placeholders})", tuple(query_tokens))
             query_term_ids = {token: term_id for token,
-                              term_id in self.cursor.fetchall()}
+                              term_id in cursor.fetchall()}
             self.logger.debug(f"Query Term ids: {query_term_ids}")
 
         except Exception as e:
@@ -127,7 +211,7 @@ class InvertedIndexService:
         # Collect candidate documents by querying body_tf and title_tf at once
         placeholders = ', '.join(['%s'] * len(query_term_ids))
         try:
-            self.cursor.execute(f"""
+            cursor.execute(f"""
                 SELECT document_id, term_id, frequency, 'body' AS source 
                 FROM body_tf WHERE term_id IN ({placeholders})
                 UNION ALL
@@ -139,7 +223,7 @@ class InvertedIndexService:
             return []
 
         term_doc_map: dict[int, dict[str, dict[int, int]]] = {}
-        for doc_id, term_id, freq, source in self.cursor.fetchall():
+        for doc_id, term_id, freq, source in cursor.fetchall():
             if doc_id not in term_doc_map:
                 term_doc_map[doc_id] = {'body': {}, 'title': {}}
             term_doc_map[doc_id][source][term_id] = freq
@@ -148,12 +232,12 @@ class InvertedIndexService:
 
         # Calculate BM25 for each candidate document
         scores = []
-        avg_body_length: Decimal = self._get_avg_doc_length("body_tf")
-        avg_title_length: Decimal = self._get_avg_doc_length("title_tf")
+        avg_body_length: Decimal = self._get_avg_doc_length(cursor, "body_tf")
+        avg_title_length: Decimal = self._get_avg_doc_length(cursor, "title_tf")
 
         for doc_id, term_freqs in term_doc_map.items():
-            body_length: Decimal = self._get_doc_length(doc_id, "body_tf")
-            title_length: Decimal = self._get_doc_length(doc_id, "title_tf")
+            body_length: Decimal = self._get_doc_length(cursor, doc_id, "body_tf")
+            title_length: Decimal = self._get_doc_length(cursor, doc_id, "title_tf")
 
             score: Decimal = Decimal('0.0')
             for term, term_id in query_term_ids.items():
@@ -162,9 +246,9 @@ class InvertedIndexService:
                     term_freqs['title'].get(term_id, 0))
 
                 body_df: Decimal = self._get_document_frequency(
-                    "body_tf", term_id)
+                    cursor, "body_tf", term_id)
                 title_df: Decimal = self._get_document_frequency(
-                    "title_tf", term_id)
+                    cursor, "title_tf", term_id)
 
                 # Body score
                 if body_tf > 0 and body_df > 0:
@@ -188,11 +272,11 @@ class InvertedIndexService:
             f"Search results for query '{query}': {paginated_scores}")
         return paginated_scores
 
-    def _get_avg_doc_length(self, table_name: str) -> Decimal:
+    def _get_avg_doc_length(self, cursor, table_name: str) -> Decimal:
         try:
-            self.cursor.execute(
+            cursor.execute(
                 f"SELECT AVG(doc_length) FROM (SELECT SUM(frequency) AS doc_length FROM {table_name} GROUP BY document_id) AS doc_lengths")
-            avg_length = self.cursor.fetchone()[0] or 0
+            avg_length = cursor.fetchone()[0] or 0
             self.logger.debug(
                 f"Average document length for {table_name}: {avg_length}")
         except Exception as e:
@@ -201,11 +285,11 @@ class InvertedIndexService:
             avg_length = 0
         return Decimal(avg_length)
 
-    def _get_doc_length(self, doc_id: int, table_name: str) -> Decimal:
+    def _get_doc_length(self, cursor, doc_id: int, table_name: str) -> Decimal:
         try:
-            self.cursor.execute(
+            cursor.execute(
                 f"SELECT SUM(frequency) FROM {table_name} WHERE document_id = %s", (doc_id,))
-            doc_length = self.cursor.fetchone()[0] or 0
+            doc_length = cursor.fetchone()[0] or 0
             self.logger.debug(
                 f"Document length for document ID {doc_id} in {table_name}: {doc_length}")
         except Exception as e:
@@ -214,11 +298,11 @@ class InvertedIndexService:
             doc_length = 0
         return Decimal(doc_length)
 
-    def _get_document_frequency(self, table_name: str, term_id: int) -> Decimal:
+    def _get_document_frequency(self, cursor, table_name: str, term_id: int) -> Decimal:
         try:
-            self.cursor.execute(
+            cursor.execute(
                 f"SELECT COUNT(DISTINCT document_id) FROM {table_name} WHERE term_id = %s", (term_id,))
-            df_result = self.cursor.fetchone()
+            df_result = cursor.fetchone()
             df = df_result[0] if df_result else 0
         except Exception as e:
             self.logger.error(
@@ -0,0 +1,142 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Tuple
+
+import numpy as np
+from usearch.index import Index
+
+from wikisearch.index.document_bitmap import DocumentBitmap
+from wikisearch.index.embedding_store import EmbeddingStore
+from wikisearch.index.embeddings_generator import EmbeddingsGenerator
+from wikisearch.index.usearch_semantic_index import USearchIndexService
+
+
+class ShardedUSearchIndexService(USearchIndexService):
+    def __init__(self, path_to_index: Path, dimension: int, num_shards: int, save_threshold: int = 10,
+                 embeddings_generator: EmbeddingsGenerator | None = None,
+                 embedding_store: EmbeddingStore | None = None,
+                 max_workers: int | None = None, exact_filter_limit: int = 5000,
+                 max_filter_window: int = 65536):
+        """
+        Semantic index partitioned into shards by document id.
+
+        All segments of a document live in the shard doc_id % num_shards. Queries are searched
+        in every shard in parallel and the per-shard hits are merged before document-level
+        aggregation. Shard i is stored next to path_to_index with the suffix ".shard{i}".
+
+        :param num_shards: Number of shards.
+        :param max_workers: Size of the thread pool searching and loading shards, defaults to num_shards.
+            Builds from the embedding store run on a separate, short-lived pool.
+        :param exact_filter_limit: Largest filter searched exactly, see USearchIndexService.
+        :param max_filter_window: Most segments fetched for one filtered query, see USearchIndexService.
+        """
+        self.num_shards = num_shards
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers or num_shards, thread_name_prefix="usearch-shard")
+        super().__init__(path_to_index, dimension, save_threshold,
+                         embeddings_generator, embedding_store, exact_filter_limit, max_filter_window)
+
+    def shard_path(self, shard_id: int) -> Path:
+        return self.path_to_index.with_name(f"{self.path_to_index.name}.shard{shard_id}")
+
+    def create_index(self) -> List[Index]:  # type: ignore[override]
+        """Create new, empty shards."""
+        return [Index(ndim=self.dimension, metric="cos", multi=True) for _ in range(self.num_shards)]
+
+    def read_index(self) -> List[Index]:  # type: ignore[override]
+        """Read all shards from disk in parallel, creating empty ones where there is no file."""
+        def load_shard(shard_id: int) -> Index:
+            shard = Index(ndim=self.dimension, metric="cos", multi=True)
+            path = self.shard_path(shard_id)
+            if path.is_file():
+                self.logger.info(f"Loading UIndex shard from {path}")
+                shard.load(str(path))
+            else:
+                self.logger.info(
+                    f"Creating new UIndex shard {shard_id} with dimension {self.dimension}")
+            return shard
+
+        return list(self.executor.map(load_shard, range(self.num_shards)))
+
+    def load_or_create_index(self) -> List[Index]:  # type: ignore[override]
+        """Load existing shards or create new ones."""
+        self.index = self.read_index()
+        return self.index
+
+    def save_index(self):
+        """Persist all shards to disk, if they changed since they were loaded or last saved."""
+        if self.index is None or not self.dirty:
+            return
+        # sequential, as this also runs at exit when the thread pool is already shut down
+        for shard_id, shard in enumerate(self.index):
+            path = self.shard_path(shard_id)
+            self.logger.info(f"Saving index shard to {path}")
+            try:
+                shard.save(str(path))
+            except Exception as e:
+                self.logger.error(f"Failed to save index shard {shard_id}: {e}")
+                return
+        self.dirty = False
+
+    def shard_ids(self, keys: np.ndarray) -> np.ndarray:
+        return np.asarray(keys, dtype=np.uint64) % np.uint64(self.num_shards)
+
+    def add_embeddings(self, keys: np.ndarray, embeddings: np.ndarray,  # type: ignore[override]
+                       index: List[Index] | None = None):
+        """Adds segment embeddings to the shards owning their documents."""
+        shards = self.index if index is None else index
+        shard_ids = self.shard_ids(keys)
+        for shard_id in np.unique(shard_ids):
+            mask = shard_ids == shard_id
+            shards[int(shard_id)].add(keys[mask], embeddings[mask])
+        if shards is self.index and len(keys) > 0:
+            self.dirty = True
+
+    def add_store_rows(self, index: List[Index], embedding_store: EmbeddingStore,  # type: ignore[override]
+                       start: int = 0, stop: int | None = None, batch_size: int = 65536):
+        """
+        Adds the rows [start, stop) of an embedding store to the given shards.
+
+        The store is read once and the rows of every batch are added to the shards owning them
+        in parallel. The build runs on a pool of its own, so searches, which use self.executor,
+        are not queued behind it.
+        """
+        def add_to_shard(shard_id: int, keys: np.ndarray, vectors: np.ndarray, shard_ids: np.ndarray):
+            mask = shard_ids == shard_id
+            index[shard_id].add(keys[mask], vectors[mask], threads=1)
+
+        with ThreadPoolExecutor(max_workers=self.num_shards, thread_name_prefix="usearch-build") as build_pool:
+            for doc_ids, vectors in embedding_store.iter_batches(batch_size, start, stop):
+                keys = doc_ids.astype(np.uint64)
+                shard_ids = self.shard_ids(keys)
+                list(build_pool.map(lambda shard_id: add_to_shard(shard_id, keys, vectors, shard_ids),
+                                    np.unique(shard_ids).tolist()))
+        for shard_id, shard in enumerate(index):
+            self.logger.info(f"Shard {shard_id} built with {len(shard)} vectors")
+
+    def load_from_store(self, embedding_store: EmbeddingStore, batch_size: int = 65536):
+        """Builds all shards from the embedding store, adding to the shards in parallel."""
+        self.logger.info(
+            f"Adding {len(embedding_store)} stored embeddings to {self.num_shards} shards")
+        self.add_store_rows(self.index, embedding_store,
+                            batch_size=batch_size)
+        self.dirty = True
+        self.save_index()
+
+    def search_embedding(self, query_embedding: np.ndarray, count: int) -> List[Tuple[int, float]]:
+        """Search all shards in parallel and merge the count nearest segments."""
+        return self.search_shards(self.index, query_embedding, count)
+
+    def candidate_shards(self, document_filter: DocumentBitmap) -> List[Index]:
+        """Only the shards of the documents in the filter are searched."""
+        shards = self.index
+        return [shards[shard_id] for shard_id in np.unique(self.shard_ids(document_filter.ids()))]
+
+    def search_shards(self, shards: List[Index], query_embedding: np.ndarray,
+                      count: int) -> List[Tuple[int, float]]:
+        """Search the given shards in parallel and merge the count nearest segments."""
+        shard_results = self.executor.map(
+            lambda shard: shard.search(query_embedding, count).to_list(), shards)
+        merged = [hit for results in shard_results for hit in results]
+        merged.sort(key=lambda hit: hit[1])
+        return merged[:count]
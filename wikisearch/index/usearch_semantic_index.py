@@ -1,47 +1,87 @@
 import atexit
 import logging
-from itertools import groupby
-from operator import itemgetter
+import threading
 from pathlib import Path
 from typing import List, Tuple
 
 import numpy as np
 from usearch.index import Index
 
+from wikisearch.index.aggregation import (aggregate_avg, aggregate_min,
+                                          aggregate_sum, nearest_segments,
+                                          rerank_candidates)
+from wikisearch.index.document_bitmap import DocumentBitmap
+from wikisearch.index.embedding_store import EmbeddingStore
+from wikisearch.index.embeddings_batcher import EmbeddingsBatcher
 from wikisearch.index.embeddings_generator import EmbeddingsGenerator
 
 
 class USearchIndexService:
-    def __init__(self, path_to_index: Path, dimension: int, save_threshold: int = 10):
+    def __init__(self, path_to_index: Path, dimension: int, save_threshold: int = 10,
+                 embeddings_generator: EmbeddingsGenerator | None = None,
+                 embedding_store: EmbeddingStore | None = None,
+                 exact_filter_limit: int = 5000, max_filter_window: int = 65536):
+        """
+        Semantic index of document segment embeddings in USearch.
+
+        :param exact_filter_limit: Filters with at most this many documents are searched exactly
+            over the vectors of the allowed documents instead of through the ANN index. This
+            needs the embedding store, without one every filter goes through the ANN index.
+        :param max_filter_window: Most segments fetched from the ANN index for one filtered query.
+            Very selective filters return the allowed hits within this window, possibly fewer than asked.
+        """
         self.logger = logging.getLogger(__name__)
         self.path_to_index = path_to_index
         self.dimension = dimension
-        self.embeddings_generator = EmbeddingsGenerator(self.dimension)
+        self.embeddings_generator = embeddings_generator or EmbeddingsGenerator(
+            self.dimension)
+        self.embeddings_batcher = EmbeddingsBatcher(self.embeddings_generator)
+        self.embedding_store = embedding_store
         self.save_threshold = save_threshold
+        self.exact_filter_limit = exact_filter_limit
+        self.max_filter_window = max_filter_window
         self.document_save_count = 0
+        # serializes writers with the final catch-up and reference switch of a rebuild
+        self.swap_lock = threading.Lock()
+        self.rebuild_thread: threading.Thread | None = None
+        # set by writes to the live index; saves, including the one at exit, are skipped without
+        # it, so a serving process never overwrites an index rebuilt by another process
+        self.dirty = False
 
         self.index = self.load_or_create_index()
         atexit.register(self.save_index)
 
-    def load_or_create_index(self) -> Index:
-        """Load an existing Index or create a new one."""
-        self.index = Index(ndim=self.dimension, metric="cos", multi=True)
+    def create_index(self) -> Index:
+        """Create a new, empty index."""
+        return Index(ndim=self.dimension, metric="cos", multi=True)
+
+    def read_index(self) -> Index:
+        """Read the index from disk into a new Index object, or create an empty one if there is no file."""
+        index = self.create_index()
         if self.path_to_index.is_file():
             self.logger.info(
                 f"Loading UIndex from {self.path_to_index}")
-            self.index.load(str(self.path_to_index))
+            index.load(str(self.path_to_index))
         else:
             self.logger.info(
                 f"Creating new UIndex with dimension {self.dimension}")
+        return index
+
+    def load_or_create_index(self) -> Index:
+        """Load an existing Index or create a new one."""
+        self.index = self.read_index()
+        if not self.path_to_index.is_file():
+            self.dirty = True
             self.save_index()
         return self.index
 
     def save_index(self):
-        """Persist the index to disk."""
-        if self.index is not None:
+        """Persist the index to disk, if it changed since it was loaded or last saved."""
+        if self.index is not None and self.dirty:
             self.logger.info(f"Saving index to {self.path_to_index}")
             try:
                 self.index.save(str(self.path_to_index))
+                self.dirty = False
             except Exception as e:
                 self.logger.error(f"Failed to save index: {e}")
 
@@ -53,64 +93,219 @@ class USearchIndexService:
         try:
             embeddings = self.embeddings_generator.list_to_embeddings(
                 segments)  # Shape: (num_segments, dimension)
+            self.index_embeddings(doc_id, embeddings)
+        except Exception as e:
+            self.logger.error(f"Error storing document {doc_id}: {e}")
 
-            if not isinstance(embeddings, np.ndarray) or embeddings.shape[1] != self.dimension:
-                raise ValueError(
-                    "Embeddings must be a NumPy array of shape (num_segments, dimension)")
+    def store_documents(self, documents: List[Tuple[int, str]]):
+        """Stores a batch of documents, encoding the segments of all of them in length-bucketed batches."""
+        self.logger.info(f"Storing {len(documents)} documents")
+        try:
+            for doc_id, text in documents:
+                if self.embeddings_batcher.add(doc_id, self.embeddings_generator.split_text(text)):
+                    self._index_batch(self.embeddings_batcher.flush())
+            self._index_batch(self.embeddings_batcher.flush())
+        except Exception as e:
+            self.logger.error(f"Error storing batch of documents: {e}")
+
+    def _index_batch(self, batch: List[Tuple[int, np.ndarray]]):
+        for doc_id, embeddings in batch:
+            try:
+                self.index_embeddings(doc_id, embeddings)
+            except Exception as e:
+                self.logger.error(f"Error storing document {doc_id}: {e}")
+
+    def index_embeddings(self, doc_id: int, embeddings: np.ndarray):
+        """Adds the segment embeddings of a document to the index."""
+        if not isinstance(embeddings, np.ndarray) or embeddings.shape[1] != self.dimension:
+            raise ValueError(
+                "Embeddings must be a NumPy array of shape (num_segments, dimension)")
+
+        with self.swap_lock:
+            if self.embedding_store is not None:
+                self.embedding_store.append(doc_id, embeddings)
+            self.add_embeddings(
+                np.full(embeddings.shape[0], doc_id, dtype=np.uint64), embeddings)
+
+        self.document_save_count += 1
+        if self.document_save_count % self.save_threshold == 0:
+            self.logger.info(
+                f"Document save count reached {self.document_save_count}. Saving index.")
+            self.save_index()
+
+    def add_embeddings(self, keys: np.ndarray, embeddings: np.ndarray, index: Index | None = None):
+        """Adds segment embeddings to the index, or to the given index, one document key per row."""
+        index = self.index if index is None else index
+        if len(keys) > 0:
+            index.add(keys, embeddings)
+            if index is self.index:
+                self.dirty = True
+
+    def add_store_rows(self, index: Index, embedding_store: EmbeddingStore, start: int = 0,
+                       stop: int | None = None, batch_size: int = 65536):
+        """Adds the rows [start, stop) of an embedding store to the given index."""
+        for doc_ids, vectors in embedding_store.iter_batches(batch_size, start, stop):
+            self.add_embeddings(doc_ids.astype(np.uint64), vectors, index)
+
+    def load_from_store(self, embedding_store: EmbeddingStore, batch_size: int = 65536):
+        """Adds all embeddings of an embedding store to the index without re-encoding any text."""
+        self.logger.info(
+            f"Adding {len(embedding_store)} stored embeddings to the index")
+        self.add_store_rows(self.index, embedding_store,
+                            batch_size=batch_size)
+        self.dirty = True
+        self.save_index()
+
+    def rebuild(self, source: str = "store"):
+        """
+        Builds a new index while the current one keeps serving, then switches to it.
+
+        Searches read self.index once per query, so replacing the reference is atomic for them.
+        With source "store" the new index is built from the embedding store; rows appended while
+        building are added under the swap lock right before the switch, and the result is saved
+        unless the store is read-only, i.e. in a serving process that does not own the index file.
+        With source "disk" the index file is read again, e.g. after an offline rebuild replaced it.
+
+        :param source: "store" or "disk".
+        """
+        if source not in ("store", "disk"):
+            raise ValueError(
+                f"Unknown rebuild source {source}, expected 'store' or 'disk'")
+        if source == "store" and self.embedding_store is None:
+            raise ValueError("Rebuilding from the store requires an embedding store")
 
-            for embedding in embeddings:
-                self.index.add(doc_id, embedding)
-            # this shit is broken:
-            # keys = np.repeat(doc_id, embeddings.size)
-            # self.index.add(keys, embeddings)
+        if source == "disk":
+            self.logger.info(f"Reloading index from {self.path_to_index}")
+            new_index = self.read_index()
+            with self.swap_lock:
+                self.index = new_index
+                self.dirty = False
+            self.logger.info("Switched to the reloaded index")
+            return
 
-            self.document_save_count += 1
-            if self.document_save_count % self.save_threshold == 0:
-                self.logger.info(
-                    f"Document save count reached {self.document_save_count}. Saving index.")
-                self.save_index()
+        snapshot = len(self.embedding_store)
+        self.logger.info(
+            f"Rebuilding index from {snapshot} stored embeddings")
+        new_index = self.create_index()
+        self.add_store_rows(new_index, self.embedding_store, stop=snapshot)
+        with self.swap_lock:
+            caught_up = len(self.embedding_store) - snapshot
+            self.add_store_rows(new_index, self.embedding_store,
+                                start=snapshot, stop=snapshot + caught_up)
+            self.index = new_index
+            self.dirty = not self.embedding_store.read_only
+        self.logger.info(
+            f"Switched to the rebuilt index, {caught_up} embeddings added during the rebuild")
+        self.save_index()
 
+    def rebuild_async(self, source: str = "store") -> bool:
+        """
+        Starts a rebuild in a background thread.
+
+        :return: False if a rebuild is already running, True otherwise.
+        """
+        with self.swap_lock:
+            if self.rebuild_thread is not None and self.rebuild_thread.is_alive():
+                self.logger.warning("Index rebuild already in progress")
+                return False
+            self.rebuild_thread = threading.Thread(
+                target=self._rebuild_logged, args=(source,), name="usearch-rebuild", daemon=True)
+            self.rebuild_thread.start()
+        return True
+
+    def _rebuild_logged(self, source: str):
+        try:
+            self.rebuild(source)
         except Exception as e:
-            self.logger.error(f"Error storing document {doc_id}: {e}")
+            self.logger.error(f"Index rebuild from {source} failed: {e}")
 
-    def search(self, query: str, limit: int, offset: int = 0, strategy: str = "sum") -> List[Tuple[int, float]]:
+    def search(self, query: str, limit: int, offset: int = 0, strategy: str = "sum",
+               document_filter: DocumentBitmap | None = None) -> List[Tuple[int, float]]:
         """Search for the closest documents to the query using the chosen aggregation strategy.
 
         :param query: The query string.
         :param limit: The number of results to return.
         :param offset: The offset into the results.
         :param strategy: The aggregation strategy ("sum", "min", or "avg").
+        :param document_filter: If given, only documents in this set are returned.
         :return: A list of tuples (document_id, aggregated_score)
         """
         if strategy == "sum":
-            return self.search_max_sim_sum(query, limit, offset)
+            return self.search_max_sim_sum(query, limit, offset, document_filter)
         elif strategy == "min":
-            return self.search_min_distance(query, limit, offset)
+            return self.search_min_distance(query, limit, offset, document_filter)
         elif strategy == "avg":
-            return self.search_avg_distance(query, limit, offset)
+            return self.search_avg_distance(query, limit, offset, document_filter)
         else:
             self.logger.warning(
                 f"Unknown strategy '{strategy}', defaulting to sum aggregation.")
-            return self.search_max_sim_sum(query, limit, offset)
+            return self.search_max_sim_sum(query, limit, offset, document_filter)
+
+    def search_raw(self, query: str, count: int,
+                   document_filter: DocumentBitmap | None = None) -> List[Tuple[int, float]]:
+        """Embed the query and return the count nearest segments as (document_id, distance) pairs."""
+        query_embedding = self.embeddings_generator.str_to_embedding(query)
+        if document_filter is None:
+            return self.search_embedding(query_embedding, count)
+        return self.search_filtered(query_embedding, count, document_filter)
+
+    def search_embedding(self, query_embedding: np.ndarray, count: int) -> List[Tuple[int, float]]:
+        """Return the count nearest segments to a query embedding as (document_id, distance) pairs."""
+        return self.index.search(query_embedding, count).to_list()
+
+    def candidate_shards(self, document_filter: DocumentBitmap) -> List[Index]:
+        """Indexes that can hold segments of the documents in the filter."""
+        return [self.index]
+
+    def search_shards(self, shards: List[Index], query_embedding: np.ndarray,
+                      count: int) -> List[Tuple[int, float]]:
+        """Return the count nearest segments to a query embedding over the given indexes."""
+        merged = [hit for shard in shards for hit in shard.search(query_embedding, count).to_list()]
+        merged.sort(key=lambda hit: hit[1])
+        return merged[:count]
+
+    def search_filtered(self, query_embedding: np.ndarray, count: int,
+                        document_filter: DocumentBitmap) -> List[Tuple[int, float]]:
+        """Return the count nearest segments of the documents in the filter.
+
+        The USearch Python API has no predicate hook, so the plan depends on the filter size.
+        Small filters are searched exactly, over only the vectors of the allowed documents read
+        from the embedding store. Large filters, and all filters without a store, are searched
+        through the indexes that can hold allowed documents, with a window widened by the
+        observed selectivity and testing hits against the bitmap, until enough of them are
+        allowed or the window reaches max_filter_window or the size of those indexes.
+        """
+        if len(document_filter) == 0:
+            return []
+        if self.embedding_store is not None and len(document_filter) <= self.exact_filter_limit:
+            row_doc_ids, vectors = self.embedding_store.document_vectors(
+                document_filter.ids())
+            return nearest_segments(row_doc_ids, vectors, query_embedding[0], count)
 
-    def search_max_sim_sum(self, query: str, limit: int, offset: int = 0) -> List[Tuple[int, float]]:
+        shards = self.candidate_shards(document_filter)
+        max_window = min(self.max_filter_window, sum(len(shard) for shard in shards))
+        if max_window == 0:
+            return []
+        window = min(2 * count, max_window)
+        while True:
+            hits = self.search_shards(shards, query_embedding, window)
+            allowed = document_filter.contains(
+                np.array([doc_id for doc_id, _ in hits], dtype=np.int64))
+            num_allowed = int(allowed.sum())
+            if num_allowed >= count or len(hits) < window or window >= max_window:
+                return [hit for hit, keep in zip(hits, allowed) if keep][:count]
+            # widen by the inverse of the selectivity seen so far, at least doubling
+            window = min(max_window, max(2 * window, window * count // max(num_allowed, 1)))
+
+    def search_max_sim_sum(self, query: str, limit: int, offset: int = 0,
+                           document_filter: DocumentBitmap | None = None) -> List[Tuple[int, float]]:
         """Search using sum aggregation: Sum (1 - score) for each document."""
         self.logger.info(f"Searching for query: {query} using sum aggregation")
         try:
-            query_embedding = self.embeddings_generator.str_to_embedding(query)
-            raw_results: List[Tuple[int, float]] = self.index.search(
-                query_embedding, limit + offset).to_list()
-            raw_results.sort(key=itemgetter(0))
-
-            aggregated_results = []
-            for doc_id, group in groupby(raw_results, key=itemgetter(0)):
-                scores = [score for _, score in group]
-                # Sum (1 - score) for each embedding.
-                aggregated_score = sum(1 - s for s in scores)
-                aggregated_results.append((doc_id, aggregated_score))
-
-            aggregated_results.sort(key=lambda x: x[1], reverse=True)
-            paginated_results = aggregated_results[offset:(offset + limit)]
+            raw_results = self.search_raw(
+                query, limit + offset, document_filter)
+            paginated_results = aggregate_sum(
+                raw_results)[offset:(offset + limit)]
             self.logger.info(
                 f"Sum aggregation results for query '{query}': {paginated_results}")
             return paginated_results
@@ -118,29 +313,18 @@ class USearchIndexService:
             self.logger.error(f"Error during sum aggregation search: {e}")
             return []
 
-    def search_min_distance(self, query: str, limit: int, offset: int = 0) -> List[Tuple[int, float]]:
+    def search_min_distance(self, query: str, limit: int, offset: int = 0,
+                            document_filter: DocumentBitmap | None = None) -> List[Tuple[int, float]]:
         """Search using max pooling: Use the most relevant embedding per document.
 
         Since lower score is better, we take the minimum score and then use (1 - best_score).
         """
         self.logger.info(f"Searching for query: {query} using max pooling")
         try:
-            query_embedding = self.embeddings_generator.str_to_embedding(query)
-            raw_results: List[Tuple[int, float]] = self.index.search(
-                query_embedding, limit + offset).to_list()
-            raw_results.sort(key=itemgetter(0))
-
-            aggregated_results = []
-            for doc_id, group in groupby(raw_results, key=itemgetter(0)):
-                scores = [score for _, score in group]
-                if scores:
-                    best_score = min(scores)
-                else:
-                    best_score = 1.0
-                aggregated_results.append((doc_id, best_score))
-
-            aggregated_results.sort(key=lambda x: x[1])
-            paginated_results = aggregated_results[offset:(offset + limit)]
+            raw_results = self.search_raw(
+                query, limit + offset, document_filter)
+            paginated_results = aggregate_min(
+                raw_results)[offset:(offset + limit)]
             self.logger.info(
                 f"Max pooling results for query '{query}': {paginated_results}")
             return paginated_results
@@ -148,29 +332,50 @@ class USearchIndexService:
             self.logger.error(f"Error during max pooling search: {e}")
             return []
 
-    def search_avg_distance(self, query: str, limit: int, offset: int = 0) -> List[Tuple[int, float]]:
+    def search_avg_distance(self, query: str, limit: int, offset: int = 0,
+                            document_filter: DocumentBitmap | None = None) -> List[Tuple[int, float]]:
         """Search using average pooling: Average (1 - score) for each document."""
         self.logger.info(f"Searching for query: {query} using average pooling")
         try:
-            query_embedding = self.embeddings_generator.str_to_embedding(query)
-            raw_results: List[Tuple[int, float]] = self.index.search(
-                query_embedding, limit + offset).to_list()
-            raw_results.sort(key=itemgetter(0))
-
-            aggregated_results = []
-            for doc_id, group in groupby(raw_results, key=itemgetter(0)):
-                scores = [score for _, score in group]
-                if scores:
-                    aggregated_score = sum(1 - s for s in scores) / len(scores)
-                else:
-                    aggregated_score = 0.0
-                aggregated_results.append((doc_id, aggregated_score))
-
-            aggregated_results.sort(key=lambda x: x[1], reverse=True)
-            paginated_results = aggregated_results[offset:(offset + limit)]
+            raw_results = self.search_raw(
+                query, limit + offset, document_filter)
+            paginated_results = aggregate_avg(
+                raw_results)[offset:(offset + limit)]
             self.logger.info(
                 f"Average pooling results for query '{query}': {paginated_results}")
             return paginated_results
         except Exception as e:
             self.logger.error(f"Error during average pooling search: {e}")
             return []
+
+    def rerank(self, query: str, candidates: List[Tuple[int, float]], limit: int, offset: int = 0) -> List[Tuple[int, float]]:
+        """Re-rank candidate documents (e.g. BM25 results) by the similarity of their best segment to the query.
+
+        Segment vectors are read from the embedding store, as Index.get of a multi-key index
+        does not return the stored vectors of a key reliably.
+
+        :param query: The query string.
+        :param candidates: (document_id, score) pairs to re-rank.
+        :param limit: The number of results to return.
+        :param offset: The offset into the results.
+        :return: A list of tuples (document_id, cosine_similarity)
+        """
+        self.logger.info(
+            f"Re-ranking {len(candidates)} candidates for query: {query}")
+        if self.embedding_store is None:
+            self.logger.warning(
+                "Re-ranking needs an embedding store, returning candidates unchanged")
+            return candidates[offset:(offset + limit)]
+        try:
+            query_embedding = self.embeddings_generator.str_to_embedding(query)[0]
+            row_doc_ids, vectors = self.embedding_store.document_vectors(
+                np.array([doc_id for doc_id, _ in candidates]))
+            reranked = rerank_candidates(
+                candidates, row_doc_ids, vectors, query_embedding)
+            paginated_results = reranked[offset:(offset + limit)]
+            self.logger.info(
+                f"Re-ranked results for query '{query}': {paginated_results}")
+            return paginated_results
+        except Exception as e:
+            self.logger.error(f"Error during re-ranking: {e}")
+            return candidates[offset:(offset + limit)]
@@ -0,0 +1,83 @@
+from collections import deque
+from typing import Callable, Deque, Iterator, Tuple
+
+
+def sentence_spans(text: str, separator: str = ". ") -> Iterator[Tuple[int, int]]:
+    """Lazily yield the (start, end) character offsets of the sentences of a text."""
+    start = 0
+    while True:
+        end = text.find(separator, start)
+        if end == -1:
+            yield start, len(text)
+            return
+        yield start, end
+        start = end + len(separator)
+
+
+class StreamingSegmenter:
+    def __init__(self, max_length: int, overlap: int = 0,
+                 length_function: Callable[[str], int] = len, separator: str = ". "):
+        """
+        Split text into segments of whole sentences in a single pass.
+
+        Lengths are measured with length_function (characters by default, or model tokens)
+        and tracked as running sums, so every sentence is measured and joined only once.
+
+        :param max_length: Maximum length of a segment. A single longer sentence becomes its own segment.
+        :param overlap: Maximum length of trailing sentences repeated at the start of the next segment.
+        :param length_function: Measures the length of a sentence.
+        :param separator: The string separating sentences.
+        """
+        if overlap >= max_length:
+            raise ValueError("Segment overlap must be smaller than the maximum segment length")
+        self.max_length = max_length
+        self.overlap = overlap
+        self.length_function = length_function
+        self.separator = separator
+        self.separator_length = length_function(separator)
+
+    def sentences(self, text: str) -> Iterator[str]:
+        """Lazily yield the sentences of a text."""
+        for start, end in sentence_spans(text, self.separator):
+            yield text[start:end]
+
+    def segments(self, text: str) -> Iterator[str]:
+        """Lazily yield the segments of a text."""
+        current: Deque[Tuple[str, int]] = deque()
+        current_length = 0
+
+        for sentence in self.sentences(text):
+            if not sentence:
+                continue
+            sentence_length = self.length_function(sentence)
+            added_length = sentence_length + (self.separator_length if current else 0)
+
+            if current and current_length + added_length > self.max_length:
+                yield self.separator.join(s for s, _ in current)
+                current, current_length = self._overlap_tail(current)
+                added_length = sentence_length + (self.separator_length if current else 0)
+                # drop the overlap if it does not leave room for the new sentence
+                while current and current_length + added_length > self.max_length:
+                    _, dropped_length = current.popleft()
+                    current_length -= dropped_length + (self.separator_length if current else 0)
+                    added_length = sentence_length + (self.separator_length if current else 0)
+
+            current.append((sentence, sentence_length))
+            current_length += added_length
+
+        if current:
+            yield self.separator.join(s for s, _ in current)
+
+    def _overlap_tail(self, current: Deque[Tuple[str, int]]) -> Tuple[Deque[Tuple[str, int]], int]:
+        """Keep the trailing sentences of a finished segment that fit into the overlap."""
+        tail: Deque[Tuple[str, int]] = deque()
+        tail_length = 0
+        if self.overlap <= 0:
+            return tail, tail_length
+        for sentence, sentence_length in reversed(current):
+            added_length = sentence_length + (self.separator_length if tail else 0)
+            if tail_length + added_length > self.overlap:
+                break
+            tail.appendleft((sentence, sentence_length))
+            tail_length += added_length
+        return tail, tail_length
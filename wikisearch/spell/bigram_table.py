@@ -0,0 +1,88 @@
+import logging
+from pathlib import Path
+from typing import Iterable
+
+import numpy as np
+
+
+def bigram_keys(first_ids: np.ndarray, second_ids: np.ndarray) -> np.ndarray:
+    """One uint64 key per pair of word ids, ordered by the first word, then the second."""
+    return (np.asarray(first_ids, dtype=np.uint64) << np.uint64(32)) | np.asarray(second_ids, dtype=np.uint64)
+
+
+def merge_counts(keys: np.ndarray, counts: np.ndarray):
+    """Sorted distinct keys with the sum of their counts."""
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    return unique_keys, np.bincount(inverse, weights=counts, minlength=len(unique_keys)).astype(np.uint32)
+
+
+class BigramTable:
+    KEYS_FILE = "keys.u64"
+    COUNTS_FILE = "counts.u32"
+
+    def __init__(self, path: Path):
+        """
+        Read-only, memory-mapped table of word pair counts.
+
+        Pairs are keyed by the ids of the two words in the vocabulary of the spell checker
+        (their line in the frequency list) and sorted, so a count is one binary search.
+
+        :param path: Directory holding the table files, written by BigramTable.build.
+        """
+        self.logger = logging.getLogger(__name__)
+        self.path = path
+        keys_path = self.path / self.KEYS_FILE
+        if keys_path.is_file() and keys_path.stat().st_size:
+            self.keys = np.memmap(keys_path, dtype=np.uint64, mode="r")
+            self.counts = np.memmap(self.path / self.COUNTS_FILE, dtype=np.uint32, mode="r")
+        else:
+            self.logger.warning(f"No bigram counts in {self.path}")
+            self.keys = np.empty(0, dtype=np.uint64)
+            self.counts = np.empty(0, dtype=np.uint32)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def lookup(self, first_ids: np.ndarray, second_ids: np.ndarray) -> np.ndarray:
+        """Counts of the pairs (first_ids[i], second_ids[i]), 0 for pairs never seen."""
+        keys = bigram_keys(first_ids, second_ids)
+        if not len(self.keys):
+            return np.zeros(keys.shape, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+        return np.where(self.keys[positions] == keys, self.counts[positions], 0).astype(np.int64)
+
+    @staticmethod
+    def build(path: Path, sequences: Iterable[np.ndarray], min_count: int = 1,
+              buffer_size: int = 50_000_000):
+        """
+        Count the adjacent pairs in sequences of word ids and write the table.
+
+        Pairs are collected in a buffer and merged into the sorted counts whenever the buffer
+        is full, so memory is bounded by the buffer and the distinct pairs seen so far.
+
+        :param sequences: Word ids of consecutive words, e.g. one array per sentence.
+        :param min_count: Pairs seen fewer times are not stored.
+        :param buffer_size: Number of pairs collected before merging.
+        """
+        keys = np.empty(0, dtype=np.uint64)
+        counts = np.empty(0, dtype=np.uint32)
+        buffer = []
+        buffered = 0
+        for sequence in sequences:
+            if len(sequence) < 2:
+                continue
+            buffer.append(bigram_keys(sequence[:-1], sequence[1:]))
+            buffered += len(sequence) - 1
+            if buffered >= buffer_size:
+                keys, counts = merge_counts(np.concatenate([keys, *buffer]), np.concatenate(
+                    [counts, np.ones(buffered, dtype=np.uint32)]))
+                buffer = []
+                buffered = 0
+        keys, counts = merge_counts(np.concatenate([keys, *buffer]), np.concatenate(
+            [counts, np.ones(buffered, dtype=np.uint32)]))
+
+        keep = counts >= min_count
+        path.mkdir(parents=True, exist_ok=True)
+        keys[keep].tofile(path / BigramTable.KEYS_FILE)
+        counts[keep].tofile(path / BigramTable.COUNTS_FILE)
+        return int(keep.sum())
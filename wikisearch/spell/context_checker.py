@@ -0,0 +1,104 @@
+import functools
+import math
+from typing import List, Tuple
+
+import numpy as np
+
+from wikisearch.spell.bigram_table import BigramTable
+from wikisearch.spell.symspell_checker import SymSpellChecker
+
+# weight of an unseen word pair relative to the unigram probability ("stupid backoff")
+BACKOFF_WEIGHT = 0.4
+
+
+class ContextSpellChecker:
+    def __init__(self, symspell: SymSpellChecker, bigrams: BigramTable, max_candidates: int = 5,
+                 error_probability: float = 0.01, cache_size: int = 10000):
+        """
+        Whole-query spelling correction with a noisy channel model.
+
+        Every token gets up to max_candidates vocabulary words from SymSpell, itself included.
+        The corrected query is the sequence of candidates maximizing the bigram language model
+        probability times the probability of the typos, found with the Viterbi algorithm. A
+        word can thus be replaced by a correctly spelled one that fits its neighbours better.
+
+        :param symspell: Source of the candidates and of the word frequencies.
+        :param bigrams: Counts of word pairs over the vocabulary of symspell.
+        :param max_candidates: Number of candidates per token.
+        :param error_probability: Probability of each edit, i.e. the cost of a correction.
+        :param cache_size: Number of corrected queries kept in memory.
+        """
+        self.symspell = symspell
+        self.bigrams = bigrams
+        self.max_candidates = max_candidates
+        self.edit_log_probability = math.log(error_probability)
+        self.log_total = math.log(int(symspell.frequencies.sum()) + len(symspell.frequencies) + 1)
+        self.token_candidates = functools.lru_cache(maxsize=cache_size)(self._token_candidates)
+        self.correct_tokens = functools.lru_cache(maxsize=cache_size)(self._correct_tokens)
+
+    def spellcheck(self, string: str) -> str:
+        tokens = string.split(" ")
+        return " ".join(self.check_and_correct(tokens))
+
+    def check_and_correct(self, tokens: List[str]) -> List[str]:
+        """
+        Check and correct misspelled words in the input tokens, taking their neighbours into account.
+
+        :param tokens: List of query tokens to spell-check.
+        :return: List of tokens with corrections applied.
+        """
+        return list(self.correct_tokens(tuple(tokens)))
+
+    def _token_candidates(self, token: str) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """Candidate words of a token, their word ids (-1 if unknown) and their log probability of being typed as the token."""
+        candidates = self.symspell.candidates(token, include_known=True)[:self.max_candidates]
+        if not candidates:
+            # nothing to correct to, e.g. numbers and names
+            return [token], np.array([-1]), np.zeros(1)
+        words = [word for word, _, _ in candidates]
+        word_ids = np.array([self.symspell.word_ids[word] for word in words])
+        channel = np.array([distance for _, distance, _ in candidates]) * self.edit_log_probability
+        return words, word_ids, channel
+
+    def unigram_log_probabilities(self, word_ids: np.ndarray) -> np.ndarray:
+        counts = np.where(word_ids >= 0, self.symspell.frequencies[np.maximum(word_ids, 0)], 0)
+        return np.log(counts + 1) - self.log_total
+
+    def transition_log_probabilities(self, previous_ids: np.ndarray, word_ids: np.ndarray) -> np.ndarray:
+        """Matrix of log P(word | previous word) for every pair of candidates."""
+        first = np.repeat(previous_ids, len(word_ids))
+        second = np.tile(word_ids, len(previous_ids))
+        known = (first >= 0) & (second >= 0)
+        pair_counts = np.zeros(len(first), dtype=np.int64)
+        pair_counts[known] = self.bigrams.lookup(first[known], second[known])
+        previous_counts = np.where(
+            first >= 0, self.symspell.frequencies[np.maximum(first, 0)], 0)
+        backoff = math.log(BACKOFF_WEIGHT) + np.tile(
+            self.unigram_log_probabilities(word_ids), len(previous_ids))
+        with np.errstate(divide="ignore"):
+            bigram = np.log(pair_counts) - np.log(np.maximum(previous_counts, 1))
+        return np.where(pair_counts > 0, bigram, backoff).reshape(len(previous_ids), len(word_ids))
+
+    def _correct_tokens(self, tokens: Tuple[str, ...]) -> Tuple[str, ...]:
+        if not tokens:
+            return tokens
+        lattice = [self.token_candidates(token) if token else ([token], np.array([-1]), np.zeros(1))
+                   for token in tokens]
+
+        words, word_ids, channel = lattice[0]
+        scores = self.unigram_log_probabilities(word_ids) + channel
+        back_pointers = []
+        previous_ids = word_ids
+        for words, word_ids, channel in lattice[1:]:
+            totals = scores[:, None] + self.transition_log_probabilities(previous_ids, word_ids)
+            back_pointers.append(np.argmax(totals, axis=0))
+            scores = totals.max(axis=0) + channel
+            previous_ids = word_ids
+
+        best = int(np.argmax(scores))
+        path = [best]
+        for pointers in reversed(back_pointers):
+            best = int(pointers[best])
+            path.append(best)
+        path.reverse()
+        return tuple(candidates[0][index] for candidates, index in zip(lattice, path))
@@ -1,19 +1,73 @@
+import logging
 import os
+import shutil
+import tempfile
+from itertools import islice
 from pathlib import Path
+from typing import Iterator, List, Tuple
 
 import tomli
 from dotenv import load_dotenv
 
 from wikisearch.db.database_connection import DatabaseConnectionService
 
+CHUNK_SIZE = 10000
+
+
+def fetch_rows(cursor, chunk_size: int = CHUNK_SIZE) -> Iterator[tuple]:
+    """Yield the rows of an unbuffered cursor, fetching chunk_size rows at a time."""
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            return
+        yield from rows
+
+
+def word_frequencies(counts_connection, words_connection, min_frequency: int = 1) -> Iterator[Tuple[str, int]]:
+    """
+    Yield (word, number of occurrences) of every indexed word, streamed from the database.
+
+    The postings are counted in primary key order, i.e. by word id, so the database reads
+    the index sequentially instead of sorting the whole table in a temporary table. The
+    words are read in the same order on a second connection and joined here.
+
+    :param min_frequency: Words occurring fewer times are skipped.
+    """
+    counts_cursor = counts_connection.cursor()
+    counts_cursor.execute(
+        "SELECT word_id, COUNT(*) FROM postings GROUP BY word_id ORDER BY word_id")
+    words_cursor = words_connection.cursor()
+    words_cursor.execute("SELECT id, token FROM word ORDER BY id")
+    words = fetch_rows(words_cursor)
+    word_id, token = -1, ""
+    try:
+        for counted_id, count in fetch_rows(counts_cursor):
+            while word_id < counted_id:
+                word_id, token = next(words, (counted_id + 1, ""))
+            # tabs and line breaks would break the line-based dictionary formats
+            if word_id == counted_id and count >= min_frequency and token.strip() and not any(
+                    character in token for character in "\t\n\r"):
+                yield token, count
+    finally:
+        # drain the unbuffered results so the connections can be reused
+        for _ in fetch_rows(words_cursor):
+            pass
+        words_cursor.close()
+        for _ in fetch_rows(counts_cursor):
+            pass
+        counts_cursor.close()
+
 
 def export_to_hunspell():
+    logger = logging.getLogger('WikiSearch')
     path_to_config = Path("./config.toml")
     with open(path_to_config, "rb") as f:
         config = tomli.load(f)
 
     SPELL_CONFIG = {
         "custom_path": config["SpellChecker"].get("CustomDicPath"),
+        "frequency_path": config["SpellChecker"].get("FrequencyPath"),
+        "min_frequency": config["SpellChecker"].get("MinFrequency", 1),
     }
 
     load_dotenv()
@@ -24,19 +78,30 @@ def export_to_hunspell():
         "database": os.getenv("DB_DATABASE"),
     }
 
-    with DatabaseConnectionService(DB_CONFIG) as connection:
-        cursor = connection.cursor()
-        cursor.execute("""
-            SELECT w.token 
-            FROM word w
-            JOIN postings p ON w.id = p.word_id
-            GROUP BY w.token
-            ORDER BY COUNT(p.position) DESC
-        """)
-        words = [row[0] for row in cursor.fetchall()]
-        with open(SPELL_CONFIG["custom_path"], "w", encoding="utf-8") as dic_file:
-            dic_file.write(f"{len(words)}\n")
-            dic_file.writelines(f"{word}\n" for word in words)
+    database_service = DatabaseConnectionService(DB_CONFIG, pool_size=2)
+    custom_path = Path(SPELL_CONFIG["custom_path"])
+    # a .dic file starts with its number of words, known only at the end
+    with database_service.connection() as counts_connection, \
+            database_service.connection() as words_connection, \
+            tempfile.NamedTemporaryFile("w+", encoding="utf-8", dir=custom_path.parent) as words_file, \
+            open(SPELL_CONFIG["frequency_path"] or os.devnull, "w", encoding="utf-8") as frequency_file:
+        frequencies = word_frequencies(
+            counts_connection, words_connection, int(SPELL_CONFIG["min_frequency"]))
+        num_words = 0
+        while True:
+            chunk: List[Tuple[str, int]] = list(islice(frequencies, CHUNK_SIZE))
+            if not chunk:
+                break
+            words_file.writelines(f"{word}\n" for word, _ in chunk)
+            # the frequency list of the SymSpell backend
+            frequency_file.writelines(f"{word}\t{count}\n" for word, count in chunk)
+            num_words += len(chunk)
+
+        words_file.seek(0)
+        with open(custom_path, "w", encoding="utf-8") as dic_file:
+            dic_file.write(f"{num_words}\n")
+            shutil.copyfileobj(words_file, dic_file)
+    logger.info(f"Exported {num_words} words to {custom_path}")
 
     # # Create minimal affix file
     # with open(AFF_PATH, "w", encoding="utf-8") as aff_file:
@@ -44,4 +109,6 @@ def export_to_hunspell():
 
 
 if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
     export_to_hunspell()
@@ -1,43 +1,58 @@
 
+import functools
+import logging
+import threading
 from pathlib import Path
 from typing import List
 
+import dawg
 from hunspell import HunSpell
 
 
 class HunSpellChecker:
-    def __init__(self, aff_path: Path, dic_path: Path):
+    def __init__(self, aff_path: Path, dic_path: Path, vocabulary_path: Path | None = None,
+                 cache_size: int = 10000):
         """
         Initialize the SpellChecker with paths to .aff and .dic files.
 
         :param aff_path: Path to the .aff file.
         :param dic_path: Path to the .dic file.
+        :param vocabulary_path: Optional DAWG of the lowercase words of the corpus, e.g. the word
+            completion DAWG. Words in it are accepted without asking Hunspell.
+        :param cache_size: Number of corrected words kept in memory.
         """
+        self.logger = logging.getLogger(__name__)
         self.spell_checker = HunSpell(dic_path, aff_path)
+        # the Hunspell handle is not thread-safe
+        self.lock = threading.Lock()
+        self.vocabulary = None
+        if vocabulary_path is not None:
+            try:
+                self.vocabulary = dawg.CompletionDAWG().load(str(vocabulary_path))
+            except Exception as e:
+                self.logger.warning(f"Spell checking without the corpus vocabulary: {e}")
+        # suggest() takes up to hundreds of milliseconds, and queries repeat the same words
+        self.correct = functools.lru_cache(maxsize=cache_size)(self._correct)
 
     def spellcheck(self, string: str) -> str:
         tokens = string.split(" ")
         return " ".join(self.check_and_correct(tokens))
 
+    def _correct(self, token: str) -> str:
+        """The token if it is spelled correctly, else the first suggestion for it."""
+        if self.vocabulary is not None and token.lower() in self.vocabulary:
+            return token
+        with self.lock:
+            if self.spell_checker.spell(token):
+                return token
+            suggestions = self.spell_checker.suggest(token)
+        return suggestions[0] if suggestions else token
+
     def check_and_correct(self, tokens: List[str]) -> List[str]:
         """
         Check and correct misspelled words in the input tokens.
 
         :param tokens: List of query tokens to spell-check.
-        :return: A tuple containing:
-                 1. List of tokens with corrections applied.
-                 2. List of indices in the input tokens where corrections were made.
+        :return: List of tokens with corrections applied.
         """
-        corrections = []
-
-        for i, token in enumerate(tokens):
-            if not self.spell_checker.spell(token):
-                suggestions = self.spell_checker.suggest(token)
-                if suggestions:
-                    corrections.append(suggestions[0])
-                else:
-                    corrections.append(token)
-            else:
-                corrections.append(token)
-
-        return corrections
+        return [self.correct(token) for token in tokens]
@@ -0,0 +1,182 @@
+import functools
+import logging
+import zlib
+from pathlib import Path
+from typing import Dict, Iterator, List, Set, Tuple
+
+import numpy as np
+
+
+def read_frequencies(frequency_path: Path) -> Iterator[Tuple[str, int]]:
+    """Yield (word, count) from a frequency list with one tab-separated word and count per line."""
+    with open(frequency_path, encoding="utf-8") as f:
+        for line in f:
+            word, _, count = line.rstrip("\n").partition("\t")
+            if word and count.isdigit():
+                yield word, int(count)
+
+
+def load_vocabulary(frequency_path: Path) -> Tuple[List[str], np.ndarray, Dict[str, int]]:
+    """
+    Lowercase words of a frequency list, their counts and the id of every distinct word.
+
+    The id of a word is its line in the list; if words only differ in case, the most frequent wins.
+    """
+    words: List[str] = []
+    counts = []
+    for word, count in read_frequencies(frequency_path):
+        words.append(word.lower())
+        counts.append(count)
+    word_ids: Dict[str, int] = {}
+    for word_id, word in enumerate(words):
+        if word not in word_ids or counts[word_id] > counts[word_ids[word]]:
+            word_ids[word] = word_id
+    return words, np.array(counts, dtype=np.int64), word_ids
+
+
+def deletes(word: str, max_edit_distance: int) -> Set[str]:
+    """The word and every string obtained by deleting up to max_edit_distance of its characters."""
+    result = {word}
+    frontier = {word}
+    for _ in range(max_edit_distance):
+        frontier = {candidate[:i] + candidate[i + 1:]
+                    for candidate in frontier if len(candidate) > 1
+                    for i in range(len(candidate))} - result
+        result |= frontier
+    return result
+
+
+def delete_hash(string: str) -> int:
+    return zlib.crc32(string.encode('utf-8'))
+
+
+def edit_distance(source: str, target: str, max_distance: int) -> int:
+    """Optimal string alignment distance (adjacent transpositions count once), or max_distance + 1 if larger."""
+    if abs(len(source) - len(target)) > max_distance:
+        return max_distance + 1
+    previous_previous: List[int] = []
+    previous = list(range(len(target) + 1))
+    for i in range(1, len(source) + 1):
+        current = [i] + [0] * len(target)
+        for j in range(1, len(target) + 1):
+            cost = 0 if source[i - 1] == target[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (i > 1 and j > 1 and source[i - 1] == target[j - 2]
+                    and source[i - 2] == target[j - 1]):
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous_previous, previous = previous, current
+    return min(previous[-1], max_distance + 1)
+
+
+class SymSpellChecker:
+    def __init__(self, frequency_path: Path, index_path: Path | None = None, max_edit_distance: int = 2,
+                 prefix_length: int = 7, cache_size: int = 10000):
+        """
+        Spelling correction by symmetric deletes over the corpus vocabulary.
+
+        Every vocabulary word is indexed under all strings obtained by deleting up to
+        max_edit_distance characters of its prefix. A misspelled word is looked up under its own
+        deletes, so candidates are found with a few hash lookups instead of generating and testing
+        every possible edit. Candidates are ranked by edit distance, then by corpus frequency.
+
+        The index is a sorted array of (delete hash, word id) pairs. It is stored at index_path
+        and loaded from there, and rebuilt when the frequency list is newer.
+
+        :param frequency_path: Frequency list of the corpus vocabulary, one "word<TAB>count" per line.
+        :param index_path: Optional .npz file to store the delete index in.
+        :param max_edit_distance: Maximum edit distance of a correction.
+        :param prefix_length: Number of leading characters of a word that are indexed.
+        :param cache_size: Number of corrected words kept in memory.
+        """
+        self.logger = logging.getLogger(__name__)
+        self.max_edit_distance = max_edit_distance
+        self.prefix_length = prefix_length
+        self.words, self.frequencies, self.word_ids = load_vocabulary(frequency_path)
+
+        index = None
+        if (index_path is not None and index_path.is_file()
+                and index_path.stat().st_mtime >= Path(frequency_path).stat().st_mtime):
+            index = self.load_index(index_path)
+        if index is None:
+            index = self.build_index()
+            if index_path is not None:
+                self.save_index(index_path, *index)
+        self.hashes, self.hash_word_ids = index
+        self.logger.info(
+            f"Loaded {len(self.words)} words with {len(self.hashes)} deletes")
+        self.correct = functools.lru_cache(maxsize=cache_size)(self._correct)
+
+    def build_index(self) -> Tuple[np.ndarray, np.ndarray]:
+        hashes = []
+        word_ids = []
+        for word, word_id in self.word_ids.items():
+            word_hashes = {delete_hash(delete) for delete in deletes(
+                word[:self.prefix_length], self.max_edit_distance)}
+            hashes.extend(word_hashes)
+            word_ids.extend([word_id] * len(word_hashes))
+        hashes_array = np.array(hashes, dtype=np.uint32)
+        order = np.argsort(hashes_array, kind="stable")
+        return hashes_array[order], np.array(word_ids, dtype=np.uint32)[order]
+
+    def save_index(self, index_path: Path, hashes: np.ndarray, word_ids: np.ndarray):
+        index_path.parent.mkdir(parents=True, exist_ok=True)
+        # np.savez appends .npz to names without it
+        with open(index_path, "wb") as f:
+            np.savez(f, hashes=hashes, word_ids=word_ids,
+                     parameters=np.array([self.max_edit_distance, self.prefix_length, len(self.words)]))
+
+    def load_index(self, index_path: Path) -> Tuple[np.ndarray, np.ndarray] | None:
+        """The stored index, or None if it was built with other parameters or another vocabulary."""
+        with np.load(index_path) as index:
+            if index["parameters"].tolist() != [self.max_edit_distance, self.prefix_length, len(self.words)]:
+                self.logger.info(f"Rebuilding {index_path} for the current parameters")
+                return None
+            return index["hashes"], index["word_ids"]
+
+    def spellcheck(self, string: str) -> str:
+        tokens = string.split(" ")
+        return " ".join(self.check_and_correct(tokens))
+
+    def check_and_correct(self, tokens: List[str]) -> List[str]:
+        """
+        Check and correct misspelled words in the input tokens.
+
+        :param tokens: List of query tokens to spell-check.
+        :return: List of tokens with corrections applied.
+        """
+        return [self.correct(token) for token in tokens]
+
+    def candidates(self, token: str, include_known: bool = False) -> List[Tuple[str, int, int]]:
+        """
+        Vocabulary words within the maximum edit distance of a token as (word, distance, frequency), best first.
+
+        :param include_known: Also look for other words if the token itself is in the vocabulary.
+        """
+        word = token.lower()
+        if word in self.word_ids and not include_known:
+            word_id = self.word_ids[word]
+            return [(word, 0, int(self.frequencies[word_id]))]
+
+        query_hashes = np.array([delete_hash(delete) for delete in deletes(
+            word[:self.prefix_length], self.max_edit_distance)], dtype=np.uint32)
+        starts = np.searchsorted(self.hashes, query_hashes, side="left")
+        ends = np.searchsorted(self.hashes, query_hashes, side="right")
+        candidate_ids = {int(word_id) for start, end in zip(starts, ends)
+                         for word_id in self.hash_word_ids[start:end]}
+
+        results = []
+        for word_id in candidate_ids:
+            distance = edit_distance(word, self.words[word_id], self.max_edit_distance)
+            if distance <= self.max_edit_distance:
+                results.append((self.words[word_id], distance, int(self.frequencies[word_id])))
+        results.sort(key=lambda candidate: (candidate[1], -candidate[2]))
+        return results
+
+    def _correct(self, token: str) -> str:
+        """The closest, then most frequent, vocabulary word, or the token itself if there is none."""
+        if not token:
+            return token
+        candidates = self.candidates(token)
+        return candidates[0][0] if candidates else token
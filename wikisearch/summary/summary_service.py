@@ -1,14 +1,118 @@
+from typing import Dict, List, Tuple
+
+from wikisearch.db.document_codec import DocumentCodec
+from wikisearch.db.file_database import (SUMMARIES_DB, TERM_OFFSETS_DB,
+                                         open_sub_database)
+from wikisearch.summary.term_offsets import (TermOffsets, encode_term_offsets,
+                                             highlight_spans, term_hash)
+
+# a UTF-8 encoded character takes at most 4 bytes
+MAX_UTF8_CHAR_BYTES = 4
+# length of the precomputed static summaries
+STATIC_SUMMARY_LENGTH = 200
+# most article text is Cyrillic, two bytes per character
+AVERAGE_CHAR_BYTES = 2
+
 
 class SummaryService:
 
-    def __init__(self, lmdb_env) -> None:
+    def __init__(self, lmdb_env, writable: bool = False) -> None:
+        """
+        :param lmdb_env: LMDB environment of the documents, opened with named sub-databases enabled.
+        :param writable: Create the summaries sub-database if missing, to store summaries into it.
+        """
         self.lmdb_env = lmdb_env
+        self.codec = DocumentCodec(lmdb_env)
+        self.summaries_db = open_sub_database(
+            lmdb_env, SUMMARIES_DB, create=writable)
+        self.term_offsets_db = open_sub_database(
+            lmdb_env, TERM_OFFSETS_DB, create=writable)
+
+    @staticmethod
+    def static_summary(text: str, textLength: int = STATIC_SUMMARY_LENGTH) -> str:
+        return text.replace('\n', ' ')[:textLength]
+
+    @staticmethod
+    def static_summary_from_bytes(data: bytes, textLength: int = STATIC_SUMMARY_LENGTH) -> str:
+        """Static summary of a UTF-8 encoded text, decoding only the prefix it needs."""
+        # a character cut at the end of the prefix is dropped
+        text = data[:textLength * MAX_UTF8_CHAR_BYTES].decode('utf-8', errors='ignore')
+        return SummaryService.static_summary(text, textLength)
+
+    def store_static_summary(self, txn, document_id: int, text: str):
+        """Store the static summary of a document within a write transaction, e.g. at ingest."""
+        txn.put(str(document_id).encode(),
+                self.static_summary(text).encode(), db=self.summaries_db)
+
+    def store_term_offsets(self, txn, document_id: int, text: str):
+        """Store the word and sentence offsets used for dynamic summaries within a write transaction."""
+        txn.put(str(document_id).encode(),
+                encode_term_offsets(text), db=self.term_offsets_db)
+
+    def store_summaries(self, txn, document_id: int, text: str):
+        """Precompute everything needed to summarize a document, e.g. when it is saved."""
+        self.store_static_summary(txn, document_id, text)
+        self.store_term_offsets(txn, document_id, text)
 
     def summarize_static(self, document_id: int, textLength: int = 200) -> str:
-        with self.lmdb_env.begin(write=True) as txn:
-            text: str = txn.get(str(document_id).encode()).decode('utf-8').replace('\n', ' ')
-            return text[:textLength]
-    
-    def summarize_dynamic(self, document_id: int, textLength: int = 200) -> str:
-        # unimplemented
-        return ""
+        return self.summarize_static_many([document_id], textLength).get(document_id, "")
+
+    def summarize_static_many(self, document_ids: List[int], textLength: int = 200) -> Dict[int, str]:
+        """
+        Static summaries (the beginning of the text) of several documents.
+
+        Precomputed summaries are read from the summaries sub-database. Documents without one
+        fall back to their text, of which only the prefix needed for the summary is decompressed
+        and decoded.
+        Everything is read in one read-only transaction with zero-copy buffers.
+        """
+        summaries = {}
+        precomputed = self.summaries_db is not None and textLength <= STATIC_SUMMARY_LENGTH
+        with self.lmdb_env.begin(buffers=True) as txn:
+            for document_id in document_ids:
+                key = str(document_id).encode()
+                if precomputed:
+                    summary = txn.get(key, db=self.summaries_db)
+                    if summary is not None:
+                        summaries[document_id] = bytes(summary).decode('utf-8')[:textLength]
+                        continue
+                buffer = txn.get(key)
+                if buffer is not None:
+                    summaries[document_id] = self.static_summary_from_bytes(
+                        self.codec.read_prefix(buffer, textLength * MAX_UTF8_CHAR_BYTES), textLength)
+        return summaries
+
+    def summarize_dynamic(self, document_id: int, terms: List[str], textLength: int = 200) -> str:
+        summaries = self.summarize_dynamic_many([document_id], terms, textLength)
+        return summaries[document_id][0] if document_id in summaries else ""
+
+    def summarize_dynamic_many(self, document_ids: List[int], terms: List[str],
+                               textLength: int = 200) -> Dict[int, Tuple[str, List[Tuple[int, int]]]]:
+        """
+        Query-biased summaries of several documents, with the character spans of the matched terms.
+
+        The snippet is the window of the text with the most distinct query terms, found in the
+        precomputed word offsets of the document, so only the snippet itself is decoded.
+        Documents without precomputed offsets have them computed from the full text.
+        Documents without any query term get their static summary.
+
+        :return: Document id to (summary, [(start, end), ...]) for every stored document.
+        """
+        terms = {term.lower() for term in terms}
+        query_hashes = sorted({term_hash(term) for term in terms})
+        summaries = {}
+        with self.lmdb_env.begin(buffers=True) as txn:
+            for document_id in document_ids:
+                key = str(document_id).encode()
+                buffer = txn.get(key)
+                if buffer is None:
+                    continue
+                offsets = txn.get(key, db=self.term_offsets_db) if self.term_offsets_db is not None else None
+                if offsets is None:
+                    offsets = encode_term_offsets(self.codec.decode(buffer))
+                start = TermOffsets(offsets).densest_window(
+                    query_hashes, textLength * AVERAGE_CHAR_BYTES) or 0
+                summary = self.static_summary_from_bytes(
+                    self.codec.read_prefix(buffer, start + textLength * MAX_UTF8_CHAR_BYTES)[start:], textLength)
+                summaries[document_id] = (summary, highlight_spans(summary, terms))
+        return summaries
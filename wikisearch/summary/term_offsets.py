@@ -0,0 +1,121 @@
+import re
+import zlib
+from typing import Iterable, Iterator, List, Set, Tuple
+
+import numpy as np
+
+from wikisearch.nlp import segmenter
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def term_hash(term: str) -> int:
+    return zlib.crc32(term.lower().encode('utf-8'))
+
+
+def sentence_spans(text: str) -> Iterator[Tuple[int, int]]:
+    """
+    Character spans of the non-blank sentences of a text, without surrounding whitespace.
+
+    Every line is split into sentences like the embedding segmenter splits text, so snippets
+    and segments agree on where sentences start.
+    """
+    line_start = 0
+    for line in text.split("\n"):
+        for start, end in segmenter.sentence_spans(line):
+            sentence = line[start:end]
+            if sentence.strip():
+                leading = len(sentence) - len(sentence.lstrip())
+                yield line_start + start + leading, line_start + start + len(sentence.rstrip())
+        line_start += len(line) + 1
+
+
+def sentences(text: str) -> Iterator[str]:
+    """The non-blank sentences of a text, see sentence_spans."""
+    for start, end in sentence_spans(text):
+        yield text[start:end]
+
+
+def highlight_spans(text: str, terms: Set[str]) -> List[Tuple[int, int]]:
+    """Character spans of the words of a text that are in a set of lowercase terms."""
+    if not terms:
+        return []
+    return [match.span() for match in WORD_PATTERN.finditer(text) if match.group().lower() in terms]
+
+
+def encode_term_offsets(text: str) -> bytes:
+    """
+    Serialize the positions of all words and sentences of a text.
+
+    Layout (little-endian uint32): number of sentences, number of words, sentence start
+    offsets, word hashes in ascending order, word start offsets in the same order. Offsets
+    are byte offsets into the UTF-8 encoded text, so a snippet can be decoded from any
+    offset without decoding what comes before it.
+    """
+    encoded = np.frombuffer(text.encode('utf-8'), dtype=np.uint8)
+    # byte offset of every character: the bytes that are not UTF-8 continuation bytes
+    char_to_byte = np.flatnonzero((encoded & 0xC0) != 0x80).astype(np.uint32)
+
+    sentence_starts = char_to_byte[np.array(
+        [start for start, _ in sentence_spans(text)], dtype=np.int64)]
+    words = [(term_hash(m.group()), m.start()) for m in WORD_PATTERN.finditer(text)]
+    hashes = np.array([h for h, _ in words], dtype=np.uint32)
+    offsets = char_to_byte[np.array([start for _, start in words], dtype=np.int64)]
+    order = np.argsort(hashes, kind="stable")
+
+    header = np.array([len(sentence_starts), len(words)], dtype=np.uint32)
+    return b"".join(array.astype("<u4").tobytes()
+                    for array in (header, sentence_starts, hashes[order], offsets[order]))
+
+
+class TermOffsets:
+    def __init__(self, buffer):
+        """Zero-copy view of a serialized term offset map, see encode_term_offsets."""
+        data = np.frombuffer(buffer, dtype="<u4")
+        num_sentences, num_words = int(data[0]), int(data[1])
+        self.sentence_starts = data[2:2 + num_sentences]
+        self.hashes = data[2 + num_sentences:2 + num_sentences + num_words]
+        self.offsets = data[2 + num_sentences + num_words:2 + num_sentences + 2 * num_words]
+
+    def matches(self, query_hashes: Iterable[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """Byte offsets of all occurrences of the query terms, ascending, and the index of the term at each."""
+        offsets = []
+        term_ids = []
+        for term_id, query_hash in enumerate(query_hashes):
+            start = np.searchsorted(self.hashes, query_hash, side="left")
+            end = np.searchsorted(self.hashes, query_hash, side="right")
+            offsets.append(self.offsets[start:end])
+            term_ids.append(np.full(end - start, term_id))
+        if not offsets:
+            return np.empty(0, dtype=np.uint32), np.empty(0, dtype=np.int64)
+        offsets = np.concatenate(offsets)
+        term_ids = np.concatenate(term_ids)
+        order = np.argsort(offsets, kind="stable")
+        return offsets[order], term_ids[order]
+
+    def densest_window(self, query_hashes: Iterable[int], window_bytes: int) -> int | None:
+        """
+        Byte offset where the snippet should start, or None if no query term occurs.
+
+        The window of window_bytes covering the most distinct query terms (then the most
+        matches) is chosen, and its start moved back to the beginning of its sentence when
+        that still keeps the first match in the first half of the window.
+        """
+        offsets, term_ids = self.matches(query_hashes)
+        if not len(offsets):
+            return None
+        best_start, best_score = 0, (0, 0)
+        end = 0
+        for start in range(len(offsets)):
+            end = max(end, start)
+            while end + 1 < len(offsets) and offsets[end + 1] - offsets[start] < window_bytes:
+                end += 1
+            score = (len(set(term_ids[start:end + 1].tolist())), end - start + 1)
+            if score > best_score:
+                best_start, best_score = start, score
+
+        first_match = int(offsets[best_start])
+        sentence = np.searchsorted(self.sentence_starts, first_match, side="right") - 1
+        if sentence >= 0 and first_match - int(self.sentence_starts[sentence]) < window_bytes // 2:
+            return int(self.sentence_starts[sentence])
+        return first_match